@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Ecommerce.settings')
+# Serve the catalog reads with the async views (see Ecommerce/urls_async.py)
+os.environ.setdefault('ROOT_URLCONF', 'Ecommerce.urls_async')
 
 application = get_asgi_application()
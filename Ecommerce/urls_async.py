@@ -0,0 +1,14 @@
+"""
+URL configuration for the ASGI entry point (Ecommerce/asgi.py).
+
+The catalog reads and the profile endpoint resolve to the async views in
+ecommerce_app.async_urls; every other URL is served exactly as in
+Ecommerce.urls.
+"""
+from django.urls import include, path
+
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path('', include('ecommerce_app.async_urls')),
+] + sync_urlpatterns
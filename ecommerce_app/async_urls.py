@@ -0,0 +1,14 @@
+from django.urls import path
+
+from . import async_views
+
+# Same paths and names as ecommerce_app.urls; Ecommerce.urls_async puts these first so they win under ASGI.
+urlpatterns = [
+    path('api/v1/categories/', async_views.CategoryListView.as_view(), name='category-list'),
+    path('api/v1/categories/tree/', async_views.CategoryTreeView.as_view(), name='category-tree'),
+    path('api/v1/categories/<int:pk>/', async_views.CategoryDetailView.as_view(), name='category-detail'),
+    path('api/v1/categories/<int:category_id>/average-price/', async_views.AveragePriceView.as_view(), name='average-price'),
+    path('api/v1/products/', async_views.ProductListView.as_view(), name='product-list'),
+    path('api/v1/products/<int:pk>/', async_views.ProductDetailView.as_view(), name='product-detail'),
+    path('api/customer/profile/', async_views.CustomerProfileView.as_view(), name='api-customer-profile'),
+]
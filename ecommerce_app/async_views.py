@@ -0,0 +1,165 @@
+"""Async versions of the catalog read endpoints and the customer profile.
+
+Routed by ``Ecommerce.urls_async``, which ``Ecommerce.asgi`` selects. Reads go
+through Django's async ORM, so a slow query (or, for the profile, a JWKS
+fetch) parks a coroutine instead of holding a whole worker. Payloads, ETags,
+the response cache and authentication match the sync DRF views; writes to the
+same URLs are handed to those views in a thread.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from django.http import HttpResponse
+from rest_framework.exceptions import APIException, AuthenticationFailed
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from . import caching, views
+from .conditional import (
+    async_conditional, category_etag, category_last_modified, category_list_etag,
+    product_etag, product_last_modified, product_list_etag, product_list_last_modified,
+)
+from .filters import ProductFilter
+from .models import Category, CategoryPriceStats, Customer, Product, build_category_tree
+from .pagination import KeysetPagination
+from .response_cache import aget_or_build, async_cache_response
+from .serializer import CategorySerializer, CustomerSerializer, ProductSerializer
+from .streaming import stream_list, wants_stream
+
+
+def json_response(data, status=200):
+    return HttpResponse(JSONRenderer().render(data), status=status, content_type='application/json')
+
+
+async def paginated_response(request, queryset, ordering, serializer_class):
+    paginator = KeysetPagination(ordering=ordering)
+    page = paginator.page_queryset(queryset, Request(request))
+    rows = paginator.paginate_rows([row async for row in page])
+    return json_response(paginator.get_paginated_payload(serializer_class(rows, many=True).data))
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncReadView(View):
+    """GET runs natively async; other methods go to ``write_view`` (a DRF APIView) in a thread."""
+    write_view = None
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            return await super().dispatch(request, *args, **kwargs)
+        except APIException as exc:
+            return json_response({'detail': exc.detail}, status=exc.status_code)
+
+    async def post(self, request, *args, **kwargs):
+        return await sync_to_async(self.write_view.as_view())(request, *args, **kwargs)
+
+    put = patch = delete = post
+
+
+class CategoryListView(AsyncReadView):
+    write_view = views.CategoryListCreateAPIView
+
+    @async_conditional(category_list_etag, category_last_modified)
+    @async_cache_response('categories')
+    async def get(self, request):
+        if wants_stream(request):
+            return stream_list(Category.objects.order_by('name', 'id'), CategorySerializer, asynchronous=True)
+        return await paginated_response(request, Category.objects.all(), ('name', 'id'), CategorySerializer)
+
+
+class CategoryTreeView(AsyncReadView):
+    write_view = views.CategoryTreeAPIView
+
+    @async_conditional(category_list_etag, category_last_modified)
+    async def get(self, request):
+        async def build():
+            rows = [row async for row in Category.objects.order_by('name').values('id', 'name', 'slug', 'parent_id')]
+            return JSONRenderer().render(build_category_tree(rows))
+
+        key = f"category-tree:{await sync_to_async(caching.get_version)('categories')}"
+        body, _ = await aget_or_build(key, build, settings.CATEGORY_TREE_CACHE_TIMEOUT, 'CategoryTreeView', ['categories'])
+        return HttpResponse(body, content_type='application/json')
+
+
+class CategoryDetailView(AsyncReadView):
+    write_view = views.CategoryDetailAPIView
+
+    @async_conditional(category_etag, category_last_modified)
+    @async_cache_response('categories')
+    async def get(self, request, pk):
+        category = await Category.objects.filter(pk=pk).afirst()
+        if category is None:
+            return json_response({'detail': 'No Category matches the given query.'}, status=404)
+        subtree = Category.objects.descendants_of(category).order_by('name').values('id', 'name', 'slug', 'parent_id')
+        data = CategorySerializer(category).data
+        data['children'] = build_category_tree([row async for row in subtree], root_parent_id=category.pk)
+        return json_response(data)
+
+
+class ProductListView(AsyncReadView):
+    write_view = views.ProductListCreateAPIView
+
+    @async_conditional(product_list_etag, product_list_last_modified)
+    @async_cache_response('products', 'stock', 'categories')
+    async def get(self, request):
+        filters = await sync_to_async(ProductFilter)(request.GET)
+        if not filters.is_valid():
+            return json_response(filters.errors, status=400)
+        queryset = filters.apply(ProductSerializer.setup_eager_loading(Product.objects.all()))
+        if wants_stream(request):
+            return stream_list(queryset.order_by(*filters.ordering), ProductSerializer, asynchronous=True)
+        return await paginated_response(request, queryset, filters.ordering, ProductSerializer)
+
+
+class ProductDetailView(AsyncReadView):
+    write_view = views.ProductDetailAPIView
+
+    @async_conditional(product_etag, product_last_modified)
+    @async_cache_response(caching.product_namespace('{pk}'), 'categories')
+    async def get(self, request, pk):
+        product = await ProductSerializer.setup_eager_loading(Product.objects.filter(pk=pk)).afirst()
+        if product is None:
+            return json_response({'detail': 'No Product matches the given query.'}, status=404)
+        return json_response(ProductSerializer(product).data)
+
+
+class AveragePriceView(AsyncReadView):
+    write_view = views.AveragePriceView
+
+    @async_cache_response('products', 'categories')
+    async def get(self, request, category_id):
+        stats = await CategoryPriceStats.objects.filter(category_id=category_id).afirst()
+        return json_response({
+            "category_id": category_id,
+            "average_price": stats.average_price if stats and stats.product_count else 0,
+            "product_count": stats.product_count if stats else 0,
+            "min_price": stats.price_min if stats else None,
+            "max_price": stats.price_max if stats else None,
+            "include_descendants": True,
+        })
+
+
+class CustomerProfileView(AsyncReadView):
+    write_view = views.CustomerProfileAPIView
+
+    async def get(self, request):
+        try:
+            user = await self.authenticate(request)
+        except AuthenticationFailed as exc:
+            # DRF answers 403 as well, since its first authentication class sends no WWW-Authenticate
+            return json_response({'detail': exc.detail}, status=403)
+        if user is None:
+            return json_response({'detail': 'Authentication credentials were not provided.'}, status=403)
+        customer = await Customer.objects.filter(user=user).afirst()
+        if customer is None:
+            return json_response({'error': 'Customer profile not found'}, status=404)
+        return json_response(CustomerSerializer(customer).data)
+
+    @staticmethod
+    async def authenticate(request):
+        """The user DRF's authentication classes (as on the sync view) resolve, or None; runs in a thread."""
+        drf_request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+        user = await sync_to_async(lambda: drf_request.user)()
+        return user if user.is_authenticated else None
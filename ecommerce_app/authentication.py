@@ -1,14 +1,13 @@
 
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
-from django.contrib.auth.models import AnonymousUser
 from django.contrib.auth import get_user_model
-from mozilla_django_oidc.utils import verify_token
 import jwt
-import requests
 from django.conf import settings
 
-from Ecommerce_project.ecommerce_app.models import Customer
+from .jwks import get_jwks_cache
+from .models import Customer
+from .token_cache import token_cache
 
 User = get_user_model()
 
@@ -25,6 +24,11 @@ class OIDCAuthentication(BaseAuthentication):
 
         token = auth_header.split(' ')[1]
 
+        # Previously verified and not yet expired: no signature check, no queries
+        user = token_cache.get(token)
+        if user is not None:
+            return (user, token)
+
         try:
             # Verify the token
             validated_token = self.verify_oidc_token(token)
@@ -36,6 +40,7 @@ class OIDCAuthentication(BaseAuthentication):
             if not user:
                 raise AuthenticationFailed('Invalid token - user not found')
 
+            token_cache.put(token, validated_token.get('exp'), user)
             return (user, token)
 
         except Exception as e:
@@ -44,20 +49,9 @@ class OIDCAuthentication(BaseAuthentication):
     def verify_oidc_token(self, token):
         """Verify the OIDC token using the provider's public key"""
         try:
-            # Get the public key from JWKS endpoint
-            jwks_response = requests.get(settings.OIDC_OP_JWKS_ENDPOINT)
-            jwks = jwks_response.json()
-
-            # Decode and verify the token
+            # Find the signing key in the process-wide JWKS cache
             unverified_header = jwt.get_unverified_header(token)
-            key_id = unverified_header.get('kid')
-
-            # Find the correct key
-            public_key = None
-            for key in jwks['keys']:
-                if key['kid'] == key_id:
-                    public_key = jwt.algorithms.RSAAlgorithm.from_jwk(key)
-                    break
+            public_key = get_jwks_cache().get_key(unverified_header.get('kid'))
 
             if not public_key:
                 return None
@@ -83,7 +77,8 @@ class OIDCAuthentication(BaseAuthentication):
 
         if sub:
             try:
-                customer = Customer.objects.get(oidc_sub=sub)
+                # select_related also fills user.customer_profile
+                customer = Customer.objects.select_related('user').get(oidc_sub=sub)
                 return customer.user
             except Customer.DoesNotExist:
                 pass
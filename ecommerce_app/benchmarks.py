@@ -0,0 +1,318 @@
+"""Synthetic catalog generator and in-process endpoint benchmarks.
+
+``generate_catalog`` bulk-loads a deep or wide category tree, products,
+customers and orders (10^5-10^6 rows in a few minutes on PostgreSQL).
+``run`` sends every endpoint in ``ecommerce_app/urls.py`` through the full
+Django stack with the test client. For each one it reports sequential
+throughput, latency percentiles and query counts. Writes are rolled back.
+``compare`` checks a run against a stored baseline. Use a dedicated
+database: generated rows are not removed.
+"""
+import json
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Max, Min
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLPattern, reverse
+
+from . import caching, rollups
+from .loadgen import percentile
+from .models import Category, Customer, Order, OrderItem, Product
+
+ProductCategory = Product.categories.through
+
+# URL names in ecommerce_app/urls.py that are deliberately not benchmarked
+SKIPPED = {
+    'login': "redirects to the OIDC provider",
+    'logout': "redirects to the OIDC provider",
+    'profile': "template view behind an OIDC session",
+    'oidc_authentication_init': "OIDC provider round trip",
+    'oidc_callback': "OIDC provider round trip",
+    'api-customer-profile': "needs an OIDC session",
+    'api-customer-update': "needs an OIDC session",
+}
+
+
+def _batches(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def generate_catalog(depth=4, fanout=6, products=100_000, customers=1_000, orders=100_000,
+                     categories_per_product=2, items_per_order=3, seed=1, batch_size=5_000, log=None):
+    """Bulk-insert a synthetic data set and return the row counts.
+
+    The tree has ``fanout`` roots and ``fanout`` children per node, ``depth``
+    levels deep. ``depth=12, fanout=2`` is deep; ``depth=1, fanout=5000`` is
+    wide. Products link to random leaves. Rollups and order totals are
+    rebuilt at the end, as the signals would have done.
+    """
+    rng = random.Random(seed)
+    log = log or (lambda message: None)
+    run_id = f"{seed}-{int(time.time())}"
+
+    parents = [None]
+    leaves = []
+    for level in range(depth):
+        nodes = [
+            Category(name=f"Category {level}.{i}", slug=f"bench-{run_id}-{level}-{i}",
+                     parent_id=parent)
+            for i, parent in enumerate(p for p in parents for _ in range(fanout))
+        ]
+        created = []
+        for batch in _batches(nodes, batch_size):
+            created += Category.objects.bulk_create(batch)
+        parents = [c.pk for c in created]
+        leaves = parents
+        log(f"level {level}: {len(created)} categories")
+    Category.objects.rebuild_paths()
+
+    product_ids, prices = [], []
+    for start in range(0, products, batch_size):
+        batch = [
+            Product(name=f"Product {run_id} {i}", description=f"Synthetic product {i}",
+                    price=Decimal(rng.randint(100, 200_000)) / 100, stock=1_000_000)
+            for i in range(start, min(start + batch_size, products))
+        ]
+        batch = Product.objects.bulk_create(batch)
+        links = [
+            ProductCategory(product_id=p.pk, category_id=category_id)
+            for p in batch
+            for category_id in set(rng.choices(leaves, k=categories_per_product))
+        ]
+        ProductCategory.objects.bulk_create(links, batch_size=batch_size)
+        product_ids += [p.pk for p in batch]
+        prices += [p.price for p in batch]
+        log(f"{len(product_ids)} products")
+
+    customer_ids = []
+    password = make_password(None)
+    for start in range(0, customers, batch_size):
+        users = User.objects.bulk_create(
+            User(username=f"bench-{run_id}-{i}", password=password)
+            for i in range(start, min(start + batch_size, customers))
+        )
+        customer_ids += [c.pk for c in Customer.objects.bulk_create(
+            Customer(user=user, first_name="Bench", last_name=f"Customer {i}",
+                     email=f"{user.username}@example.com", phone=f"07{i:08d}")
+            for i, user in enumerate(users, start)
+        )]
+    log(f"{len(customer_ids)} customers")
+
+    placed = 0
+    for start in range(0, orders, batch_size):
+        batch = Order.objects.bulk_create(
+            Order(customer_id=rng.choice(customer_ids), status='completed')
+            for _ in range(start, min(start + batch_size, orders))
+        )
+        lines = []
+        for order in batch:
+            for index in rng.sample(range(len(product_ids)), k=min(items_per_order, len(product_ids))):
+                lines.append(OrderItem(order_id=order.pk, product_id=product_ids[index],
+                                       quantity=rng.randint(1, 3), unit_price=prices[index]))
+        OrderItem.objects.bulk_create(lines, batch_size=batch_size)
+        Order.objects.filter(pk__in=[o.pk for o in batch]).recalculate_totals()
+        placed += len(batch)
+        log(f"{placed} orders")
+
+    rollups.rebuild()
+    for namespace in ('categories', 'products', 'stock'):
+        caching.bump_version(namespace)
+    return {
+        'categories': Category.objects.count(),
+        'products': Product.objects.count(),
+        'customers': Customer.objects.count(),
+        'orders': Order.objects.count(),
+        'order_items': OrderItem.objects.count(),
+    }
+
+
+@dataclass
+class Endpoint:
+    name: str
+    method: str
+    path: str
+    body: object = None
+    content_type: str = 'application/json'
+
+    @property
+    def key(self):
+        return f"{self.method} {self.name}"
+
+
+def endpoints():
+    """One or more requests for every benchmarked URL name, using rows that exist."""
+    def pick(model, order='pk'):
+        return model.objects.order_by(order).values_list('pk', flat=True).first()
+
+    category = pick(Category, 'depth')
+    deepest = pick(Category, '-depth')
+    product = pick(Product)
+    customer = pick(Customer)
+    order = Order.objects.filter(items__isnull=False).order_by('pk').values_list('pk', flat=True).first()
+    item = pick(OrderItem)
+    lines = list(Product.objects.order_by('pk').values_list('pk', 'price')[:3])
+    bounds = Product.objects.aggregate(low=Min('price'), high=Max('price'))
+    middle = ((bounds['low'] or 0) + (bounds['high'] or 0)) / 2
+
+    result = [
+        Endpoint('category-list', 'GET', reverse('category-list')),
+        Endpoint('category-tree', 'GET', reverse('category-tree')),
+        Endpoint('product-list', 'GET', reverse('product-list')),
+        Endpoint('product-list', 'GET', f"{reverse('product-list')}?sort=-price&max_price={middle:.2f}"),
+        Endpoint('product-search', 'GET', f"{reverse('product-search')}?q=product"),
+        Endpoint('product-facets', 'GET', reverse('product-facets')),
+        Endpoint('customer-list', 'GET', reverse('customer-list')),
+        Endpoint('order-list', 'GET', reverse('order-list')),
+        Endpoint('order-revenue', 'GET', reverse('order-revenue')),
+        Endpoint('order-item-list', 'GET', reverse('order-item-list')),
+        Endpoint('metrics', 'GET', reverse('metrics')),
+        Endpoint('category-list', 'POST', reverse('category-list'), {'name': "Benchmark category"}),
+        Endpoint('product-bulk', 'POST', reverse('product-bulk'),
+                 ''.join(json.dumps({'name': f"Bulk {i}", 'price': '9.99'}) + '\n' for i in range(100)),
+                 'application/x-ndjson'),
+    ]
+    if category:
+        result += [
+            Endpoint('category-detail', 'GET', reverse('category-detail', args=[category])),
+            Endpoint('average-price', 'GET', reverse('average-price', args=[category])),
+            Endpoint('product-list', 'GET', f"{reverse('product-list')}?category={category}&in_stock=true"),
+        ]
+    if deepest and deepest != category:
+        result.append(Endpoint('category-detail', 'GET', reverse('category-detail', args=[deepest])))
+    if product:
+        result += [
+            Endpoint('product-detail', 'GET', reverse('product-detail', args=[product])),
+            Endpoint('product-list', 'POST', reverse('product-list'),
+                     {'name': "Benchmark product", 'price': '5.00', 'stock': 1, 'categories': []}),
+        ]
+    if customer:
+        result.append(Endpoint('customer-detail', 'GET', reverse('customer-detail', args=[customer])))
+        if lines:
+            result.append(Endpoint('order-list', 'POST', reverse('order-list'), {
+                'customer': customer,
+                'items': [{'product': pk, 'quantity': 1, 'unit_price': str(price)} for pk, price in lines],
+            }))
+    if order:
+        result.append(Endpoint('order-detail', 'GET', reverse('order-detail', args=[order])))
+    if item:
+        result.append(Endpoint('order-item-detail', 'GET', reverse('order-item-detail', args=[item])))
+    return result
+
+
+def uncovered_url_names():
+    """Named routes of ecommerce_app.urls that neither ``endpoints()`` nor ``SKIPPED`` account for."""
+    from . import urls
+    names = {p.name for p in urls.urlpatterns if isinstance(p, URLPattern) and p.name}
+    return names - {e.name for e in endpoints()} - set(SKIPPED)
+
+
+def _request(client, endpoint):
+    body = endpoint.body
+    if isinstance(body, (dict, list)):
+        body = json.dumps(body)
+    if endpoint.method == 'GET':
+        return client.get(endpoint.path)
+    # Writes are measured inside a transaction that is rolled back afterwards
+    with transaction.atomic():
+        response = client.generic(endpoint.method, endpoint.path, body or '', content_type=endpoint.content_type)
+        transaction.set_rollback(True)
+    return response
+
+
+def measure(client, endpoint, iterations=50, warmup=5, cold=False):
+    for _ in range(warmup):
+        _request(client, endpoint)
+    latencies, queries, statuses = [], [], set()
+    total = 0.0
+    for _ in range(iterations):
+        if cold:
+            cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = _request(client, endpoint)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            elapsed = time.perf_counter() - started
+        total += elapsed
+        latencies.append(elapsed * 1000)
+        queries.append(len(captured))
+        statuses.add(response.status_code)
+    latencies.sort()
+    return {
+        'method': endpoint.method,
+        'path': endpoint.path,
+        'status': sorted(statuses),
+        'requests': iterations,
+        'rps': round(iterations / total, 1) if total else None,
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+        'queries': max(queries),
+        'queries_mean': round(sum(queries) / len(queries), 2),
+    }
+
+
+def run(iterations=50, warmup=5, cold=False, only=None, log=None):
+    """Benchmark every endpoint (or those whose URL name is in ``only``); return the JSON-able report."""
+    log = log or (lambda message: None)
+    client = Client()
+    results = {}
+    with override_settings(ALLOWED_HOSTS=['testserver']):
+        selected = [e for e in endpoints() if not only or e.name in only]
+        # Reads first: the rolled-back writes still bump cache versions
+        for endpoint in sorted(selected, key=lambda e: e.method != 'GET'):
+            key = endpoint.key if endpoint.key not in results else f"{endpoint.key} {endpoint.path}"
+            results[key] = measure(client, endpoint, iterations, warmup, cold)
+            log(f"{key}: p95 {results[key]['p95_ms']} ms, {results[key]['queries']} queries")
+    return {
+        'meta': {
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'database': connection.vendor,
+            'iterations': iterations,
+            'cache': 'cold' if cold else 'warm',
+            'rows': {
+                'categories': Category.objects.count(),
+                'products': Product.objects.count(),
+                'orders': Order.objects.count(),
+            },
+        },
+        'endpoints': results,
+    }
+
+
+def compare(report, baseline, tolerance=0.25, min_delta_ms=1.0):
+    """Regressions of ``report`` against ``baseline``, as human-readable lines.
+
+    Flags a p95 latency more than ``tolerance`` (and ``min_delta_ms``) worse,
+    any increase in the worst-case query count, and changed status codes.
+    """
+    problems = []
+    base_endpoints = baseline.get('endpoints', {})
+    for key, current in report['endpoints'].items():
+        base = base_endpoints.get(key)
+        if base is None:
+            continue
+        delta = current['p95_ms'] - base['p95_ms']
+        if delta > min_delta_ms and current['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            problems.append(f"{key}: p95 {base['p95_ms']} -> {current['p95_ms']} ms")
+        if current['queries'] > base['queries']:
+            problems.append(f"{key}: queries {base['queries']} -> {current['queries']}")
+        if current['status'] != base['status']:
+            problems.append(f"{key}: status {base['status']} -> {current['status']}")
+    return problems
@@ -0,0 +1,79 @@
+"""Version counters used to key cached catalog data.
+
+Bumping a namespace's version makes every entry keyed under the old value
+unreachable, so writers never need to know which keys readers produced.
+That only holds if every process sees the same counters: with a
+process-local cache backend, ``enabled()`` is False and callers skip the
+version-keyed caches (see ``CACHE_ALLOW_PROCESS_LOCAL``).
+"""
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def is_shared():
+    """Whether the default cache is the same for every process (workers, commands, the outbox worker)."""
+    return settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_BACKENDS
+
+
+def enabled():
+    """Whether version-keyed caching (responses, ETags, verified tokens) may be used."""
+    return is_shared() or settings.CACHE_ALLOW_PROCESS_LOCAL
+
+
+def _version_key(namespace):
+    return f"version:{namespace}"
+
+
+def _modified_key(namespace):
+    return f"modified:{namespace}"
+
+
+def get_version(namespace):
+    version = cache.get(_version_key(namespace))
+    if version is None:
+        # Seed from the clock so an evicted counter never reuses an old value.
+        cache.add(_version_key(namespace), int(time.time() * 1000), timeout=None)
+        version = cache.get(_version_key(namespace))
+    return version
+
+
+def bump_version(namespace):
+    cache.set(_modified_key(namespace), time.time(), timeout=None)
+    try:
+        return cache.incr(_version_key(namespace))
+    except ValueError:
+        cache.add(_version_key(namespace), int(time.time() * 1000), timeout=None)
+        return cache.get(_version_key(namespace))
+
+
+def bump_on_commit(*namespaces):
+    """Bump ``namespaces`` once the current transaction commits (at once outside one).
+
+    Bumping earlier lets a concurrent reader fetch the new version, query
+    the rows as they were before the commit and cache them under it.
+    """
+    def bump():
+        for namespace in namespaces:
+            bump_version(namespace)
+    transaction.on_commit(bump)
+
+
+def last_modified(namespace):
+    """When ``namespace`` was last bumped, or None if that is not known."""
+    stamp = cache.get(_modified_key(namespace))
+    return datetime.fromtimestamp(stamp, tz=timezone.utc) if stamp is not None else None
+
+
+def product_namespace(pk):
+    """Per-product namespace, bumped by every write that changes that product's payload."""
+    return f"product:{pk}"
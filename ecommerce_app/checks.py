@@ -0,0 +1,16 @@
+from django.core.checks import Tags, Warning, register
+
+from . import caching
+
+
+@register(Tags.caches)
+def shared_cache_check(app_configs, **kwargs):
+    if caching.enabled():
+        return []
+    return [Warning(
+        "The default cache is process-local, so the response cache, ETags and the verified-token "
+        "cache are disabled.",
+        hint="Set REDIS_URL (or CACHE_BACKEND/CACHE_LOCATION) to a cache every process shares, or "
+             "CACHE_ALLOW_PROCESS_LOCAL=true for a single-process server.",
+        id='ecommerce_app.W001',
+    )]
@@ -0,0 +1,114 @@
+"""ETag / Last-Modified validators for the catalog views.
+
+Each validator costs at most one indexed lookup (details) or a few cache
+reads (lists), never serialization, so ``django.views.decorators.http.condition``
+can answer a matching ``If-None-Match`` / ``If-Modified-Since`` with a 304
+before the view body runs. List tags are weak: they change whenever any
+product (or category) changes, not only rows on the requested page.
+"""
+import functools
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+
+from . import caching
+from .models import Product
+
+PRODUCT_NAMESPACES = ('products', 'stock', 'categories')
+CATEGORY_NAMESPACES = ('categories',)
+
+
+def _versions(namespaces):
+    return '-'.join(str(caching.get_version(namespace)) for namespace in namespaces)
+
+
+def _latest(namespaces):
+    stamps = [stamp for stamp in map(caching.last_modified, namespaces) if stamp is not None]
+    return max(stamps) if stamps else None
+
+
+def _query_hash(request):
+    return hashlib.md5(request.META.get('QUERY_STRING', '').encode('utf-8')).hexdigest()[:12]
+
+
+def _product_updated_at(request, pk):
+    # condition() asks for the ETag and Last-Modified separately; look the row up once
+    cached = getattr(request, '_product_updated_at', None)
+    if cached is None or cached[0] != pk:
+        cached = (pk, Product.objects.filter(pk=pk).values_list('updated_at', flat=True).first())
+        request._product_updated_at = cached
+    return cached[1]
+
+
+def _product_namespaces(pk):
+    return ('categories', caching.product_namespace(pk))
+
+
+def product_etag(request, pk):
+    updated_at = _product_updated_at(request, pk)
+    if updated_at is None:
+        return None
+    # category names are embedded in the payload, and stock moved on a shard leaves
+    # updated_at alone, so both versions must change the tag too
+    return f'"product-{pk}-{updated_at.timestamp():.6f}-{_versions(_product_namespaces(pk))}"'
+
+
+def product_last_modified(request, pk):
+    updated_at = _product_updated_at(request, pk)
+    if updated_at is None:
+        return None
+    changed = _latest(_product_namespaces(pk))
+    return max(updated_at, changed) if changed else updated_at
+
+
+def product_list_etag(request):
+    return f'W/"products-{_versions(PRODUCT_NAMESPACES)}-{_query_hash(request)}"'
+
+
+def product_list_last_modified(request):
+    return _latest(PRODUCT_NAMESPACES)
+
+
+def category_etag(request, pk):
+    return f'W/"category-{pk}-{_versions(CATEGORY_NAMESPACES)}"'
+
+
+def category_list_etag(request):
+    return f'W/"categories-{_versions(CATEGORY_NAMESPACES)}-{_query_hash(request)}"'
+
+
+def category_last_modified(request, pk=None):
+    return _latest(CATEGORY_NAMESPACES)
+
+
+def _when_enabled(func):
+    # Validators built on process-local versions would answer 304 for data another process changed
+    def validator(request, *args, **kwargs):
+        return func(request, *args, **kwargs) if caching.enabled() else None
+    return validator
+
+
+def conditional(etag_func, last_modified_func):
+    """``condition`` for an APIView method; a no-op without a shared cache."""
+    return method_decorator(condition(etag_func=_when_enabled(etag_func),
+                                      last_modified_func=_when_enabled(last_modified_func)))
+
+
+def async_conditional(etag_func, last_modified_func):
+    """``conditional`` for an async view method; the validators (queries, cache reads) run in a thread."""
+    def decorator(method):
+        @functools.wraps(method)
+        async def wrapper(view, request, *args, **kwargs):
+            def validators():
+                return (_when_enabled(etag_func)(request, *args, **kwargs),
+                        _when_enabled(last_modified_func)(request, *args, **kwargs))
+            etag, modified = await sync_to_async(validators)()
+
+            async def view_func(request, *args, **kwargs):
+                return await method(view, request, *args, **kwargs)
+            return await condition(etag_func=lambda *a, **kw: etag,
+                                   last_modified_func=lambda *a, **kw: modified)(view_func)(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,34 @@
+"""Introspection of the database connection pools (see ``DB_POOL`` in settings)."""
+from django.db import connections
+
+
+def get_pool(alias='default'):
+    """The psycopg pool behind ``alias``, or None when that database is not pooled."""
+    return getattr(connections[alias], 'pool', None)
+
+
+def pool_stats(alias='default'):
+    """Pool size and wait counters for ``alias`` in this process, or None when not pooled.
+
+    ``requests_waiting`` is the current queue for a connection; ``requests_wait_ms``
+    and ``requests_num`` accumulate, so their ratio is the mean wait per checkout.
+    ``requests_errors`` counts checkouts that hit ``DB_POOL_TIMEOUT``.
+    """
+    pool = get_pool(alias)
+    if pool is None:
+        return None
+    stats = {
+        'pool_min': pool.min_size,
+        'pool_max': pool.max_size,
+        'pool_size': 0,
+        'pool_available': 0,
+        'requests_waiting': 0,
+        'requests_num': 0,
+        'requests_queued': 0,
+        'requests_wait_ms': 0,
+        'requests_errors': 0,
+        'connections_num': 0,
+        'connections_errors': 0,
+    }
+    stats.update(pool.get_stats())
+    return stats
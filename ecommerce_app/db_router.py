@@ -0,0 +1,185 @@
+"""Send read traffic to replica databases (``DATABASE_REPLICA_URLS``).
+
+Reads go to a replica only inside ``replica_reads()``, which the middleware
+enters for GET/HEAD/OPTIONS requests. Everything else (writes, transactions,
+management commands, the outbox worker) uses the primary. A replica further
+behind than ``REPLICA_MAX_LAG`` seconds, or one that cannot be reached, is
+skipped. A client that has just written reads from the primary for
+``REPLICA_STICKY_SECONDS``, so it always sees its own writes.
+"""
+import contextlib
+import contextvars
+import logging
+import random
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+from . import caching
+
+PRIMARY = 'default'
+STICKY_COOKIE = 'primary_until'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+logger = logging.getLogger(__name__)
+
+# None: primary only; otherwise a mutable state dict for the current request
+_state = contextvars.ContextVar('replica_reads', default=None)
+
+_lag = {}  # alias -> (checked_at, lag in seconds or None if unreachable)
+_lag_lock = threading.Lock()
+
+LAG_SQL = {
+    # Zero when everything received has been replayed, otherwise the age of the last replayed commit
+    'postgresql': """
+        SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END
+    """,
+}
+
+
+@contextlib.contextmanager
+def replica_reads():
+    """Let reads in this block go to a replica (until something is written)."""
+    token = _state.set({'wrote': False})
+    try:
+        yield
+    finally:
+        _state.reset(token)
+
+
+@contextlib.contextmanager
+def use_primary():
+    """Read from the primary inside this block."""
+    token = _state.set(None)
+    try:
+        yield
+    finally:
+        _state.reset(token)
+
+
+def primary_if_recently_changed(*namespaces):
+    """``use_primary()`` if a cache namespace was bumped within ``REPLICA_STICKY_SECONDS``.
+
+    Wrap code that caches what it reads: a lagging replica could otherwise
+    store pre-write data under the post-write version.
+    """
+    if settings.DATABASE_REPLICAS and _state.get() is not None:
+        cutoff = time.time() - settings.REPLICA_STICKY_SECONDS
+        if any((modified := caching.last_modified(ns)) and modified.timestamp() > cutoff for ns in namespaces):
+            return use_primary()
+    return contextlib.nullcontext()
+
+
+def wrote_in_request():
+    state = _state.get()
+    return bool(state and state['wrote'])
+
+
+def replica_lag(alias):
+    """Seconds ``alias`` is behind the primary (0 if the backend cannot tell), or None if unreachable."""
+    sql = LAG_SQL.get(connections[alias].vendor)
+    if sql is None:
+        return 0.0
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute(sql)
+            return float(cursor.fetchone()[0] or 0)
+    except DatabaseError:
+        logger.warning("Replica %s is unreachable", alias, exc_info=True)
+        return None
+
+
+def _current_lag(alias):
+    now = time.monotonic()
+    checked_at, lag = _lag.get(alias, (None, None))
+    if checked_at is None or now - checked_at >= settings.REPLICA_LAG_CHECK_INTERVAL:
+        with _lag_lock:
+            checked_at, lag = _lag.get(alias, (None, None))
+            if checked_at is None or now - checked_at >= settings.REPLICA_LAG_CHECK_INTERVAL:
+                lag = replica_lag(alias)
+                _lag[alias] = (now, lag)
+    return lag
+
+
+def healthy_replicas():
+    return [
+        alias for alias in settings.DATABASE_REPLICAS
+        if (lag := _current_lag(alias)) is not None and lag <= settings.REPLICA_MAX_LAG
+    ]
+
+
+def reset_lag_checks():
+    with _lag_lock:
+        _lag.clear()
+
+
+class ReplicaRouter:
+    """Reads to a healthy replica when allowed, writes (and reads after them) to the primary."""
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state['wrote'] or connections[PRIMARY].in_atomic_block:
+            return PRIMARY
+        replicas = healthy_replicas()
+        return random.choice(replicas) if replicas else PRIMARY
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state['wrote'] = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """Route a request's reads to replicas when it is safe and the client has not just written."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.reads_from_replica(request):
+            return self.finish(self.get_response(request), wrote=request.method not in SAFE_METHODS)
+        with replica_reads():
+            response = self.get_response(request)
+            return self.finish(response, wrote=wrote_in_request())
+
+    async def __acall__(self, request):
+        if not self.reads_from_replica(request):
+            return self.finish(await self.get_response(request), wrote=request.method not in SAFE_METHODS)
+        with replica_reads():
+            response = await self.get_response(request)
+            return self.finish(response, wrote=wrote_in_request())
+
+    @staticmethod
+    def reads_from_replica(request):
+        if not settings.DATABASE_REPLICAS or request.method not in SAFE_METHODS:
+            return False
+        try:
+            return float(request.COOKIES.get(STICKY_COOKIE, 0)) < time.time()
+        except ValueError:
+            return True
+
+    @staticmethod
+    def finish(response, wrote):
+        if wrote and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                STICKY_COOKIE, f"{time.time() + settings.REPLICA_STICKY_SECONDS:.3f}",
+                max_age=settings.REPLICA_STICKY_SECONDS, httponly=True, samesite='Lax',
+            )
+        return response
@@ -0,0 +1,153 @@
+"""Product filtering, sorting and facet counts for catalog browsing.
+
+Filters: ``category`` (id, whole subtree), ``min_price``/``max_price``,
+``in_stock`` and ``sort``. Facets follow the usual convention of ignoring
+their own filter, so a client can see how many products each alternative
+would give. Every facet is one aggregate query, however many categories or
+buckets there are.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db.models import Count, Exists, OuterRef, Q
+from django.db.models.functions import Substr
+
+from .models import PATH_STEP, Category, Product, StockShard, path_to_ids
+
+ProductCategory = Product.categories.through
+
+SORTS = {
+    'name': ('name', 'id'),
+    '-name': ('-name', '-id'),
+    'price': ('price', 'id'),
+    '-price': ('-price', '-id'),
+    'newest': ('-created_at', '-id'),
+}
+TRUE_VALUES = ('1', 'true', 'yes')
+FALSE_VALUES = ('0', 'false', 'no', '')
+# One materialized-path segment: the zero-padded id plus its '/'.
+SEGMENT = PATH_STEP + 1
+
+
+def in_stock_q():
+    """Stock on the product row or on any of its shards."""
+    return Q(stock__gt=0) | Exists(StockShard.objects.filter(product=OuterRef('pk'), quantity__gt=0))
+
+
+class ProductFilter:
+
+    def __init__(self, params):
+        self.errors = {}
+        self.category = None
+        self.min_price = self._price(params, 'min_price')
+        self.max_price = self._price(params, 'max_price')
+
+        category_id = params.get('category')
+        if category_id:
+            if category_id.isdigit():
+                self.category = Category.objects.filter(pk=category_id).first()
+            if self.category is None:
+                self.errors['category'] = f"Unknown category {category_id!r}."
+
+        in_stock = params.get('in_stock', '').lower()
+        if in_stock not in TRUE_VALUES + FALSE_VALUES:
+            self.errors['in_stock'] = "Expected true or false."
+        self.in_stock = in_stock in TRUE_VALUES
+
+        self.sort = params.get('sort') or 'name'
+        if self.sort not in SORTS:
+            self.errors['sort'] = f"Expected one of {', '.join(SORTS)}."
+
+    def _price(self, params, name):
+        value = params.get(name)
+        if not value:
+            return None
+        try:
+            price = Decimal(value)
+        except InvalidOperation:
+            price = None
+        if price is None or not price.is_finite():
+            self.errors[name] = "Expected a number."
+            return None
+        return price
+
+    def is_valid(self):
+        return not self.errors
+
+    @property
+    def ordering(self):
+        return SORTS[self.sort]
+
+    def price_q(self):
+        q = Q()
+        if self.min_price is not None:
+            q &= Q(price__gte=self.min_price)
+        if self.max_price is not None:
+            q &= Q(price__lte=self.max_price)
+        return q
+
+    def stock_q(self):
+        return in_stock_q() if self.in_stock else Q()
+
+    def apply(self, queryset, exclude=()):
+        """Apply every filter not named in ``exclude`` ('category', 'price', 'in_stock')."""
+        if self.category is not None and 'category' not in exclude:
+            queryset = queryset.in_category(self.category)
+        if 'price' not in exclude:
+            queryset = queryset.filter(self.price_q())
+        if 'in_stock' not in exclude:
+            queryset = queryset.filter(self.stock_q())
+        return queryset
+
+    def facets(self, queryset=None):
+        queryset = Product.objects.all() if queryset is None else queryset
+        totals = self._totals(queryset)
+        return {
+            'count': totals.pop('count'),
+            'in_stock': totals.pop('in_stock'),
+            'categories': self._category_counts(queryset),
+            'price_ranges': [
+                {'min': low, 'max': high, 'count': totals[f'bucket_{i}']}
+                for i, (low, high) in enumerate(price_buckets())
+            ],
+        }
+
+    def _category_counts(self, queryset):
+        """Distinct matching products under each child of the selected category (or each root)."""
+        parent = self.category
+        depth = parent.depth + 1 if parent else 0
+        links = ProductCategory.objects.filter(product_id__in=self.apply(queryset).values('pk'))
+        if parent:
+            links = links.filter(category__path__startswith=parent.path, category__depth__gte=depth)
+        counts = dict(
+            links.annotate(branch=Substr('category__path', 1, (depth + 1) * SEGMENT))
+            .values('branch').order_by().annotate(count=Count('product_id', distinct=True))
+            .values_list('branch', 'count')
+        )
+        counts = {path_to_ids(branch)[-1]: count for branch, count in counts.items()}
+
+        children = Category.objects.filter(parent=parent).order_by('name', 'id')
+        return [
+            {'id': child.id, 'name': child.name, 'slug': child.slug, 'count': counts.get(child.id, 0)}
+            for child in children.only('id', 'name', 'slug')
+        ]
+
+    def _totals(self, queryset):
+        """Total, in-stock and per-price-bucket counts in one aggregate query."""
+        base = self.apply(queryset, exclude=('price', 'in_stock'))
+        price_q, stock_q = self.price_q(), self.stock_q()
+
+        def count(q):
+            return Count('pk', filter=q) if q else Count('pk')
+
+        aggregates = {'count': count(price_q & stock_q), 'in_stock': count(price_q & in_stock_q())}
+        for i, (low, high) in enumerate(price_buckets()):
+            bucket = Q(price__gte=low) & (Q(price__lt=high) if high is not None else Q())
+            aggregates[f'bucket_{i}'] = count(bucket & stock_q)
+        return base.aggregate(**aggregates)
+
+
+def price_buckets():
+    """``(low, high)`` pairs from ``PRODUCT_PRICE_BUCKETS``; the last one is open-ended."""
+    bounds = [Decimal(0)] + [Decimal(bound) for bound in settings.PRODUCT_PRICE_BUCKETS]
+    return list(zip(bounds, bounds[1:] + [None]))
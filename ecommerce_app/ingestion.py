@@ -0,0 +1,252 @@
+"""Streaming bulk product ingestion (NDJSON or CSV).
+
+Rows are validated in Python, category references are resolved against an
+in-memory index of the tree, and each chunk is written with ``bulk_create``/
+``bulk_update`` plus one bulk insert into the product-category table. Bad
+rows are reported with their row number and never abort the rest of a feed.
+"""
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import caching, inventory, rollups
+from .models import Category, Product, path_to_ids
+
+ProductCategory = Product.categories.through
+
+UPSERT_KEYS = ('name', 'id')
+CATEGORY_PATH_SEPARATOR = '>'
+CSV_CATEGORY_SEPARATOR = '|'
+MAX_REPORTED_ERRORS = 1000
+# Largest value a PositiveIntegerField holds on every backend
+MAX_STOCK = 2147483647
+
+
+def parse_ndjson(lines):
+    """Yield ``(row_number, row_or_None, error_or_None)`` for each non-blank line."""
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield number, None, f"invalid JSON: {exc}"
+            continue
+        if not isinstance(row, dict):
+            yield number, None, "expected a JSON object"
+            continue
+        yield number, row, None
+
+
+def parse_csv(lines):
+    """Like ``parse_ndjson``; the ``categories`` column holds ``|``-separated references."""
+    for number, row in enumerate(csv.DictReader(lines), start=1):
+        if row.get('categories') is not None:
+            row['categories'] = [ref.strip() for ref in row['categories'].split(CSV_CATEGORY_SEPARATOR) if ref.strip()]
+        yield number, row, None
+
+
+PARSERS = {'ndjson': parse_ndjson, 'csv': parse_csv}
+
+
+class CategoryIndex:
+    """Resolves category ids and "A > B > C" name paths without per-row queries."""
+
+    def __init__(self):
+        rows = list(Category.objects.values_list('id', 'name', 'parent_id', 'path'))
+        by_id = {pk: (name, parent_id) for pk, name, parent_id, _ in rows}
+        self.paths = {pk: path for pk, _, _, path in rows}
+        self.ids = set(by_id)
+        self.by_path = {}
+        for pk in by_id:
+            names, node = [], pk
+            while node is not None:
+                name, node = by_id[node]
+                names.append(name.strip().lower())
+            self.by_path.setdefault(tuple(reversed(names)), pk)
+
+    def resolve(self, ref):
+        if isinstance(ref, int) or (isinstance(ref, str) and ref.strip().isdigit()):
+            pk = int(ref)
+            return pk if pk in self.ids else None
+        if isinstance(ref, str):
+            names = tuple(part.strip().lower() for part in ref.split(CATEGORY_PATH_SEPARATOR))
+            return self.by_path.get(names)
+        return None
+
+
+class ProductIngestor:
+
+    def __init__(self, key='name', chunk_size=None):
+        if key not in UPSERT_KEYS:
+            raise ValueError(f"key must be one of {UPSERT_KEYS}")
+        self.key = key
+        self.chunk_size = chunk_size or settings.INGEST_CHUNK_SIZE
+        self.created = self.updated = self.error_count = 0
+        self.errors = []
+        self._categories = None
+        self._touched_categories = set()
+
+    def ingest(self, parsed_rows):
+        """Consume ``(row_number, row, error)`` tuples and return the report."""
+        chunk = []
+        for number, row, error in parsed_rows:
+            if error:
+                self._error(number, error)
+                continue
+            chunk.append((number, row))
+            if len(chunk) >= self.chunk_size:
+                self._write_chunk(chunk)
+                chunk = []
+        if chunk:
+            self._write_chunk(chunk)
+
+        # bulk writes skip signals, so refresh the affected rollups once at the end
+        rollups.refresh(self._touched_categories)
+        if self.created or self.updated:
+            caching.bump_on_commit('products')
+        return self.report()
+
+    def report(self):
+        return {
+            'created': self.created,
+            'updated': self.updated,
+            'error_count': self.error_count,
+            'errors': self.errors,
+        }
+
+    def _error(self, number, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': number, 'error': message})
+
+    def _clean(self, row):
+        """Return ``(values, category_ids_or_None)``; raises ValueError with a message.
+
+        Only fields present in the row are returned, so an update leaves the
+        other columns (and categories) of an existing product untouched.
+        """
+        values = {}
+        if 'name' in row or self.key == 'name':
+            name = str(row.get('name') or '').strip()
+            if not name:
+                raise ValueError("name is required")
+            if len(name) > 255:
+                raise ValueError("name is longer than 255 characters")
+            values['name'] = name
+        if 'description' in row:
+            values['description'] = str(row['description'] or '')
+
+        if 'price' in row:
+            try:
+                price = Decimal(str(row['price'])).quantize(Decimal('0.01'))
+            except InvalidOperation:
+                raise ValueError(f"invalid price {row['price']!r}")
+            if not price.is_finite():
+                raise ValueError(f"invalid price {row['price']!r}")
+            if price < 0 or price.adjusted() >= 8:
+                raise ValueError(f"price out of range {row['price']!r}")
+            values['price'] = price
+
+        if 'stock' in row:
+            try:
+                stock = int(row['stock'] or 0)
+            except (TypeError, ValueError, OverflowError):
+                raise ValueError(f"invalid stock {row['stock']!r}")
+            if stock < 0:
+                raise ValueError("stock must not be negative")
+            if stock > MAX_STOCK:
+                raise ValueError(f"stock out of range {row['stock']!r}")
+            values['stock'] = stock
+
+        if self.key == 'id':
+            try:
+                values['id'] = int(row['id'])
+            except (KeyError, TypeError, ValueError):
+                raise ValueError("id is required when upserting on id")
+
+        category_ids = None
+        if 'categories' in row:
+            refs = row['categories'] or []
+            if not isinstance(refs, list):
+                refs = [refs]
+            category_ids = []
+            for ref in refs:
+                pk = self._categories.resolve(ref)
+                if pk is None:
+                    raise ValueError(f"unknown category {ref!r}")
+                category_ids.append(pk)
+        return values, category_ids
+
+    def _write_chunk(self, chunk):
+        if self._categories is None:
+            self._categories = CategoryIndex()
+
+        cleaned = {}
+        for number, row in chunk:
+            try:
+                values, category_ids = self._clean(row)
+            except ValueError as exc:
+                self._error(number, str(exc))
+                continue
+            # a later row for the same key replaces an earlier one in the chunk
+            cleaned[values[self.key]] = (number, values, category_ids)
+        if not cleaned:
+            return
+
+        existing = {
+            getattr(product, self.key): product
+            for product in Product.objects.filter(**{f'{self.key}__in': list(cleaned)}).order_by('-id')
+        }
+        now = timezone.now()
+        to_create, to_update, links, stock_levels = [], [], {}, {}
+        for key_value, (number, values, category_ids) in cleaned.items():
+            product = existing.get(key_value)
+            if product is None:
+                if self.key == 'id':
+                    self._error(number, f"no product with id {key_value}")
+                    continue
+                product = Product(**values)
+                to_create.append(product)
+            else:
+                if 'stock' in values:
+                    # Written through inventory so sharded products keep their counters
+                    stock_levels[product.pk] = values.pop('stock')
+                for field, value in values.items():
+                    setattr(product, field, value)
+                product.updated_at = now
+                to_update.append(product)
+            if category_ids is not None:
+                links[id(product)] = (product, category_ids)
+
+        with transaction.atomic():
+            updated_ids = [product.pk for product in to_update]
+            before = rollups.coverage(updated_ids)
+            for covered in before.values():
+                self._touched_categories |= covered
+
+            Product.objects.bulk_create(to_create, batch_size=1000)
+            Product.objects.bulk_update(
+                to_update, ['name', 'description', 'price', 'updated_at'], batch_size=1000
+            )
+            inventory.set_stock_levels(stock_levels)
+
+            relinked = [product.pk for product, _ in links.values() if product.pk in before]
+            ProductCategory.objects.filter(product_id__in=relinked).delete()
+            ProductCategory.objects.bulk_create([
+                ProductCategory(product_id=product.pk, category_id=category_id)
+                for product, category_ids in links.values()
+                for category_id in dict.fromkeys(category_ids)
+            ], batch_size=1000, ignore_conflicts=True)
+
+            for _, category_ids in links.values():
+                for category_id in category_ids:
+                    self._touched_categories.update(path_to_ids(self._categories.paths[category_id]))
+
+        self.created += len(to_create)
+        self.updated += len(to_update)
+        caching.bump_on_commit(*[caching.product_namespace(pk) for pk in updated_ids])
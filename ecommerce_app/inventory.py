@@ -0,0 +1,276 @@
+"""Stock reservations without row locks held across a checkout.
+
+Every take is a conditional ``UPDATE ... SET n = n - q WHERE n >= q``: the
+database checks and decrements in one statement, so stock can never go
+negative and no ``select_for_update`` is needed. A hot product can be split
+over several counters (``Product.stock`` plus ``StockShard`` rows); each take
+starts at a random counter, so concurrent checkouts of a best-seller mostly
+touch different rows instead of queueing on one.
+"""
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, OuterRef, PositiveIntegerField, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Now
+from django.utils import timezone
+
+from . import caching
+from .models import Order, Product, StockReservation, StockShard
+
+COMMITTED_ORDER_STATUSES = ('processing', 'shipped', 'completed')
+
+
+class InsufficientStock(Exception):
+
+    def __init__(self, product_id, requested):
+        self.product_id = product_id
+        self.requested = requested
+        super().__init__(f"Insufficient stock for product {product_id} (requested {requested}).")
+
+
+def _counter(product_id, shard):
+    """Return ``(queryset, field, extra)``; writes to ``Product.stock`` also touch ``updated_at``."""
+    if shard == 0:
+        return Product.objects.filter(pk=product_id), 'stock', {'updated_at': Now()}
+    return StockShard.objects.filter(product_id=product_id, index=shard), 'quantity', {}
+
+
+def _stock_changed(product_ids):
+    # Stock is part of product payloads; move the versions readers key on once the write is visible
+    caching.bump_on_commit('stock', *[caching.product_namespace(pk) for pk in product_ids])
+
+
+def _decrement(product_id, shard, quantity):
+    queryset, field, extra = _counter(product_id, shard)
+    if queryset.filter(**{f'{field}__gte': quantity}).update(**{field: F(field) - quantity}, **extra) == 1:
+        _stock_changed([product_id])
+        return True
+    return False
+
+
+def _increment(product_id, shard, quantity):
+    queryset, field, extra = _counter(product_id, shard)
+    if queryset.update(**{field: F(field) + quantity}, **extra):
+        _stock_changed([product_id])
+    elif shard:
+        # The shard was merged away since the units were taken
+        _increment(product_id, 0, quantity)
+
+
+def _levels(product_id):
+    levels = dict(StockShard.objects.filter(product_id=product_id).values_list('index', 'quantity'))
+    levels[0] = Product.objects.filter(pk=product_id).values_list('stock', flat=True).first() or 0
+    return levels
+
+
+def _take(product, quantity):
+    """Decrement ``quantity`` units across the product's counters; return ``[(shard, qty)]``."""
+    shards = max(product.stock_shards, 1)
+    start = random.randrange(shards)
+    order = [(start + i) % shards for i in range(shards)]
+    for shard in order:
+        if _decrement(product.pk, shard, quantity):
+            return [(shard, quantity)]
+    if shards == 1:
+        raise InsufficientStock(product.pk, quantity)
+
+    # No single counter holds enough: gather from several, giving back on failure
+    levels = _levels(product.pk)
+    taken, remaining = [], quantity
+    for shard in order:
+        amount = min(remaining, levels.get(shard, 0))
+        if amount and _decrement(product.pk, shard, amount):
+            taken.append((shard, amount))
+            remaining -= amount
+        if not remaining:
+            return taken
+    for shard, amount in taken:
+        _increment(product.pk, shard, amount)
+    raise InsufficientStock(product.pk, quantity)
+
+
+def _take_unsharded(wanted):
+    """Decrement several single-counter products with one conditional UPDATE, all or nothing."""
+    amount = Case(*[When(pk=pk, then=Value(quantity)) for pk, quantity in wanted.items()],
+                  output_field=PositiveIntegerField())
+    with transaction.atomic():
+        updated = Product.objects.filter(pk__in=wanted, stock__gte=amount).update(
+            stock=F('stock') - amount, updated_at=Now())
+        if updated == len(wanted):
+            _stock_changed(list(wanted))
+            return
+        transaction.set_rollback(True)
+
+    levels = dict(Product.objects.filter(pk__in=wanted).values_list('pk', 'stock'))
+    short = [pk for pk in sorted(wanted) if levels.get(pk, 0) < wanted[pk]] or sorted(wanted)
+    raise InsufficientStock(short[0], wanted[short[0]])
+
+
+def _expiry(ttl):
+    ttl = settings.STOCK_RESERVATION_TTL if ttl is None else ttl
+    return timezone.now() + timedelta(seconds=ttl) if ttl else None
+
+
+def reserve(product, quantity, order=None, ttl=None):
+    """Take ``quantity`` units of ``product`` and record them; raises InsufficientStock.
+
+    ``ttl`` (seconds, default ``STOCK_RESERVATION_TTL``) lets
+    ``release_expired`` hand the units back if the reservation is never
+    committed; 0 holds them until released.
+    """
+    expires_at = _expiry(ttl)
+    return StockReservation.objects.bulk_create([
+        StockReservation(product=product, order=order, shard=shard, quantity=amount, expires_at=expires_at)
+        for shard, amount in _take(product, quantity)
+    ])
+
+
+def reserve_lines(order, lines, ttl=None):
+    """Reserve every ``(product, quantity)`` of an order, all or nothing.
+
+    Single-counter products are taken together in one statement, so the
+    query count does not grow with the number of lines. Sharded products
+    are taken in product id order so concurrent orders touch their counters
+    in the same sequence and cannot deadlock each other.
+    """
+    products, wanted = {}, {}
+    for product, quantity in lines:
+        products[product.pk] = product
+        wanted[product.pk] = wanted.get(product.pk, 0) + quantity
+
+    expires_at = _expiry(ttl)
+    reservations = []
+    with transaction.atomic():
+        unsharded = {pk: quantity for pk, quantity in wanted.items() if products[pk].stock_shards <= 1}
+        if unsharded:
+            _take_unsharded(unsharded)
+        for pk in sorted(wanted):
+            taken = [(0, wanted[pk])] if pk in unsharded else _take(products[pk], wanted[pk])
+            reservations.extend(
+                StockReservation(product_id=pk, order=order, shard=shard, quantity=amount, expires_at=expires_at)
+                for shard, amount in taken
+            )
+        return StockReservation.objects.bulk_create(reservations)
+
+
+def release(reservations):
+    """Return the units of the still-active ``reservations`` to their counters."""
+    released = 0
+    for reservation in reservations.filter(status='active'):
+        # Conditional flip, so a reservation is only ever given back once; the flip and
+        # the give-back commit together, so a crash between them cannot lose the units
+        with transaction.atomic():
+            if StockReservation.objects.filter(pk=reservation.pk, status='active').update(status='released'):
+                _increment(reservation.product_id, reservation.shard, reservation.quantity)
+                released += 1
+    return released
+
+
+def reserve_order(order, ttl=None):
+    """Reserve stock for every line of an existing ``order`` again; raises InsufficientStock."""
+    lines = [(item.product, item.quantity) for item in order.items.select_related('product')]
+    return reserve_lines(order, lines, ttl)
+
+
+def release_order(order):
+    return release(StockReservation.objects.filter(order=order))
+
+
+def commit_order(order):
+    """Make the order's reservations permanent; they no longer expire."""
+    return StockReservation.objects.filter(order=order, status='active').update(status='committed', expires_at=None)
+
+
+def release_expired(now=None):
+    """Release expired active reservations and cancel the pending orders that held them."""
+    expired = StockReservation.objects.filter(status='active', expires_at__lte=now or timezone.now())
+    order_ids = set(expired.exclude(order=None).values_list('order_id', flat=True))
+    released = release(expired)
+    if order_ids:
+        Order.objects.filter(pk__in=order_ids, status='pending').update(status='cancelled')
+    return released
+
+
+def available(product):
+    """Units left over all of the product's counters."""
+    total = Product.objects.filter(pk=product.pk).values_list('stock', flat=True).first() or 0
+    if product.stock_shards > 1:
+        total += StockShard.objects.filter(product=product).aggregate(total=Sum('quantity'))['total'] or 0
+    return total
+
+
+def with_available(queryset):
+    """Annotate products with ``available_stock``, the same total ``available`` returns."""
+    shard_total = (StockShard.objects.filter(product=OuterRef('pk')).order_by()
+                   .values('product').annotate(total=Sum('quantity')).values('total'))
+    return queryset.annotate(available_stock=Case(
+        When(stock_shards__lte=1, then=F('stock')),
+        default=F('stock') + Coalesce(Subquery(shard_total), 0),
+        output_field=PositiveIntegerField(),
+    ))
+
+
+def restock(product, quantity):
+    """Add units, spread evenly over the product's counters."""
+    shards = max(product.stock_shards, 1)
+    share, extra = divmod(quantity, shards)
+    for shard in range(shards):
+        amount = share + (1 if shard < extra else 0)
+        if amount:
+            _increment(product.pk, shard, amount)
+
+
+def _spread(product_id, total, shards):
+    """Replace the product's counters with ``shards`` counters holding ``total`` units between them."""
+    StockShard.objects.filter(product_id=product_id).delete()
+    share, extra = divmod(total, shards)
+    StockShard.objects.bulk_create(
+        StockShard(product_id=product_id, index=index, quantity=share + (1 if index < extra else 0))
+        for index in range(1, shards)
+    )
+    Product.objects.filter(pk=product_id).update(
+        stock=share + (1 if extra else 0), stock_shards=shards, updated_at=Now())
+
+
+def set_stock(product, quantity):
+    """Make ``quantity`` the product's total units, spread evenly over its counters."""
+    set_stock_levels({product.pk: quantity})
+    product.refresh_from_db(fields=['stock', 'stock_shards'])
+    return product
+
+
+def set_stock_levels(levels):
+    """Set the total units of several products at once (``{product_id: units}``).
+
+    Single-counter products are written with one UPDATE; sharded ones get
+    their units spread over the same number of counters as before.
+    """
+    if not levels:
+        return
+    with transaction.atomic():
+        shards = dict(Product.objects.select_for_update().filter(pk__in=levels).order_by('pk')
+                      .values_list('pk', 'stock_shards'))
+        single = {pk: levels[pk] for pk, count in shards.items() if count <= 1}
+        if single:
+            amount = Case(*[When(pk=pk, then=Value(quantity)) for pk, quantity in single.items()],
+                          output_field=PositiveIntegerField())
+            Product.objects.filter(pk__in=single).update(stock=amount, updated_at=Now())
+        for pk, count in shards.items():
+            if count > 1:
+                _spread(pk, levels[pk], count)
+        _stock_changed(list(shards))
+
+
+def shard_product(product, shards):
+    """Split (or merge) the product's current stock evenly over ``shards`` counters."""
+    if shards < 1:
+        raise ValueError("A product needs at least one stock counter.")
+    with transaction.atomic():
+        product = Product.objects.select_for_update().get(pk=product.pk)
+        rows = StockShard.objects.select_for_update().filter(product=product)
+        _spread(product.pk, product.stock + sum(row.quantity for row in rows), shards)
+        _stock_changed([product.pk])
+        product.refresh_from_db(fields=['stock', 'stock_shards'])
+    return product
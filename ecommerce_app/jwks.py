@@ -0,0 +1,119 @@
+"""Process-wide cache of the OIDC provider's signing keys.
+
+Keys are parsed once and kept by ``kid`` for the lifetime given by the JWKS
+response's ``Cache-Control: max-age``. Expired keys keep being served while a
+background refresh runs; an unknown ``kid`` (key rotation) triggers at most
+one synchronous refresh no matter how many requests miss at once. Neither
+path fetches more often than ``min_refresh_interval``, so a provider that is
+down (or answers ``max-age=0``) is not polled on every request.
+"""
+import logging
+import re
+import threading
+import time
+
+import jwt
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from .metrics import external_call
+
+logger = logging.getLogger(__name__)
+
+MAX_AGE_RE = re.compile(r'max-age=(\d+)')
+
+
+def pooled_session(pool_size):
+    """Keep-alive session so refreshes reuse TLS connections to the provider."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class JWKSCache:
+
+    def __init__(self, url, session=None, default_ttl=None, min_refresh_interval=None, timeout=None):
+        self.url = url
+        self.session = session or pooled_session(settings.OIDC_JWKS_POOL_SIZE)
+        self.default_ttl = default_ttl if default_ttl is not None else settings.OIDC_JWKS_CACHE_TTL
+        self.min_refresh_interval = (min_refresh_interval if min_refresh_interval is not None
+                                     else settings.OIDC_JWKS_MIN_REFRESH_INTERVAL)
+        self.timeout = timeout or settings.OIDC_JWKS_TIMEOUT
+        self.fetch_count = 0
+        self._keys = {}
+        self._expires_at = 0.0
+        self._last_fetch = float('-inf')
+        self._lock = threading.Lock()
+        self._inflight = None
+
+    def get_key(self, kid):
+        """Return the parsed public key for ``kid``, or None if the provider has none."""
+        key = self._keys.get(kid)
+        if key is not None:
+            if time.monotonic() >= self._expires_at and self._may_refresh():
+                self._refresh(wait=False)
+            return key
+
+        # Unknown kid: refresh once, but never hammer the provider for bogus kids.
+        if self._may_refresh():
+            self._refresh(wait=True)
+        return self._keys.get(kid)
+
+    def _may_refresh(self):
+        return time.monotonic() - self._last_fetch >= self.min_refresh_interval
+
+    def _refresh(self, wait):
+        """Single-flight refresh: the first caller fetches, concurrent callers join it."""
+        with self._lock:
+            event = self._inflight
+            leader = event is None
+            if leader:
+                event = self._inflight = threading.Event()
+
+        if not leader:
+            if wait:
+                event.wait(self.timeout)
+            return
+        if wait:
+            self._fetch(event)
+        else:
+            threading.Thread(target=self._fetch, args=(event,), daemon=True).start()
+
+    def _fetch(self, event):
+        try:
+            with external_call('jwks'):
+                response = self.session.get(self.url, timeout=self.timeout)
+                response.raise_for_status()
+            keys = {}
+            for jwk in response.json().get('keys', []):
+                if jwk.get('kty') == 'RSA' and jwk.get('kid'):
+                    keys[jwk['kid']] = jwt.algorithms.RSAAlgorithm.from_jwk(jwk)
+
+            match = MAX_AGE_RE.search(response.headers.get('Cache-Control', ''))
+            ttl = int(match.group(1)) if match else self.default_ttl
+            self._keys = keys
+            self._expires_at = time.monotonic() + ttl
+        except (requests.RequestException, ValueError) as exc:
+            logger.warning("JWKS refresh from %s failed: %s", self.url, exc)
+        finally:
+            self.fetch_count += 1
+            self._last_fetch = time.monotonic()
+            with self._lock:
+                self._inflight = None
+            event.set()
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_jwks_cache(url=None):
+    """Return the shared cache for ``url`` (defaults to ``OIDC_OP_JWKS_ENDPOINT``)."""
+    url = url or settings.OIDC_OP_JWKS_ENDPOINT
+    with _caches_lock:
+        if url not in _caches:
+            _caches[url] = JWKSCache(url)
+        return _caches[url]
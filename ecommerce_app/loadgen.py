@@ -0,0 +1,143 @@
+"""Closed-loop HTTP load generator for comparing server setups and finding limits.
+
+Each virtual user is a thread with one keep-alive connection that sends its
+next request as soon as the previous answer arrives. ``run_load`` cycles
+through a list of GET paths. ``run_scenario`` runs a scripted flow per user
+and reports per-request-kind numbers and a timeline. Only the standard
+library is used, so it runs wherever the app does.
+"""
+import http.client
+import itertools
+import json
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of sorted ``samples``."""
+    if not samples:
+        return None
+    index = min(len(samples) - 1, max(0, int(round(fraction * len(samples))) - 1))
+    return samples[index]
+
+
+def summarize(latencies, errors, seconds):
+    """Counts, error rate, throughput and latency percentiles (ms) of one set of requests."""
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'error_rate': round(errors / len(latencies), 4) if latencies else 0.0,
+        'seconds': round(seconds, 3),
+        'rps': round(len(latencies) / seconds, 1) if seconds else 0.0,
+        'p50_ms': percentile(latencies, 0.50),
+        'p95_ms': percentile(latencies, 0.95),
+        'p99_ms': percentile(latencies, 0.99),
+    }
+
+
+def _connection(url, timeout):
+    cls = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+    return cls(url.hostname, url.port, timeout=timeout)
+
+
+def run_scenario(base_url, user_flow, users=8, duration=10.0, headers=None, timeout=10,
+                 interval=None, probes=None, on_interval=None):
+    """Run ``users`` virtual users against ``base_url`` for ``duration`` seconds.
+
+    ``user_flow(index)`` returns an iterator of ``(label, method, path, body)``
+    requests for one user; a dict ``body`` is sent as JSON. Responses of 400
+    and above count as errors. With ``interval`` (seconds), a timeline entry
+    is recorded, and passed to ``on_interval``, that often. It also holds
+    the result of every callable in ``probes``.
+    Returns ``{'total': ..., 'by_label': {...}, 'timeline': [...]}``.
+    """
+    url = urlsplit(base_url)
+    prefix = url.path.rstrip('/')
+    samples = []  # (label, latency ms, ok)
+    lock = threading.Lock()
+    started = time.perf_counter()
+    deadline = time.monotonic() + duration
+    done = threading.Event()
+
+    def worker(index):
+        conn = _connection(url, timeout)
+        for label, method, path, body in user_flow(index):
+            if time.monotonic() >= deadline:
+                break
+            request_headers = dict(headers or {})
+            if isinstance(body, (dict, list)):
+                body = json.dumps(body)
+                request_headers['Content-Type'] = 'application/json'
+            sent = time.perf_counter()
+            try:
+                conn.request(method, prefix + path, body=body, headers=request_headers)
+                response = conn.getresponse()
+                response.read()
+                ok = response.status < 400
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = _connection(url, timeout)
+                ok = False
+            sample = (label, (time.perf_counter() - sent) * 1000, ok)
+            with lock:
+                samples.append(sample)
+        conn.close()
+
+    timeline = []
+
+    def tick(cursor, last):
+        now = time.perf_counter()
+        with lock:
+            new = samples[cursor:]
+        entry = {'t': round(now - started, 1),
+                 **summarize([ms for _, ms, _ in new], sum(not ok for _, _, ok in new), now - last)}
+        for name, probe in (probes or {}).items():
+            entry[name] = probe()
+        timeline.append(entry)
+        if on_interval:
+            on_interval(entry)
+        return cursor + len(new), now
+
+    def reporter():
+        cursor, last = 0, started
+        while not done.wait(interval):
+            cursor, last = tick(cursor, last)
+        if cursor < len(samples):
+            tick(cursor, last)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(users)]
+    if interval:
+        report_thread = threading.Thread(target=reporter)
+        report_thread.start()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    done.set()
+    if interval:
+        report_thread.join()
+
+    by_label = defaultdict(lambda: ([], 0))
+    for label, ms, ok in samples:
+        latencies, errors = by_label[label]
+        latencies.append(ms)
+        by_label[label] = (latencies, errors + (not ok))
+    return {
+        'total': summarize([ms for _, ms, _ in samples], sum(not ok for _, _, ok in samples), elapsed),
+        'by_label': {label: summarize(latencies, errors, elapsed) for label, (latencies, errors) in by_label.items()},
+        'timeline': timeline,
+    }
+
+
+def run_load(base_url, paths, concurrency=8, duration=10.0, headers=None, timeout=10):
+    """GET ``paths`` round-robin for ``duration`` seconds; return counts, rps and latency percentiles (ms)."""
+    def user_flow(index):
+        # Stagger the starting path so threads do not all hit the same URL together
+        for path in itertools.islice(itertools.cycle(paths), index, None):
+            yield 'GET', 'GET', path, None
+
+    return run_scenario(base_url, user_flow, concurrency, duration, headers, timeout)['total']
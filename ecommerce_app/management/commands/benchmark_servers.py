@@ -0,0 +1,111 @@
+import http.client
+import importlib.util
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ecommerce_app import caching
+from ecommerce_app.loadgen import run_load
+from ecommerce_app.models import Category, Product
+
+SERVERS = {
+    'wsgi': ['Ecommerce.wsgi:application'],
+    'asgi': ['Ecommerce.asgi:application', '-k', 'uvicorn_worker.UvicornWorker'],
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(port, path, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', path)
+            conn.getresponse().read()
+            conn.close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f"Server on port {port} did not answer within {timeout}s.")
+
+
+class Command(BaseCommand):
+    help = ("Serve the app with gunicorn sync (WSGI) workers and then with uvicorn (ASGI) workers, "
+            "same worker count, and compare throughput and tail latency on the catalog reads.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--concurrency', type=int, default=32, help="Concurrent client connections.")
+        parser.add_argument('--duration', type=float, default=15.0, help="Seconds of load per server.")
+        parser.add_argument('--interfaces', nargs='+', choices=sorted(SERVERS), default=['wsgi', 'asgi'])
+        parser.add_argument('--path', action='append', dest='paths',
+                            help="Path to request (repeatable). Defaults to the catalog read endpoints.")
+        parser.add_argument('--startup-timeout', type=float, default=30.0)
+        parser.add_argument('--json', action='store_true', help="Print the results as JSON.")
+
+    def handle(self, *args, **options):
+        if shutil.which('gunicorn') is None:
+            raise CommandError("gunicorn is not installed.")
+        if 'asgi' in options['interfaces'] and importlib.util.find_spec('uvicorn_worker') is None:
+            raise CommandError("uvicorn-worker is not installed (pip install uvicorn-worker).")
+
+        if options['workers'] > 1 and not caching.is_shared():
+            self.stderr.write("The cache is process-local, so both servers run with the response cache, "
+                              "ETags and the token cache off; set REDIS_URL to measure them.")
+        paths = options['paths'] or self.default_paths()
+        results = {}
+        for interface in options['interfaces']:
+            results[interface] = self.bench(interface, paths, options)
+
+        if options['json']:
+            self.stdout.write(json.dumps({'workers': options['workers'], 'paths': paths, 'results': results}, indent=2))
+            return
+        self.stdout.write(f"{options['workers']} workers, {options['concurrency']} connections, "
+                          f"{options['duration']:g}s per server")
+        self.stdout.write(f"{'server':<6} {'requests':>9} {'errors':>7} {'rps':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for interface, r in results.items():
+            self.stdout.write(f"{interface:<6} {r['requests']:>9} {r['errors']:>7} {r['rps']:>9.1f} "
+                              f"{r['p50_ms'] or 0:>8.1f} {r['p95_ms'] or 0:>8.1f} {r['p99_ms'] or 0:>8.1f}")
+
+    def default_paths(self):
+        paths = ['/api/v1/categories/', '/api/v1/categories/tree/', '/api/v1/products/']
+        category = Category.objects.order_by('id').first()
+        product = Product.objects.order_by('id').first()
+        if category:
+            paths += [f'/api/v1/categories/{category.pk}/', f'/api/v1/categories/{category.pk}/average-price/']
+        if product:
+            paths.append(f'/api/v1/products/{product.pk}/')
+        return paths
+
+    def bench(self, interface, paths, options):
+        port = free_port()
+        command = [shutil.which('gunicorn'), *SERVERS[interface], '--bind', f'127.0.0.1:{port}',
+                   '-w', str(options['workers']), '--log-level', 'warning']
+        self.stderr.write(f"Starting {interface}: {' '.join(command[1:])}")
+        env = os.environ.copy()
+        if options['workers'] > 1:
+            # Several workers never share a process-local cache
+            env.pop('CACHE_ALLOW_PROCESS_LOCAL', None)
+        server = subprocess.Popen(command, env=env, stdout=sys.stderr, stderr=sys.stderr)
+        try:
+            wait_until_ready(port, paths[0], options['startup_timeout'])
+            # Warm up imports, connections and caches in every worker before measuring
+            run_load(f'http://127.0.0.1:{port}', paths, options['concurrency'], min(2.0, options['duration']))
+            return run_load(f'http://127.0.0.1:{port}', paths, options['concurrency'], options['duration'])
+        finally:
+            server.terminate()
+            try:
+                server.wait(10)
+            except subprocess.TimeoutExpired:
+                server.kill()
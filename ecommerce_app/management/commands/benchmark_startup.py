@@ -0,0 +1,37 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ecommerce_app import startup
+
+
+class Command(BaseCommand):
+    help = ("Boot the app in fresh interpreters as a worker does (import the WSGI/ASGI application and load "
+            "the URLconf) under python -X importtime, and report boot time and the slowest imports.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--top', type=int, default=15, help="How many of the slowest imports to list.")
+        parser.add_argument('--asgi', action='store_true', help="Boot Ecommerce.asgi instead of Ecommerce.wsgi.")
+        parser.add_argument('--max-seconds', type=float, help="Fail if the median boot time is above this.")
+        parser.add_argument('--json', action='store_true', help="Print the result as JSON.")
+
+    def handle(self, *args, **options):
+        module = 'Ecommerce.asgi' if options['asgi'] else 'Ecommerce.wsgi'
+        try:
+            result = startup.measure(options['runs'], module, options['top'])
+        except RuntimeError as exc:
+            raise CommandError(str(exc))
+
+        if options['json']:
+            self.stdout.write(json.dumps(result, indent=2))
+        else:
+            self.stdout.write(f"{module}: median {result['median_s'] * 1000:.0f} ms over {result['runs']} runs "
+                              f"(min {result['min_s'] * 1000:.0f}, max {result['max_s'] * 1000:.0f}), "
+                              f"{result['modules']} modules imported")
+            self.stdout.write(f"{'cumulative ms':>14}  module")
+            for entry in result['slowest_imports']:
+                self.stdout.write(f"{entry['cumulative_ms']:>14.1f}  {'  ' * entry['depth']}{entry['module']}")
+
+        if options['max_seconds'] is not None and result['median_s'] > options['max_seconds']:
+            raise CommandError(f"Median boot time {result['median_s']:.3f}s is above {options['max_seconds']}s.")
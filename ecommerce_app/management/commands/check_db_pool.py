@@ -0,0 +1,67 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from ecommerce_app.db_pool import get_pool, pool_stats
+
+
+class Command(BaseCommand):
+    help = ("Hammer the database pool from concurrent threads (each query takes a connection from the "
+            "pool and returns it) and report throughput and how long checkouts had to wait.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--threads', type=int, default=32)
+        parser.add_argument('--queries', type=int, default=200, help="Queries per thread.")
+        parser.add_argument('--sleep', type=float, default=0.0,
+                            help="Seconds each query holds its connection (pg_sleep), to force waiting.")
+
+    def handle(self, *args, **options):
+        alias = options['database']
+        pool = get_pool(alias)
+        if pool is None:
+            raise CommandError(f"Database {alias!r} is not pooled (PostgreSQL with DB_POOL=True is required).")
+
+        pool.open(wait=True)
+        before = pool_stats(alias)
+        sql, params = ('SELECT pg_sleep(%s)', [options['sleep']]) if options['sleep'] else ('SELECT 1', [])
+        failures = []
+
+        def worker():
+            connection = connections[alias]
+            try:
+                for _ in range(options['queries']):
+                    with connection.cursor() as cursor:
+                        cursor.execute(sql, params)
+                    # Hand the connection back, as the end of a request would
+                    connection.close()
+            except Exception as exc:
+                failures.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(options['threads'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        after = pool_stats(alias)
+        checkouts = after['requests_num'] - before['requests_num']
+        waited_ms = after['requests_wait_ms'] - before['requests_wait_ms']
+        queries = options['threads'] * options['queries'] - len(failures)
+        self.stdout.write(
+            f"{queries} queries from {options['threads']} threads in {elapsed:.2f}s ({queries / elapsed:.0f}/s); "
+            f"pool {after['pool_size']}/{after['pool_max']} connections, "
+            f"{after['connections_num'] - before['connections_num']} opened, "
+            f"{checkouts} checkouts waited {waited_ms} ms in total "
+            f"({waited_ms / checkouts if checkouts else 0:.2f} ms each), "
+            f"{after['requests_errors'] - before['requests_errors']} timed out."
+        )
+        if failures:
+            raise CommandError(f"{len(failures)} threads failed, first error: {failures[0]!r}")
+        self.stdout.write(self.style.SUCCESS("Pool healthy."))
@@ -0,0 +1,33 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ecommerce_app.ingestion import PARSERS, UPSERT_KEYS, ProductIngestor
+
+
+class Command(BaseCommand):
+    help = "Stream products from an NDJSON or CSV file (or '-' for stdin) into the catalog."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Feed file, or '-' to read stdin.")
+        parser.add_argument('--format', choices=sorted(PARSERS), help="Defaults to the file extension, else ndjson.")
+        parser.add_argument('--key', choices=UPSERT_KEYS, default='name', help="Natural key used to upsert.")
+        parser.add_argument('--chunk-size', type=int, help="Rows per bulk write.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('csv' if path.endswith('.csv') else 'ndjson')
+        try:
+            stream = sys.stdin if path == '-' else open(path, encoding='utf-8-sig', newline='')
+        except OSError as exc:
+            raise CommandError(exc)
+
+        with stream:
+            ingestor = ProductIngestor(key=options['key'], chunk_size=options['chunk_size'])
+            report = ingestor.ingest(PARSERS[fmt](stream))
+
+        for error in report['errors']:
+            self.stderr.write(f"row {error['row']}: {error['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['created']} created, {report['updated']} updated, {report['error_count']} errors."
+        ))
@@ -0,0 +1,130 @@
+import json
+import random
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from ecommerce_app import inventory
+from ecommerce_app.loadgen import run_scenario
+from ecommerce_app.models import Customer, Product
+
+CUSTOMER_PREFIX = 'loadtest'
+PRODUCT_PREFIX = 'Load test product'
+
+# Sessions waiting on a lock right now, and how long the oldest has waited
+LOCK_WAITS_SQL = """
+    SELECT count(*), COALESCE(EXTRACT(EPOCH FROM max(now() - state_change)), 0)
+    FROM pg_stat_activity
+    WHERE datname = current_database() AND wait_event_type = 'Lock'
+"""
+
+
+def lock_waits():
+    """``{'waiting': n, 'longest_s': s}`` on PostgreSQL; None elsewhere."""
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(LOCK_WAITS_SQL)
+        waiting, longest = cursor.fetchone()
+    return {'waiting': waiting, 'longest_s': round(float(longest), 3)}
+
+
+class Command(BaseCommand):
+    help = ("Drive a running server with virtual customers who browse the catalog and place orders "
+            "(POST /api/v1/orders/), and report throughput, errors, latency and DB lock waits over time. "
+            "Start the server with SMS_CLIENT=ecommerce_app.notifications.StubSMSClient and "
+            "EMAIL_BACKEND=django.core.mail.backends.dummy.EmailBackend (and the outbox worker, "
+            "if it should be part of the test) against the same database as this command.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument('--users', type=int, default=20, help="Concurrent virtual customers.")
+        parser.add_argument('--duration', type=float, default=60.0, help="Seconds.")
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds per timeline row.")
+        parser.add_argument('--order-ratio', type=float, default=0.3,
+                            help="Share of a customer's steps that place an order (the rest browse).")
+        parser.add_argument('--products', type=int, default=50, help="Load-test products to order from.")
+        parser.add_argument('--hot-products', type=int, default=0,
+                            help="Order only from this many products, to provoke stock-row contention.")
+        parser.add_argument('--max-lines', type=int, default=3, help="Lines per order (1..n).")
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--json', action='store_true', help="Print the full result as JSON.")
+
+    def handle(self, *args, **options):
+        if not 0 <= options['order_ratio'] <= 1:
+            raise CommandError("--order-ratio must be between 0 and 1.")
+        customers = self.customers(options['users'])
+        products = self.products(options['products'])
+        if options['hot_products']:
+            products = products[:options['hot_products']]
+
+        def user_flow(index):
+            rng = random.Random(options['seed'] * 100_003 + index)
+            customer = customers[index]
+            while True:
+                if rng.random() < options['order_ratio']:
+                    lines = rng.sample(products, k=rng.randint(1, min(options['max_lines'], len(products))))
+                    yield 'order', 'POST', '/api/v1/orders/', {
+                        'customer': customer,
+                        'items': [{'product': pk, 'quantity': 1, 'unit_price': str(price)} for pk, price in lines],
+                    }
+                elif rng.random() < 0.5:
+                    yield 'browse', 'GET', '/api/v1/products/', None
+                else:
+                    yield 'product', 'GET', f'/api/v1/products/{rng.choice(products)[0]}/', None
+
+        if not options['json']:
+            self.stdout.write(f"{options['users']} virtual customers against {options['url']} "
+                              f"for {options['duration']:g}s")
+            self.stdout.write(f"{'t':>6} {'rps':>8} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+                              f"{'lock waits':>11}")
+
+        def show(entry):
+            if options['json']:
+                return
+            waits = entry['lock_waits']
+            waits = f"{waits['waiting']} / {waits['longest_s']:.2f}s" if waits else 'n/a'
+            self.stdout.write(f"{entry['t']:>6} {entry['rps']:>8.1f} {entry['error_rate']:>7.1%} "
+                              f"{entry['p50_ms'] or 0:>8.1f} {entry['p95_ms'] or 0:>8.1f} "
+                              f"{entry['p99_ms'] or 0:>8.1f} {waits:>11}")
+
+        try:
+            result = run_scenario(
+                options['url'], user_flow, users=options['users'], duration=options['duration'],
+                interval=options['interval'], probes={'lock_waits': lock_waits}, on_interval=show,
+            )
+        finally:
+            connection.close()
+
+        if options['json']:
+            self.stdout.write(json.dumps(result, indent=2, default=str))
+            return
+        self.stdout.write("")
+        for label, summary in [('all', result['total']), *sorted(result['by_label'].items())]:
+            self.stdout.write(f"{label:<8} {summary['requests']:>7} requests {summary['rps']:>8.1f} rps "
+                              f"{summary['error_rate']:>7.1%} errors  p50 {summary['p50_ms'] or 0:.1f} "
+                              f"p95 {summary['p95_ms'] or 0:.1f} p99 {summary['p99_ms'] or 0:.1f} ms")
+
+    def customers(self, count):
+        """Customer ids for the virtual users, created on first use."""
+        ids = []
+        for i in range(count):
+            user, _ = User.objects.get_or_create(username=f'{CUSTOMER_PREFIX}-{i}')
+            customer, _ = Customer.objects.get_or_create(user=user, defaults={
+                'first_name': 'Load', 'last_name': f'Test {i}',
+                'email': f'{CUSTOMER_PREFIX}-{i}@example.com', 'phone': f'07{i:08d}',
+            })
+            ids.append(customer.pk)
+        return ids
+
+    def products(self, count):
+        """``(id, price)`` of the load-test products, topped up so orders never run out of stock."""
+        result = []
+        for i in range(count):
+            product, _ = Product.objects.get_or_create(name=f'{PRODUCT_PREFIX} {i}', defaults={'price': 10 + i})
+            missing = 1_000_000 - inventory.available(product)
+            if missing > 0:
+                inventory.restock(product, missing)
+            result.append((product.pk, product.price))
+        return result
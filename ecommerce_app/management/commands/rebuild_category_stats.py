@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from ecommerce_app import rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute the subtree price rollups (CategoryPriceStats) for every category."
+
+    def handle(self, *args, **options):
+        count = rollups.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt price stats for {count} categories."))
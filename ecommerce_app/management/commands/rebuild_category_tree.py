@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from ecommerce_app.models import Category
+
+
+class Command(BaseCommand):
+    help = "Recompute the materialized category path/depth index from parent links."
+
+    def handle(self, *args, **options):
+        count = Category.objects.rebuild_paths()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt paths for {count} categories."))
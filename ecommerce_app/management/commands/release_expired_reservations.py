@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from ecommerce_app import inventory
+
+
+class Command(BaseCommand):
+    help = "Return the stock of expired reservations and cancel the pending orders that held them."
+
+    def handle(self, *args, **options):
+        released = inventory.release_expired()
+        self.stdout.write(self.style.SUCCESS(f"Released {released} expired reservations."))
@@ -0,0 +1,50 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ecommerce_app import benchmarks
+
+
+class Command(BaseCommand):
+    help = ("Measure throughput, latency percentiles and query counts of every API endpoint in-process, "
+            "optionally save the results and compare them with a baseline run.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--cold', action='store_true', help="Clear the cache before every request.")
+        parser.add_argument('--only', nargs='+', metavar='URL_NAME', help="Only these URL names.")
+        parser.add_argument('--output', help="Write the results to this JSON file.")
+        parser.add_argument('--baseline', help="Compare with this earlier results file.")
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help="Allowed relative p95 latency increase before flagging (default 0.25).")
+        parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                            help="Ignore p95 increases smaller than this.")
+
+    def handle(self, *args, **options):
+        missing = benchmarks.uncovered_url_names()
+        if missing:
+            self.stderr.write(f"Not benchmarked (add them to ecommerce_app/benchmarks.py): {', '.join(sorted(missing))}")
+
+        report = benchmarks.run(
+            iterations=options['iterations'], warmup=options['warmup'], cold=options['cold'], only=options['only'],
+            log=lambda message: self.stderr.write(message) if options['verbosity'] > 1 else None,
+        )
+        self.stdout.write(f"{'endpoint':<40} {'status':>8} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8}")
+        for key, r in report['endpoints'].items():
+            status = ','.join(str(code) for code in r['status'])
+            self.stdout.write(f"{key[:40]:<40} {status:>8} {r['rps'] or 0:>8.1f} {r['p50_ms']:>8.2f} "
+                              f"{r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['queries']:>8}")
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}.")
+
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+            problems = benchmarks.compare(report, baseline, options['tolerance'], options['min_delta_ms'])
+            if problems:
+                raise CommandError("Regressions against the baseline:\n" + "\n".join(problems))
+            self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
@@ -0,0 +1,37 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from ecommerce_app.outbox import OutboxWorker
+
+
+class Command(BaseCommand):
+    help = "Deliver queued outbox notifications (SMS, email) with retries and backoff."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pool-size', type=int, help="Concurrent deliveries per batch.")
+        parser.add_argument('--batch-size', type=int, help="Messages claimed per batch.")
+        parser.add_argument('--poll-interval', type=float, help="Seconds to sleep when the outbox is empty.")
+        parser.add_argument('--linger', type=float, help="Seconds to keep collecting before sending a batch.")
+        parser.add_argument('--once', action='store_true', help="Process a single batch and exit.")
+
+    def handle(self, *args, **options):
+        worker = OutboxWorker(pool_size=options['pool_size'], batch_size=options['batch_size'],
+                              linger_seconds=options['linger'])
+        if options['once']:
+            count = worker.run_once()
+            self.stdout.write(f"Processed {count} outbox messages.")
+            return
+
+        stopping = []
+        signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+        self.stdout.write("Outbox worker started.")
+        try:
+            worker.run(poll_interval=options['poll_interval'], should_stop=lambda: bool(stopping))
+        except KeyboardInterrupt:
+            pass
+        stats = worker.sms_dispatcher.stats
+        self.stdout.write(
+            f"Outbox worker stopped. SMS: {stats.sent} sent, {stats.failed} failed in "
+            f"{stats.batches} gateway calls ({stats.throughput:.1f} msg/s)."
+        )
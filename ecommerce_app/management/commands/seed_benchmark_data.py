@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from ecommerce_app.benchmarks import generate_catalog
+
+
+class Command(BaseCommand):
+    help = ("Bulk-load a synthetic catalog (category tree, products, customers, orders) for run_benchmarks. "
+            "Use a dedicated database; the rows are not removed.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shape', choices=['balanced', 'deep', 'wide'], default='balanced',
+                            help="balanced: 4 levels x 6; deep: 12 levels x 2; wide: 1 level x 5000.")
+        parser.add_argument('--depth', type=int, help="Overrides --shape.")
+        parser.add_argument('--fanout', type=int, help="Overrides --shape.")
+        parser.add_argument('--products', type=int, default=100_000)
+        parser.add_argument('--customers', type=int, default=1_000)
+        parser.add_argument('--orders', type=int, default=100_000)
+        parser.add_argument('--items-per-order', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=5_000)
+
+    def handle(self, *args, **options):
+        depth, fanout = {'balanced': (4, 6), 'deep': (12, 2), 'wide': (1, 5000)}[options['shape']]
+        started = time.perf_counter()
+        counts = generate_catalog(
+            depth=options['depth'] or depth,
+            fanout=options['fanout'] or fanout,
+            products=options['products'],
+            customers=options['customers'],
+            orders=options['orders'],
+            items_per_order=options['items_per_order'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            log=lambda message: self.stderr.write(message) if options['verbosity'] > 1 else None,
+        )
+        summary = ', '.join(f"{count} {name.replace('_', ' ')}" for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(
+            f"{connection.vendor} database now has {summary} ({time.perf_counter() - started:.1f}s)."
+        ))
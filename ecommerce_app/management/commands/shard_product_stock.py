@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ecommerce_app import inventory
+from ecommerce_app.models import Product
+
+
+class Command(BaseCommand):
+    help = "Spread a hot product's stock over several counters so concurrent checkouts do not queue on one row."
+
+    def add_arguments(self, parser):
+        parser.add_argument('product_id', type=int)
+        parser.add_argument('shards', type=int, help="Number of counters; 1 merges them back into Product.stock.")
+
+    def handle(self, *args, **options):
+        try:
+            product = Product.objects.get(pk=options['product_id'])
+            product = inventory.shard_product(product, options['shards'])
+        except (Product.DoesNotExist, ValueError) as exc:
+            raise CommandError(exc)
+        self.stdout.write(self.style.SUCCESS(
+            f"{product.name}: {inventory.available(product)} units over {product.stock_shards} counters."
+        ))
@@ -0,0 +1,68 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, transaction
+
+from ecommerce_app import inventory
+from ecommerce_app.models import Product, StockReservation
+
+
+class Command(BaseCommand):
+    help = ("Race threads reserving one unit at a time from a single product until it sells out, "
+            "then check nothing was oversold and report throughput.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--stock', type=int, default=500)
+        parser.add_argument('--shards', type=int, default=1, help="Stock counters for the product.")
+        parser.add_argument('--quantity', type=int, default=1, help="Units per reservation.")
+
+    def handle(self, *args, **options):
+        product = Product.objects.create(name="stock-stress", price=1, stock=options['stock'])
+        product = inventory.shard_product(product, options['shards'])
+        reserved, retries = [], []
+
+        def worker():
+            count = conflicts = 0
+            try:
+                while True:
+                    try:
+                        with transaction.atomic():
+                            inventory.reserve(product, options['quantity'], ttl=0)
+                        count += 1
+                    except inventory.InsufficientStock:
+                        # A concurrent release could refill a counter; only stop once all are empty
+                        if inventory.available(product) < options['quantity']:
+                            break
+                    except OperationalError:
+                        # SQLite reports lock contention instead of waiting; just try again
+                        conflicts += 1
+            finally:
+                reserved.append(count)
+                retries.append(conflicts)
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(options['threads'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        sold = sum(reserved) * options['quantity']
+        recorded = sum(StockReservation.objects.filter(product=product).values_list('quantity', flat=True))
+        left = inventory.available(product)
+        StockReservation.objects.filter(product=product).delete()
+        product.delete()
+
+        self.stdout.write(
+            f"{sum(reserved)} reservations ({sold} units) by {options['threads']} threads over "
+            f"{options['shards']} counters in {elapsed:.2f}s: {sum(reserved) / elapsed:.0f} reservations/s, "
+            f"{sum(retries)} retried conflicts, {left} units left."
+        )
+        if sold != recorded or sold + left != options['stock']:
+            raise CommandError(f"Oversold: {sold} units sold, {recorded} recorded, {left} left "
+                                 f"of {options['stock']}.")
+        self.stdout.write(self.style.SUCCESS("No overselling."))
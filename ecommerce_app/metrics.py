@@ -0,0 +1,235 @@
+"""Prometheus metrics: request latency, DB and serializer time per URL name, external calls.
+
+``MetricsMiddleware`` puts a ``RequestStats`` in a context variable for the
+duration of a request. A connection-level execute wrapper and
+``serializing()`` add to it, so no per-query work happens outside requests.
+Context variables follow ``sync_to_async``, so the async views are counted
+too. ``metrics_view`` serves everything at ``/metrics``. Under gunicorn, set
+``PROMETHEUS_MULTIPROC_DIR`` so every worker's samples are aggregated.
+"""
+import contextlib
+import contextvars
+import hmac
+import os
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.exposition import CONTENT_TYPE_LATEST
+
+from . import db_pool, response_cache
+
+UNMATCHED = '<unmatched>'
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', "Time to produce the response.", ['view', 'method', 'status'])
+DB_QUERIES = Histogram(
+    'http_request_db_queries', "Database queries per request.", ['view'], buckets=QUERY_COUNT_BUCKETS)
+DB_SECONDS = Histogram('http_request_db_seconds', "Database time per request.", ['view'])
+SERIALIZER_SECONDS = Histogram('http_request_serializer_seconds', "Serializer output time per request.", ['view'])
+EXTERNAL_LATENCY = Histogram(
+    'external_call_duration_seconds', "Calls to external services (SMS gateway, SMTP, JWKS).",
+    ['service', 'outcome'])
+EXTERNAL_ERRORS = Counter('external_call_errors', "External calls that raised.", ['service'])
+
+
+class RequestStats:
+    __slots__ = ('queries', 'db_seconds', 'serializer_seconds', 'serializer_depth')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.serializer_depth = 0
+
+
+_current = contextvars.ContextVar('request_stats', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_seconds += time.perf_counter() - started
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    # First, so an execute_wrapper() block that is open right now pops its own wrapper
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+connection_created.connect(install_query_recorder, dispatch_uid='ecommerce_app.metrics')
+
+
+def install_on_thread_connections():
+    """Also cover connections this thread opened before this module was imported."""
+    for connection in connections.all():
+        install_query_recorder(None, connection)
+
+
+@contextlib.contextmanager
+def serializing():
+    """Count the time inside as serializer time; nested serializers are counted once."""
+    stats = _current.get()
+    if stats is None:
+        yield
+        return
+    stats.serializer_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.serializer_depth -= 1
+        if not stats.serializer_depth:
+            stats.serializer_seconds += time.perf_counter() - started
+
+
+class TimedSerializerMixin:
+    """Add to a serializer to record its ``to_representation`` time per request."""
+
+    def to_representation(self, instance):
+        with serializing():
+            return super().to_representation(instance)
+
+
+@contextlib.contextmanager
+def external_call(service):
+    """Time a call to ``service`` ('sms', 'smtp', 'jwks', ...)."""
+    started = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'ok'
+    except Exception:
+        EXTERNAL_ERRORS.labels(service).inc()
+        raise
+    finally:
+        EXTERNAL_LATENCY.labels(service, outcome).observe(time.perf_counter() - started)
+
+
+def view_label(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return UNMATCHED
+    return match.url_name or match.view_name or match.route
+
+
+class MetricsMiddleware:
+    """Record latency, DB queries/time and serializer time under the request's URL name."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats, token, started = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.observe(request, response, stats, started)
+        return response
+
+    async def __acall__(self, request):
+        stats, token, started = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.observe(request, response, stats, started)
+        return response
+
+    @staticmethod
+    def start():
+        install_on_thread_connections()
+        stats = RequestStats()
+        return stats, _current.set(stats), time.perf_counter()
+
+    @staticmethod
+    def observe(request, response, stats, started):
+        view = view_label(request)
+        REQUEST_LATENCY.labels(view, request.method, response.status_code).observe(time.perf_counter() - started)
+        DB_QUERIES.labels(view).observe(stats.queries)
+        DB_SECONDS.labels(view).observe(stats.db_seconds)
+        SERIALIZER_SECONDS.labels(view).observe(stats.serializer_seconds)
+
+
+class StateCollector:
+    """Gauges read at scrape time: response-cache counters and DB pool state (this process)."""
+
+    def collect(self):
+        cache_events = CounterMetricFamily(
+            'response_cache_events', "Response/fragment cache lookups by outcome.", labels=['cache', 'outcome'])
+        for label, outcomes in response_cache.stats().items():
+            for outcome, value in outcomes.items():
+                cache_events.add_metric([label, outcome], value)
+        yield cache_events
+
+        pool_gauges = {
+            name: GaugeMetricFamily(f'db_pool_{name}', description, labels=['database'])
+            for name, description in (
+                ('size', "Connections in the pool."),
+                ('available', "Idle connections in the pool."),
+                ('requests_waiting', "Requests waiting for a connection."),
+            )
+        }
+        pool_counters = {
+            name: CounterMetricFamily(f'db_pool_{name}', description, labels=['database'])
+            for name, description in (
+                ('requests', "Connections requested from the pool."),
+                ('requests_queued', "Requests that had to wait for a connection."),
+                ('requests_wait_seconds', "Total time spent waiting for a connection."),
+                ('requests_timeouts', "Requests that gave up waiting."),
+            )
+        }
+        for alias in settings.DATABASES:
+            stats = db_pool.pool_stats(alias)
+            if stats is None:
+                continue
+            pool_gauges['size'].add_metric([alias], stats['pool_size'])
+            pool_gauges['available'].add_metric([alias], stats['pool_available'])
+            pool_gauges['requests_waiting'].add_metric([alias], stats['requests_waiting'])
+            pool_counters['requests'].add_metric([alias], stats['requests_num'])
+            pool_counters['requests_queued'].add_metric([alias], stats['requests_queued'])
+            pool_counters['requests_wait_seconds'].add_metric([alias], stats['requests_wait_ms'] / 1000)
+            pool_counters['requests_timeouts'].add_metric([alias], stats['requests_errors'])
+        yield from pool_gauges.values()
+        yield from pool_counters.values()
+
+
+_state_collector = StateCollector()
+REGISTRY.register(_state_collector)
+
+
+def registry():
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return REGISTRY
+    merged = CollectorRegistry()
+    multiprocess.MultiProcessCollector(merged)
+    merged.register(_state_collector)
+    return merged
+
+
+def metrics_view(request):
+    """Prometheus text exposition; requires ``Authorization: Bearer <METRICS_TOKEN>`` when that is set."""
+    token = settings.METRICS_TOKEN
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse(status=401, headers={'WWW-Authenticate': 'Bearer'})
+    return HttpResponse(generate_latest(registry()), content_type=CONTENT_TYPE_LATEST)
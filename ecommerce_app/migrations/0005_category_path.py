@@ -0,0 +1,42 @@
+# Generated by Django 5.2.5 on 2026-10-17 00:52
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def backfill_paths(apps, schema_editor):
+    Category = apps.get_model('ecommerce_app', 'Category')
+    children = defaultdict(list)
+    for pk, parent_id in Category.objects.values_list('id', 'parent_id'):
+        children[parent_id].append(pk)
+
+    updates = []
+    stack = [(pk, '') for pk in children[None]]
+    while stack:
+        pk, parent_path = stack.pop()
+        path = f"{parent_path}{pk:010d}/"
+        updates.append(Category(pk=pk, path=path, depth=path.count('/') - 1))
+        stack.extend((child, path) for child in children[pk])
+    Category.objects.bulk_update(updates, ['path', 'depth'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecommerce_app', '0004_customer_last_login_customer_oidc_sub_customer_user'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(backfill_paths, migrations.RunPython.noop),
+    ]
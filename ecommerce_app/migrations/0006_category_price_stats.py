@@ -0,0 +1,44 @@
+# Generated by Django 5.2.5 on 2026-10-17 00:53
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Sum
+
+
+def backfill_stats(apps, schema_editor):
+    Category = apps.get_model('ecommerce_app', 'Category')
+    Product = apps.get_model('ecommerce_app', 'Product')
+    CategoryPriceStats = apps.get_model('ecommerce_app', 'CategoryPriceStats')
+    ProductCategory = Product.categories.through
+
+    rows = []
+    for category in Category.objects.only('pk', 'path'):
+        in_subtree = ProductCategory.objects.filter(category__path__startswith=category.path).values('product_id')
+        stats = Product.objects.filter(pk__in=in_subtree).aggregate(
+            product_count=Count('pk'), price_sum=Sum('price'), price_min=Min('price'), price_max=Max('price'),
+        )
+        if stats['product_count']:
+            rows.append(CategoryPriceStats(category_id=category.pk, **stats))
+    CategoryPriceStats.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecommerce_app', '0005_category_path'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryPriceStats',
+            fields=[
+                ('category', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='price_stats', serialize=False, to='ecommerce_app.category')),
+                ('product_count', models.PositiveIntegerField(default=0)),
+                ('price_sum', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=18)),
+                ('price_min', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('price_max', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
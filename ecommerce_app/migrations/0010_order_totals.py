@@ -0,0 +1,39 @@
+# Generated by Django 5.2.5 on 2026-10-17 01:06
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_totals(apps, schema_editor):
+    Order = apps.get_model('ecommerce_app', 'Order')
+    OrderItem = apps.get_model('ecommerce_app', 'OrderItem')
+
+    lines = OrderItem.objects.filter(order=OuterRef('pk')).order_by().values('order')
+    amount = ExpressionWrapper(F('unit_price') * F('quantity'), output_field=DecimalField(max_digits=12, decimal_places=2))
+    Order.objects.update(
+        total_amount=Coalesce(Subquery(lines.annotate(total=Sum(amount)).values('total')), Value(Decimal('0.00'))),
+        item_count=Coalesce(Subquery(lines.annotate(count=Sum('quantity')).values('count')), Value(0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecommerce_app', '0009_stock_reservations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='total_amount',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12),
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.5 on 2026-10-17 01:09
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# PostgreSQL only: other backends use the in-process index in ecommerce_app.search.
+FORWARD_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    CREATE OR REPLACE FUNCTION ecommerce_product_search_vector() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('english', coalesce(NEW.name, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(NEW.description, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER product_search_vector_update
+    BEFORE INSERT OR UPDATE OF name, description ON ecommerce_app_product
+    FOR EACH ROW EXECUTE FUNCTION ecommerce_product_search_vector()
+    """,
+    "UPDATE ecommerce_app_product SET name = name",
+    "CREATE INDEX product_search_vector_idx ON ecommerce_app_product USING gin (search_vector)",
+    "CREATE INDEX product_name_trgm_idx ON ecommerce_app_product USING gin (name gin_trgm_ops)",
+]
+
+REVERSE_SQL = [
+    "DROP INDEX IF EXISTS product_name_trgm_idx",
+    "DROP INDEX IF EXISTS product_search_vector_idx",
+    "DROP TRIGGER IF EXISTS product_search_vector_update ON ecommerce_app_product",
+    "DROP FUNCTION IF EXISTS ecommerce_product_search_vector()",
+]
+
+
+def run_on_postgres(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecommerce_app', '0010_order_totals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(run_on_postgres(FORWARD_SQL), run_on_postgres(REVERSE_SQL)),
+    ]
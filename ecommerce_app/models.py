@@ -1,19 +1,107 @@
-from django.db import models
+from collections import defaultdict
+
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
+from django.db.models import Count, DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Concat, Substr
+from django.dispatch import Signal
+from django.utils import timezone
 from django.utils.text import slugify
 from decimal import Decimal
 from django.contrib.auth.models import User
 
 
+# Sent after a category and its subtree have been re-parented.
+category_moved = Signal()
+
+# Width of one zero-padded primary key segment in ``Category.path``.
+PATH_STEP = 10
+
+
+def _path_segment(pk):
+    return f"{pk:0{PATH_STEP}d}/"
+
+
+def path_to_ids(path):
+    """Return the category ids encoded in a materialized path, root first."""
+    return [int(segment) for segment in path.split('/') if segment]
+
+
+def build_category_tree(nodes, root_parent_id=None):
+    """Nest ``values()`` rows (id, name, slug, parent_id) into tree dicts in memory."""
+    children = defaultdict(list)
+    for node in nodes:
+        children[node['parent_id']].append(node)
+
+    def build(node):
+        return {
+            'id': node['id'],
+            'name': node['name'],
+            'slug': node['slug'],
+            'children': [build(child) for child in children[node['id']]],
+        }
+
+    return [build(node) for node in children[root_parent_id]]
+
+
+class CategoryQuerySet(models.QuerySet):
+    def descendants_of(self, category, include_self=False):
+        """Categories in the subtree under ``category`` (one indexed prefix query)."""
+        if not category.path:
+            return self.none()
+        qs = self.filter(path__startswith=category.path)
+        return qs if include_self else qs.exclude(pk=category.pk)
+
+    def ancestors_of(self, category, include_self=False):
+        """Categories on the path from the root down to ``category``."""
+        ids = path_to_ids(category.path)
+        if not include_self:
+            ids = ids[:-1]
+        return self.filter(pk__in=ids).order_by('depth')
+
+    def rebuild_paths(self):
+        """Recompute ``path``/``depth`` for every category from ``parent`` links.
+
+        Loads the whole (id, parent_id) adjacency list in one query and writes
+        the result back with ``bulk_update``; used to backfill existing trees.
+        """
+        rows = list(Category.objects.values_list('id', 'parent_id'))
+        children = defaultdict(list)
+        for pk, parent_id in rows:
+            children[parent_id].append(pk)
+
+        paths = {}
+        stack = [(pk, '') for pk in children[None]]
+        while stack:
+            pk, parent_path = stack.pop()
+            paths[pk] = parent_path + _path_segment(pk)
+            stack.extend((child, paths[pk]) for child in children[pk])
+
+        updates = [
+            Category(pk=pk, path=path, depth=path.count('/') - 1)
+            for pk, path in paths.items()
+        ]
+        Category.objects.bulk_update(updates, ['path', 'depth'], batch_size=1000)
+        return len(updates)
+
+
 class Category(models.Model):
     name = models.CharField(max_length=200)
     slug = models.SlugField(max_length=200, blank=True)
     parent = models.ForeignKey(
         'self', null=True, blank=True, related_name='children', on_delete=models.CASCADE
     )
+    # Materialized path: zero-padded ids from the root down to this node, e.g.
+    # "0000000001/0000000007/". Maintained by save(); never edit by hand.
+    path = models.CharField(max_length=255, db_index=True, default='', editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    objects = CategoryQuerySet.as_manager()
 
     class Meta:
         unique_together = (('parent', 'slug'),)
         ordering = ('name',)
+        indexes = [models.Index(fields=['name', 'id'], name='category_name_id_idx')]
 
     def __str__(self):
         return self.name if not self.parent else f"{self.parent} > {self.name}"
@@ -28,34 +116,78 @@ class Category(models.Model):
                 counter += 1
                 slug = f"{base}-{counter}"
             self.slug = slug
-        super().save(*args, **kwargs)
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'parent' not in update_fields:
+            super().save(*args, **kwargs)
+            return
+
+        with transaction.atomic():
+            previous_path = None
+            if self.pk is not None:
+                previous_path = Category.objects.filter(pk=self.pk).values_list('path', flat=True).first()
+
+            parent_path = ''
+            if self.parent_id is not None:
+                parent_path = Category.objects.values_list('path', flat=True).get(pk=self.parent_id)
+                if previous_path and parent_path.startswith(previous_path):
+                    raise ValueError("A category cannot be moved under itself or one of its descendants.")
+
+            if self.pk is None:
+                super().save(*args, **kwargs)
+                self._set_path(parent_path)
+                Category.objects.filter(pk=self.pk).update(path=self.path, depth=self.depth)
+                return
+
+            self._set_path(parent_path)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'path', 'depth'}
+            super().save(*args, **kwargs)
+
+            if previous_path and previous_path != self.path:
+                # Re-parent the whole subtree with a single prefix rewrite.
+                Category.objects.filter(path__startswith=previous_path).exclude(pk=self.pk).update(
+                    path=Concat(Value(self.path), Substr('path', len(previous_path) + 1),
+                                output_field=models.CharField()),
+                    depth=F('depth') + (self.depth - (previous_path.count('/') - 1)),
+                )
+                category_moved.send(sender=Category, instance=self, previous_path=previous_path)
+
+    def _set_path(self, parent_path):
+        self.path = parent_path + _path_segment(self.pk)
+        self.depth = self.path.count('/') - 1
+
+    def ancestor_ids(self):
+        """Ids of the ancestors from root down to parent, read from the path (no query)."""
+        return path_to_ids(self.path)[:-1]
+
+    def is_descendant_of(self, other):
+        return self.pk != other.pk and bool(other.path) and self.path.startswith(other.path)
 
     def get_ancestors(self):
         """Return a list of ancestors from root down to parent (excluding self)."""
-        node = self
-        ancestors = []
-        while node.parent is not None:
-            node = node.parent
-            ancestors.append(node)
-        return ancestors[::-1]
+        return list(Category.objects.ancestors_of(self))
 
     def get_descendants(self):
-        """Return a flat list of all descendant Category instances (recursive)."""
-        descendants = []
-        children = list(self.children.all())
-        for child in children:
-            descendants.append(child)
-            descendants.extend(child.get_descendants())
-        return descendants
+        """Return a queryset of all descendant categories (single query)."""
+        return Category.objects.descendants_of(self)
 
     def get_tree(self):
         """Return nested dict representing subtree rooted at this category."""
-        return {
-            'id': self.id,
-            'name': self.name,
-            'slug': self.slug,
-            'children': [child.get_tree() for child in self.children.all().order_by('name')]
-        }
+        nodes = Category.objects.descendants_of(self, include_self=True).order_by('name')
+        rows = nodes.values('id', 'name', 'slug', 'parent_id')
+        return build_category_tree(rows, root_parent_id=self.parent_id)[0]
+
+
+class ProductQuerySet(models.QuerySet):
+    def in_category(self, category, include_descendants=True):
+        """Products linked to ``category`` (or anywhere in its subtree), without duplicates."""
+        links = Product.categories.through.objects
+        if include_descendants:
+            links = links.filter(category__path__startswith=category.path)
+        else:
+            links = links.filter(category=category)
+        return self.filter(pk__in=links.values('product_id'))
 
 
 class Product(models.Model):
@@ -65,16 +197,50 @@ class Product(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
     categories = models.ManyToManyField(Category, related_name='products', blank=True)
     stock = models.PositiveIntegerField(default=0)
+    # Number of stock counters: the ``stock`` column plus ``stock_shards - 1`` StockShard rows
+    stock_shards = models.PositiveSmallIntegerField(default=1)
+    # Weighted name/description tsvector, kept current by a PostgreSQL trigger (see migration 0011)
+    search_vector = SearchVectorField(null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ProductQuerySet.as_manager()
+
     class Meta:
         ordering = ('name',)
+        indexes = [
+            models.Index(fields=['name', 'id'], name='product_name_id_idx'),
+            models.Index(fields=['price', 'id'], name='product_price_id_idx'),
+            models.Index(fields=['-created_at', '-id'], name='product_created_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.description})"
 
 
+class CategoryPriceStats(models.Model):
+    """Price rollup over the distinct products in a category's whole subtree.
+
+    Maintained incrementally by ``ecommerce_app.rollups`` from model signals.
+    """
+    category = models.OneToOneField(
+        Category, primary_key=True, related_name='price_stats', on_delete=models.CASCADE
+    )
+    product_count = models.PositiveIntegerField(default=0)
+    price_sum = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0.00'))
+    price_min = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    price_max = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.category_id}: {self.product_count} products"
+
+    @property
+    def average_price(self):
+        if not self.product_count:
+            return Decimal('0.00')
+        return (self.price_sum / self.product_count).quantize(Decimal('0.01'))
+
+
 class Customer(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='customer_profile')
     first_name = models.CharField(max_length=120)
@@ -86,11 +252,50 @@ class Customer(models.Model):
     last_login = models.DateTimeField(null=True, blank=True)
     class Meta:
         ordering = ('last_name', 'first_name')
+        indexes = [models.Index(fields=['last_name', 'first_name', 'id'], name='customer_name_id_idx')]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name} <{self.email}>"
 
 
+def line_amount():
+    return models.ExpressionWrapper(
+        F('unit_price') * F('quantity'), output_field=DecimalField(max_digits=12, decimal_places=2)
+    )
+
+
+class OrderQuerySet(models.QuerySet):
+    def with_computed_totals(self):
+        """Annotate ``computed_total``/``computed_item_count`` from the lines, in SQL."""
+        return self.annotate(
+            computed_total=Coalesce(
+                Sum(F('items__unit_price') * F('items__quantity'),
+                    output_field=DecimalField(max_digits=12, decimal_places=2)),
+                Value(Decimal('0.00')),
+            ),
+            computed_item_count=Coalesce(Sum('items__quantity'), Value(0)),
+        )
+
+    def revenue(self):
+        """Order count, revenue and units sold from the stored totals; never reads lines."""
+        return self.aggregate(
+            orders=Count('pk'),
+            revenue=Coalesce(Sum('total_amount'), Value(Decimal('0.00'))),
+            items=Coalesce(Sum('item_count'), Value(0)),
+        )
+
+    def recalculate_totals(self):
+        """Recompute the stored totals of these orders with one UPDATE."""
+        lines = OrderItem.objects.filter(order=OuterRef('pk')).order_by().values('order')
+        return self.update(
+            total_amount=Coalesce(
+                Subquery(lines.annotate(total=Sum(line_amount())).values('total')),
+                Value(Decimal('0.00')),
+            ),
+            item_count=Coalesce(Subquery(lines.annotate(count=Sum('quantity')).values('count')), Value(0)),
+        )
+
+
 class Order(models.Model):
     STATUS_CHOICES = (
         ('pending', 'Pending'),
@@ -104,18 +309,28 @@ class Order(models.Model):
     placed_at = models.DateTimeField(auto_now_add=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     shipping_address = models.TextField(blank=True)
+    # Stored when the lines are written; see OrderQuerySet.recalculate_totals
+    total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    item_count = models.PositiveIntegerField(default=0)
+
+    objects = OrderQuerySet.as_manager()
 
     class Meta:
         ordering = ('-placed_at',)
+        indexes = [models.Index(fields=['-placed_at', '-id'], name='order_placed_at_id_idx')]
 
     def __str__(self):
         return f"Order #{self.pk} — {self.customer} — {self.status}"
 
     @property
     def total(self):
-        items = self.items.all()
-        total = sum((item.unit_price * item.quantity) for item in items)
-        return total
+        return self.total_amount
+
+    def set_totals(self, lines):
+        """Set the stored totals from ``(unit_price, quantity)`` pairs."""
+        lines = list(lines)
+        self.total_amount = sum((Decimal(price) * quantity for price, quantity in lines), Decimal('0.00'))
+        self.item_count = sum(quantity for _, quantity in lines)
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, related_name='items', on_delete=models.CASCADE)
@@ -130,4 +345,84 @@ class OrderItem(models.Model):
         return f"{self.quantity} x {self.product.name} @ {self.unit_price}"
 
     def line_total(self):
-        return self.unit_price * self.quantity
\ No newline at end of file
+        return self.unit_price * self.quantity
+
+    # Bulk writes (OrderSerializer) set the order totals themselves; single-line edits refresh them here.
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.refresh_order_totals()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self.refresh_order_totals()
+        return result
+
+    def refresh_order_totals(self):
+        Order.objects.filter(pk=self.order_id).recalculate_totals()
+        if self._meta.get_field('order').is_cached(self):
+            self.order.refresh_from_db(fields=['total_amount', 'item_count'])
+
+
+class StockShard(models.Model):
+    """Extra stock counter for a hot product; shard 0 is ``Product.stock`` itself."""
+    product = models.ForeignKey(Product, related_name='stock_shard_rows', on_delete=models.CASCADE)
+    index = models.PositiveSmallIntegerField()
+    quantity = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = (('product', 'index'),)
+
+    def __str__(self):
+        return f"{self.product_id}[{self.index}] = {self.quantity}"
+
+
+class StockReservation(models.Model):
+    """Units taken from one stock counter, returned to it if released."""
+    STATUS_CHOICES = (
+        ('active', 'Active'),
+        ('committed', 'Committed'),
+        ('released', 'Released'),
+    )
+
+    product = models.ForeignKey(Product, related_name='+', on_delete=models.CASCADE)
+    order = models.ForeignKey(Order, related_name='reservations', null=True, blank=True, on_delete=models.SET_NULL)
+    shard = models.PositiveSmallIntegerField(default=0)
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active')
+    expires_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'expires_at'], name='reservation_expiry_idx')]
+
+    def __str__(self):
+        return f"{self.quantity} x product {self.product_id} ({self.status})"
+
+
+class OutboxMessage(models.Model):
+    """Notification queued in the same transaction as the write that caused it."""
+    KIND_CHOICES = (
+        ('sms', 'SMS'),
+        ('email', 'Email'),
+    )
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('dead', 'Dead'),
+    )
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    payload = models.JSONField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ('id',)
+        indexes = [models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx')]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
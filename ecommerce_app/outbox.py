@@ -0,0 +1,120 @@
+"""Transactional outbox for side effects of writes (SMS, email).
+
+Messages are inserted in the same transaction as the order, so they exist
+if and only if the order does. ``OutboxWorker`` drains them out of band with
+retries, exponential backoff and dead-lettering.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import notifications
+from .models import OutboxMessage
+from .sms_dispatch import BatchSMSDispatcher
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(messages):
+    """Queue ``(kind, payload)`` pairs; call inside the writer's transaction."""
+    return OutboxMessage.objects.bulk_create(
+        [OutboxMessage(kind=kind, payload=payload) for kind, payload in messages]
+    )
+
+
+class OutboxWorker:
+    """Claims due messages in batches and delivers them.
+
+    SMS messages go through ``BatchSMSDispatcher`` so a batch costs one gateway
+    call per distinct text; other kinds run on a thread pool. Only the external
+    calls leave the calling thread, so pool threads never hold DB connections.
+    """
+
+    def __init__(self, pool_size=None, batch_size=None, max_attempts=None,
+                 backoff_seconds=None, lease_seconds=None, linger_seconds=None, sms_client=None):
+        self.pool_size = pool_size or settings.OUTBOX_POOL_SIZE
+        self.batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+        self.max_attempts = max_attempts or settings.OUTBOX_MAX_ATTEMPTS
+        self.backoff_seconds = backoff_seconds if backoff_seconds is not None else settings.OUTBOX_BACKOFF_SECONDS
+        self.lease_seconds = lease_seconds or settings.OUTBOX_LEASE_SECONDS
+        self.linger_seconds = linger_seconds if linger_seconds is not None else settings.OUTBOX_LINGER_SECONDS
+        self.sms_dispatcher = BatchSMSDispatcher(client=sms_client)
+        self.handlers = {
+            'email': notifications.send_email,
+        }
+
+    def claim(self, limit=None):
+        """Lock a batch of due messages and lease them so other workers skip them."""
+        now = timezone.now()
+        with transaction.atomic():
+            due = (OutboxMessage.objects
+                   .filter(status='pending', next_attempt_at__lte=now)
+                   .order_by('next_attempt_at', 'id')
+                   .select_for_update(skip_locked=True))
+            messages = list(due[:limit or self.batch_size])
+            OutboxMessage.objects.filter(pk__in=[m.pk for m in messages]).update(
+                next_attempt_at=now + timedelta(seconds=self.lease_seconds)
+            )
+        return messages
+
+    def collect(self):
+        """Claim a batch, lingering briefly so concurrent orders can share SMS calls."""
+        messages = self.claim()
+        deadline = time.monotonic() + self.linger_seconds
+        while messages and len(messages) < self.batch_size and time.monotonic() < deadline:
+            time.sleep(min(0.05, max(0.0, deadline - time.monotonic())))
+            messages += self.claim(limit=self.batch_size - len(messages))
+        return messages
+
+    def deliver(self, message):
+        """Run the handler for one message; returns the error, or None on success."""
+        try:
+            self.handlers[message.kind](message.payload)
+        except Exception as exc:  # any gateway failure is retried
+            return exc
+        return None
+
+    def record(self, message, error):
+        message.attempts += 1
+        if error is None:
+            message.status = 'sent'
+            message.sent_at = timezone.now()
+            message.last_error = ''
+        elif message.attempts >= self.max_attempts:
+            message.status = 'dead'
+            message.last_error = repr(error)
+            logger.error("Outbox message %s dead after %s attempts: %r", message.pk, message.attempts, error)
+        else:
+            delay = min(self.backoff_seconds * 2 ** (message.attempts - 1), settings.OUTBOX_MAX_BACKOFF_SECONDS)
+            message.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+            message.last_error = repr(error)
+            logger.warning("Outbox message %s failed (attempt %s): %r", message.pk, message.attempts, error)
+        message.save(update_fields=['attempts', 'status', 'sent_at', 'next_attempt_at', 'last_error'])
+
+    def run_once(self):
+        """Deliver one batch; returns the number of messages processed."""
+        messages = self.collect()
+        if not messages:
+            return 0
+        sms = [m for m in messages if m.kind == 'sms']
+        others = [m for m in messages if m.kind != 'sms']
+
+        with ThreadPoolExecutor(max_workers=self.pool_size) as pool:
+            results = pool.map(self.deliver, others)
+            errors = self.sms_dispatcher.dispatch([(m.pk, m.payload) for m in sms]) if sms else {}
+            errors.update(zip((m.pk for m in others), results))
+
+        for message in messages:
+            self.record(message, errors[message.pk])
+        return len(messages)
+
+    def run(self, poll_interval=None, should_stop=lambda: False):
+        poll_interval = poll_interval if poll_interval is not None else settings.OUTBOX_POLL_INTERVAL
+        while not should_stop():
+            if not self.run_once():
+                time.sleep(poll_interval)
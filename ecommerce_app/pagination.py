@@ -0,0 +1,141 @@
+"""Keyset (cursor) pagination for the list endpoints.
+
+Pages are addressed by the ordering values of a boundary row rather than an
+offset, so every page is an indexed range scan and rows inserted while a
+client is paging never shift or duplicate what it sees.
+"""
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Opaque-cursor pagination over ``ordering``, which must end with ``id``/``-id``."""
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, ordering, page_size=None, max_page_size=None):
+        if ordering[-1].lstrip('-') != 'id':
+            raise ValueError("Keyset ordering must end with an 'id' tie-breaker.")
+        self.ordering = tuple(ordering)
+        self.page_size = page_size or settings.API_PAGE_SIZE
+        self.max_page_size = max_page_size or settings.API_MAX_PAGE_SIZE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.paginate_rows(list(self.page_queryset(queryset, request)))
+
+    def page_queryset(self, queryset, request):
+        """Return the (unevaluated) slice holding this page plus one look-ahead row."""
+        self.request = request
+        self.model = queryset.model
+        self.size = self.get_page_size(request)
+        self.cursor = self.decode_cursor(request)
+        self.reverse = bool(self.cursor and self.cursor['r'])
+
+        ordering = self._flip(self.ordering) if self.reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if self.cursor:
+            queryset = queryset.filter(self._after(ordering, self.cursor['v']))
+        return queryset[:self.size + 1]
+
+    def paginate_rows(self, rows):
+        has_more = len(rows) > self.size
+        rows = rows[:self.size]
+        if self.reverse:
+            rows.reverse()
+
+        self.next_cursor = self.previous_cursor = None
+        if rows:
+            if has_more or self.reverse:
+                self.next_cursor = self.encode_cursor(rows[-1], reverse=False)
+            if self.cursor and (has_more or not self.reverse):
+                self.previous_cursor = self.encode_cursor(rows[0], reverse=True)
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_payload(data))
+
+    def get_paginated_payload(self, data):
+        return {
+            'next': self._link(self.next_cursor),
+            'previous': self._link(self.previous_cursor),
+            'results': data,
+        }
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            size = self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            values = [
+                self.model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, cursor['v'], strict=True)
+            ]
+            return {'v': values, 'r': bool(cursor.get('r'))}
+        except (TypeError, ValueError, KeyError, binascii.Error, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, row, reverse):
+        values = []
+        for field in self.ordering:
+            value = getattr(row, field.lstrip('-'))
+            if hasattr(value, 'isoformat'):
+                value = value.isoformat()
+            elif not isinstance(value, (int, str)):
+                value = str(value)
+            values.append(value)
+        payload = json.dumps({'v': values, 'r': int(reverse)}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    def _link(self, cursor):
+        if cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    @staticmethod
+    def _flip(ordering):
+        return tuple(field[1:] if field.startswith('-') else f'-{field}' for field in ordering)
+
+    @staticmethod
+    def _after(ordering, values):
+        """Rows strictly after ``values`` in ``ordering`` (lexicographic comparison).
+
+        The redundant bound on the leading column lets the database use the
+        composite index as a range scan instead of evaluating the OR per row.
+        """
+        names = [field.lstrip('-') for field in ordering]
+        ops = ['lt' if field.startswith('-') else 'gt' for field in ordering]
+
+        condition = Q()
+        for i, (name, op) in enumerate(zip(names, ops)):
+            clause = Q(**{f'{name}__{op}': values[i]})
+            for prev_name, prev_value in zip(names[:i], values[:i]):
+                clause &= Q(**{prev_name: prev_value})
+            condition |= clause
+        return Q(**{f'{names[0]}__{ops[0]}e': values[0]}) & condition
+
+
+class SearchPagination(PageNumberPagination):
+    """Numbered pages for relevance-ordered results, which have no stable keyset."""
+    page_size_query_param = 'page_size'
+
+    def __init__(self):
+        self.page_size = settings.API_PAGE_SIZE
+        self.max_page_size = settings.API_MAX_PAGE_SIZE
@@ -0,0 +1,47 @@
+"""Lazily built clients for external services.
+
+A provider is registered as a factory and built on first ``get``, so
+importing the app (every worker, management command and test process)
+never imports or configures a client it does not use. Instances are
+shared per process; ``reset`` drops them, e.g. after settings change.
+"""
+import threading
+
+_factories = {}
+_instances = {}
+_lock = threading.Lock()
+
+
+def register(name, factory):
+    """Make ``get(name)`` return ``factory()``, built once on first use."""
+    with _lock:
+        _factories[name] = factory
+        _instances.pop(name, None)
+
+
+def get(name):
+    try:
+        return _instances[name]
+    except KeyError:
+        pass
+    with _lock:
+        if name not in _instances:
+            try:
+                factory = _factories[name]
+            except KeyError:
+                raise LookupError(f"No provider registered as {name!r}.") from None
+            _instances[name] = factory()
+        return _instances[name]
+
+
+def reset(name=None):
+    """Forget the built instance of ``name`` (or of every provider)."""
+    with _lock:
+        if name is None:
+            _instances.clear()
+        else:
+            _instances.pop(name, None)
+
+
+def is_built(name):
+    return name in _instances
@@ -0,0 +1,196 @@
+"""Read-through cache for rendered catalog responses and fragments.
+
+Keys embed the version counters (``ecommerce_app.caching``) of every
+namespace the payload depends on. Model signals bump those versions, so a
+write makes exactly the dependent entries unreachable and nothing has to be
+deleted. Only one caller rebuilds a missing entry: the others wait briefly
+for its result instead of all hitting the database at once.
+"""
+import functools
+import hashlib
+import json
+import threading
+import time
+from collections import Counter
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from . import caching, db_router
+
+WAIT_POLL_INTERVAL = 0.02
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _count(label, outcome):
+    with _stats_lock:
+        _stats[(label, outcome)] += 1
+
+
+def stats():
+    """``{label: {'hit': n, 'miss': n, 'wait': n}}`` for this process."""
+    with _stats_lock:
+        snapshot = dict(_stats)
+    result = {}
+    for (label, outcome), value in snapshot.items():
+        result.setdefault(label, {'hit': 0, 'miss': 0, 'wait': 0})[outcome] = value
+    return result
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+class CachedResponse(Response):
+    """DRF response around an already-rendered JSON body; ``data`` is parsed only if read."""
+
+    def __init__(self, body, **kwargs):
+        self._body = body
+        super().__init__(**kwargs)
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = json.loads(self._body)
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+
+    @property
+    def rendered_content(self):
+        renderer = getattr(self, 'accepted_renderer', None)
+        if type(renderer) is JSONRenderer and self.accepted_media_type == renderer.media_type:
+            self['Content-Type'] = renderer.media_type
+            return self._body
+        # e.g. the browsable API
+        return super().rendered_content
+
+
+def get_or_build(key, build, timeout=None, label='fragment', namespaces=()):
+    """Return ``(value, hit)``; ``build()`` runs at most once at a time per key.
+
+    ``build`` may return None for results that must not be cached. It reads
+    from the primary database if one of ``namespaces`` changed very recently.
+    Without a shared cache (``caching.enabled()``) it always builds.
+    """
+    if not caching.enabled():
+        with db_router.primary_if_recently_changed(*namespaces):
+            return build(), False
+
+    value = cache.get(key)
+    if value is not None:
+        _count(label, 'hit')
+        return value, True
+
+    timeout = settings.RESPONSE_CACHE_TIMEOUT if timeout is None else timeout
+    lock_key = f"lock:{key}"
+    if cache.add(lock_key, 1, settings.RESPONSE_CACHE_LOCK_TIMEOUT):
+        try:
+            _count(label, 'miss')
+            with db_router.primary_if_recently_changed(*namespaces):
+                value = build()
+            if value is not None:
+                cache.set(key, value, timeout)
+        finally:
+            cache.delete(lock_key)
+        return value, False
+
+    # Another worker is building this entry: wait for it rather than pile on
+    _count(label, 'wait')
+    deadline = time.monotonic() + settings.RESPONSE_CACHE_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_POLL_INTERVAL)
+        value = cache.get(key)
+        if value is not None:
+            _count(label, 'hit')
+            return value, True
+    _count(label, 'miss')
+    with db_router.primary_if_recently_changed(*namespaces):
+        return build(), False
+
+
+async def aget_or_build(key, build, timeout=None, label='fragment', namespaces=()):
+    """``get_or_build`` for async views; ``build`` is a coroutine function.
+
+    A hit is one cache read. A miss takes the same single-flight path in the
+    request's sync thread (Django gives each ASGI request its own), so waiting
+    on another builder never blocks the event loop or other requests.
+    """
+    if caching.enabled():
+        value = await cache.aget(key)
+        if value is not None:
+            _count(label, 'hit')
+            return value, True
+    return await sync_to_async(get_or_build)(key, async_to_sync(build), timeout, label, namespaces)
+
+
+def _response_key(label, names, request):
+    versions = ':'.join(str(caching.get_version(ns)) for ns in names)
+    url_hash = hashlib.md5(request.build_absolute_uri().encode('utf-8')).hexdigest()
+    return f"response:{label}:{versions}:{url_hash}"
+
+
+def cache_response(*namespaces, timeout=None):
+    """Cache an APIView ``get``'s 200 responses as rendered JSON.
+
+    ``namespaces`` may use the view's URL kwargs, e.g. ``'product:{pk}'``.
+    The key covers the full absolute URL, so pagination links stay correct.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            if not caching.enabled():
+                return method(view, request, *args, **kwargs)
+            label = type(view).__name__
+            names = [ns.format(**kwargs) for ns in namespaces]
+            uncached = []
+
+            def build():
+                response = method(view, request, *args, **kwargs)
+                if isinstance(response, Response) and response.status_code == 200:
+                    return JSONRenderer().render(response.data)
+                uncached.append(response)
+                return None
+
+            body, hit = get_or_build(_response_key(label, names, request), build, timeout, label, names)
+            if body is None:
+                return uncached[0]
+            return CachedResponse(body, headers={'X-Cache': 'HIT' if hit else 'MISS'})
+        return wrapper
+    return decorator
+
+
+def async_cache_response(*namespaces, timeout=None):
+    """``cache_response`` for async views that answer with JSON ``HttpResponse``s."""
+    def decorator(method):
+        @functools.wraps(method)
+        async def wrapper(view, request, *args, **kwargs):
+            if not caching.enabled():
+                return await method(view, request, *args, **kwargs)
+            label = type(view).__name__
+            names = [ns.format(**kwargs) for ns in namespaces]
+            uncached = []
+
+            async def build():
+                response = await method(view, request, *args, **kwargs)
+                if response.status_code == 200 and not response.streaming:
+                    return response.content
+                uncached.append(response)
+                return None
+
+            key = await sync_to_async(_response_key)(label, names, request)
+            body, hit = await aget_or_build(key, build, timeout, label, names)
+            if body is None:
+                return uncached[0]
+            return HttpResponse(body, content_type='application/json', headers={'X-Cache': 'HIT' if hit else 'MISS'})
+        return wrapper
+    return decorator
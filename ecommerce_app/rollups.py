@@ -0,0 +1,91 @@
+"""Incremental maintenance of ``CategoryPriceStats`` subtree rollups.
+
+A product contributes once to every category on the paths from the root to
+each of its categories (its *coverage*). Changes are applied as deltas on
+count/sum; min/max are recomputed only for rows whose extreme was removed.
+"""
+from decimal import Decimal
+
+from django.db.models import Case, Count, DecimalField, F, Max, Min, Q, Sum, Value, When
+
+from .models import Category, CategoryPriceStats, Product, path_to_ids
+
+ProductCategory = Product.categories.through
+
+
+def coverage(product_ids):
+    """Map each product id to the set of category ids whose subtree contains it."""
+    result = {pk: set() for pk in product_ids}
+    if not result:
+        return result
+    rows = ProductCategory.objects.filter(product_id__in=product_ids).values_list('product_id', 'category__path')
+    for product_id, path in rows:
+        result[product_id].update(path_to_ids(path))
+    return result
+
+
+def apply_change(old_price, old_coverage, new_price, new_coverage):
+    """Move one product's contribution from ``old_coverage`` to ``new_coverage``."""
+    old_price = None if old_price is None else Decimal(old_price)
+    new_price = None if new_price is None else Decimal(new_price)
+    if old_price == new_price:
+        removed, added = old_coverage - new_coverage, new_coverage - old_coverage
+    else:
+        removed, added = old_coverage, new_coverage
+
+    dirty = _remove(removed, old_price) if removed else []
+    if added:
+        _add(added, new_price)
+    if dirty:
+        refresh(dirty)
+
+
+def _remove(category_ids, price):
+    rows = CategoryPriceStats.objects.filter(category_id__in=category_ids)
+    dirty = list(rows.filter(Q(price_min=price) | Q(price_max=price)).values_list('category_id', flat=True))
+    rows.update(product_count=F('product_count') - 1, price_sum=F('price_sum') - price)
+    return dirty
+
+
+def _add(category_ids, price):
+    CategoryPriceStats.objects.bulk_create(
+        [CategoryPriceStats(category_id=pk) for pk in category_ids], ignore_conflicts=True
+    )
+    decimal = DecimalField(max_digits=10, decimal_places=2)
+    CategoryPriceStats.objects.filter(category_id__in=category_ids).update(
+        product_count=F('product_count') + 1,
+        price_sum=F('price_sum') + price,
+        price_min=Case(
+            When(Q(price_min__isnull=True) | Q(price_min__gt=price), then=Value(price)),
+            default=F('price_min'), output_field=decimal,
+        ),
+        price_max=Case(
+            When(Q(price_max__isnull=True) | Q(price_max__lt=price), then=Value(price)),
+            default=F('price_max'), output_field=decimal,
+        ),
+    )
+
+
+def refresh(category_ids):
+    """Recompute the rollup rows of ``category_ids`` from scratch."""
+    for category in Category.objects.filter(pk__in=category_ids).only('pk', 'path'):
+        in_subtree = ProductCategory.objects.filter(category__path__startswith=category.path).values('product_id')
+        stats = Product.objects.filter(pk__in=in_subtree).aggregate(
+            product_count=Count('pk'), price_sum=Sum('price'), price_min=Min('price'), price_max=Max('price'),
+        )
+        stats['price_sum'] = stats['price_sum'] or Decimal('0.00')
+        CategoryPriceStats.objects.update_or_create(category_id=category.pk, defaults=stats)
+
+
+def rebuild():
+    """Recompute every rollup row; used for backfills."""
+    ids = list(Category.objects.values_list('pk', flat=True))
+    refresh(ids)
+    return len(ids)
+
+
+def category_moved(category, previous_path):
+    """Refresh the ancestors that gained or lost ``category``'s subtree."""
+    before = set(path_to_ids(previous_path)[:-1])
+    after = set(category.ancestor_ids())
+    refresh(before ^ after)
@@ -0,0 +1,120 @@
+"""Product search over name and description.
+
+On PostgreSQL this matches the trigger-maintained ``search_vector`` (GIN
+index) with a websearch query, widens it with trigram similarity on the name
+(pg_trgm GIN index) so typos still match, and ranks by both. Other backends
+(the SQLite test runs) use an inverted index built in-process and rebuilt
+whenever the ``products`` cache version moves.
+"""
+import bisect
+import difflib
+import re
+import threading
+from collections import defaultdict
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db import connections
+from django.db.models import Case, F, Q, Value, When
+
+from . import caching
+from .models import Product
+
+SEARCH_CONFIG = 'english'
+TOKEN_RE = re.compile(r'\w+')
+NAME_WEIGHT = 2.0
+DESCRIPTION_WEIGHT = 1.0
+PREFIX_FACTOR = 0.8
+FUZZY_FACTOR = 0.5
+FUZZY_CUTOFF = 0.75
+MAX_FALLBACK_RESULTS = 1000
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or '').lower())
+
+
+def search_products(query, queryset=None):
+    """Filter ``queryset`` (default: all products) to matches for ``query``, best first."""
+    queryset = Product.objects.all() if queryset is None else queryset
+    if connections[queryset.db].vendor == 'postgresql':
+        return _postgres_search(query, queryset)
+    return _index_search(query, queryset)
+
+
+def _postgres_search(query, queryset):
+    search_query = SearchQuery(query, search_type='websearch', config=SEARCH_CONFIG)
+    return queryset.filter(
+        Q(search_vector=search_query) | Q(name__trigram_similar=query)
+    ).annotate(
+        rank=SearchRank(F('search_vector'), search_query) + TrigramSimilarity('name', query)
+    ).order_by('-rank', 'id')
+
+
+def _index_search(query, queryset):
+    ranked = get_index().search(query)[:MAX_FALLBACK_RESULTS]
+    if not ranked:
+        return queryset.none()
+    position = Case(*[When(pk=pk, then=Value(i)) for i, pk in enumerate(ranked)])
+    return queryset.filter(pk__in=ranked).order_by(position)
+
+
+class InvertedIndex:
+    """token -> {product id: weight}; every query term must match (exactly, by prefix or fuzzily)."""
+
+    def __init__(self, rows):
+        self.postings = defaultdict(dict)
+        for pk, name, description in rows:
+            for tokens, weight in ((tokenize(name), NAME_WEIGHT), (tokenize(description), DESCRIPTION_WEIGHT)):
+                for token in tokens:
+                    postings = self.postings[token]
+                    postings[pk] = max(postings.get(pk, 0.0), weight)
+        self.vocabulary = sorted(self.postings)
+
+    def search(self, query):
+        """Return matching product ids, highest score first."""
+        scores = None
+        for term in dict.fromkeys(tokenize(query)):
+            term_scores = defaultdict(float)
+            for token, factor in self._expand(term):
+                for pk, weight in self.postings[token].items():
+                    term_scores[pk] = max(term_scores[pk], weight * factor)
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {pk: score + term_scores[pk] for pk, score in scores.items() if pk in term_scores}
+            if not scores:
+                return []
+        return sorted(scores, key=lambda pk: (-scores[pk], pk)) if scores else []
+
+    def _expand(self, term):
+        matches = {}
+        start = bisect.bisect_left(self.vocabulary, term)
+        for token in self.vocabulary[start:]:
+            if not token.startswith(term):
+                break
+            matches[token] = 1.0 if token == term else PREFIX_FACTOR
+        if not matches:
+            for token in difflib.get_close_matches(term, self.vocabulary, n=3, cutoff=FUZZY_CUTOFF):
+                matches[token] = FUZZY_FACTOR
+        return matches.items()
+
+
+_index = (None, None)
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """The process-wide index for the current ``products`` version."""
+    global _index
+    if not caching.enabled():
+        # Another process's writes would never reach a process-local version
+        return InvertedIndex(Product.objects.values_list('pk', 'name', 'description').iterator())
+    version = caching.get_version('products')
+    built_for, index = _index
+    if built_for != version:
+        with _index_lock:
+            built_for, index = _index
+            if built_for != version:
+                index = InvertedIndex(Product.objects.values_list('pk', 'name', 'description').iterator())
+                _index = (version, index)
+    return index
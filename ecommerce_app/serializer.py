@@ -1,29 +1,60 @@
 from django.contrib.auth import logout
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, redirect
+from django.db import transaction
+from django.db.models import Prefetch
 from rest_framework import serializers, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from . import inventory
+from .metrics import TimedSerializerMixin
 from .models import Category, Product, Customer, Order, OrderItem
 
 
-class CategorySerializer(serializers.ModelSerializer):
-    children = serializers.SerializerMethodField()
-
+class CategorySerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Category
-        fields = ['id', 'name', 'slug', 'parent', 'children']
+        fields = ['id', 'name', 'slug', 'parent', 'depth']
+        read_only_fields = ['depth']
+
+    def validate_parent(self, value):
+        """Reject moves that would put a category under its own subtree"""
+        if self.instance and value and (value.pk == self.instance.pk or value.is_descendant_of(self.instance)):
+            raise serializers.ValidationError("A category cannot be moved under itself or one of its descendants.")
+        return value
+
+
+class CategoryDetailSerializer(CategorySerializer):
+    children = serializers.SerializerMethodField()
+
+    class Meta(CategorySerializer.Meta):
+        fields = CategorySerializer.Meta.fields + ['children']
 
     def get_children(self, obj):
-        return CategorySerializer(obj.children.all(), many=True).data
+        """Whole subtree, built in memory from a single query"""
+        return obj.get_tree()['children']
+
 
+class StockField(serializers.IntegerField):
+    """Units over all of a product's counters, not just ``Product.stock`` (shard 0)"""
 
-class ProductSerializer(serializers.ModelSerializer):
+    def get_attribute(self, instance):
+        annotated = getattr(instance, 'available_stock', None)
+        if annotated is not None:
+            return annotated
+        if instance.stock_shards <= 1:
+            return instance.stock
+        return inventory.available(instance)
+
+
+class ProductSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     categories = serializers.PrimaryKeyRelatedField(
         many=True, queryset=Category.objects.all())
     categories_name = serializers.SerializerMethodField()
+    stock = StockField(min_value=0, required=False)
+
     class Meta:
         model = Product
         fields = ['id', 'name', 'description', 'price', 'stock', 'categories', 'categories_name']
@@ -31,8 +62,32 @@ class ProductSerializer(serializers.ModelSerializer):
     def get_categories_name(self, obj):
         return [category.name for category in obj.categories.all()]
 
+    def update(self, instance, validated_data):
+        # Stock is never written from this possibly stale instance: that would undo
+        # concurrent reservations and ignore the product's other counters
+        stock = validated_data.pop('stock', None)
+        categories = validated_data.pop('categories', None)
+        with transaction.atomic():
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            instance.save(update_fields=[*validated_data, 'updated_at'])
+            if categories is not None:
+                instance.categories.set(categories)
+            if stock is not None:
+                inventory.set_stock(instance, stock)
+        return instance
+
+    @staticmethod
+    def setup_eager_loading(queryset, prefix=''):
+        """Prefetch plan shared by every view that renders products (2 queries per page)"""
+        if not prefix:
+            queryset = inventory.with_available(queryset)
+        return queryset.prefetch_related(
+            Prefetch(f'{prefix}categories', queryset=Category.objects.only('id', 'name'))
+        )
 
-class CustomerSerializer(serializers.ModelSerializer):
+
+class CustomerSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Customer
         fields = ['id','first_name', 'last_name', 'email', 'phone', 'created_at', 'last_login']
@@ -47,7 +102,21 @@ class CustomerSerializer(serializers.ModelSerializer):
 
 
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class ProductLookupField(serializers.PrimaryKeyRelatedField):
+    """Resolves from the products the parent OrderSerializer loaded in bulk, if any"""
+
+    def to_internal_value(self, data):
+        products = self.context.get('products')
+        if products is not None and not isinstance(data, bool):
+            try:
+                return products[int(data)]
+            except (KeyError, TypeError, ValueError):
+                pass
+        return super().to_internal_value(data)
+
+
+class OrderItemSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    product = ProductLookupField(queryset=Product.objects.all())
     product_detail = ProductSerializer(source='product', read_only=True)
 
     class Meta:
@@ -58,33 +127,119 @@ class OrderItemSerializer(serializers.ModelSerializer):
     def get_line_total(self, obj):
         return obj.line_total()
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return ProductSerializer.setup_eager_loading(queryset.select_related('product'), prefix='product__')
+
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True)
     customer_detail = CustomerSerializer(source='customer', read_only=True)
 
     class Meta:
         model = Order
         fields = ['id', 'customer', 'customer_detail',
-                  'shipping_address','items']
-        read_only_fields = ['total', 'placed_at']
+                  'shipping_address','items', 'total_amount', 'item_count']
+        read_only_fields = ['total_amount', 'item_count', 'placed_at']
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        items = OrderItemSerializer.setup_eager_loading(OrderItem.objects.all())
+        return queryset.select_related('customer').prefetch_related(Prefetch('items', queryset=items))
+
+    def to_internal_value(self, data):
+        # One query for every product on the order instead of one per line
+        items = data.get('items') if hasattr(data, 'get') else None
+        if isinstance(items, list):
+            ids = set()
+            for item in items:
+                try:
+                    ids.add(int(item['product']))
+                except (KeyError, TypeError, ValueError):
+                    pass
+            self.context['products'] = Product.objects.in_bulk(ids)
+        return super().to_internal_value(data)
+
+    def validate_items(self, items):
+        product_ids = [item['product'].pk for item in items]
+        if len(product_ids) != len(set(product_ids)):
+            raise serializers.ValidationError("Each product may appear only once per order.")
+        return items
 
     def create(self, validated_data):
         items_data = validated_data.pop('items', [])
-        order = Order.objects.create(**validated_data)
-        for item_data in items_data:
-            OrderItem.objects.create(order=order, **item_data)
-        return order
+        order = Order(**validated_data)
+        order.set_totals((item['unit_price'], item['quantity']) for item in items_data)
+        with transaction.atomic():
+            order.save()
+            OrderItem.objects.bulk_create([OrderItem(order=order, **item_data) for item_data in items_data])
+            self.reserve_stock(order, items_data)
+        return self.hydrate(order)
 
     def update(self, instance, validated_data):
         items_data = validated_data.pop('items', None)
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
+        with transaction.atomic():
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+
+            if items_data is not None:
+                inventory.release_order(instance)
+                instance.items.all().delete()
+                OrderItem.objects.bulk_create([OrderItem(order=instance, **item_data) for item_data in items_data])
+                instance.set_totals((item['unit_price'], item['quantity']) for item in items_data)
+                if instance.status != 'cancelled':
+                    self.reserve_stock(instance, items_data)
+            instance.save()
+
+        return self.hydrate(instance)
+
+    @staticmethod
+    def reserve_stock(order, items_data):
+        try:
+            inventory.reserve_lines(order, [(item['product'], item['quantity']) for item in items_data])
+        except inventory.InsufficientStock as exc:
+            raise serializers.ValidationError({'items': [str(exc)]})
+
+    @classmethod
+    def hydrate(cls, order):
+        """Reload ``order`` with the full eager-loading plan for rendering and notifications"""
+        return cls.setup_eager_loading(Order.objects.filter(pk=order.pk)).get()
+
+
+class OrderLineSerializer(OrderItemSerializer):
+    """One order line written through /order-item/; every change takes the order's stock again"""
+    order = serializers.PrimaryKeyRelatedField(queryset=Order.objects.all())
+
+    class Meta(OrderItemSerializer.Meta):
+        fields = ['id', 'order'] + OrderItemSerializer.Meta.fields[1:]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance is not None:
+            # A line stays on its order
+            self.fields['order'].read_only = True
 
-        if items_data is not None:
-            instance.items.all().delete()
-            for item_data in items_data:
-                OrderItem.objects.create(order=instance, **item_data)
+    def create(self, validated_data):
+        with transaction.atomic():
+            item = super().create(validated_data)
+            self.reserve_order_stock(item.order)
+        return item
 
-        return instance
+    def update(self, instance, validated_data):
+        with transaction.atomic():
+            item = super().update(instance, validated_data)
+            self.reserve_order_stock(item.order)
+        return item
+
+    @staticmethod
+    def reserve_order_stock(order):
+        """Give back what ``order`` holds and reserve its current lines; call inside the line write's transaction."""
+        if order.status in inventory.COMMITTED_ORDER_STATUSES:
+            raise serializers.ValidationError({'order': [f"Lines of a {order.status} order cannot be changed."]})
+        inventory.release_order(order)
+        if order.status == 'cancelled':
+            return
+        try:
+            inventory.reserve_order(order)
+        except inventory.InsufficientStock as exc:
+            raise serializers.ValidationError({'quantity': [str(exc)]})
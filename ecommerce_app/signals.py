@@ -0,0 +1,124 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import caching, inventory, rollups
+from .models import Category, Customer, Order, Product, category_moved
+from .token_cache import token_cache
+
+
+@receiver(pre_save, sender=Product)
+def remember_product_price(sender, instance, raw=False, **kwargs):
+    instance._rollup_price = None
+    if instance.pk is not None and not raw:
+        instance._rollup_price = Product.objects.filter(pk=instance.pk).values_list('price', flat=True).first()
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, created, raw=False, **kwargs):
+    old_price = getattr(instance, '_rollup_price', None)
+    if created or raw or old_price is None or Decimal(old_price) == Decimal(instance.price):
+        return
+    covered = rollups.coverage([instance.pk])[instance.pk]
+    rollups.apply_change(old_price, covered, instance.price, covered)
+
+
+@receiver(pre_delete, sender=Product)
+def remember_product_coverage(sender, instance, **kwargs):
+    instance._rollup_coverage = rollups.coverage([instance.pk])[instance.pk]
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    covered = getattr(instance, '_rollup_coverage', set())
+    rollups.apply_change(instance.price, covered, instance.price, set())
+
+
+@receiver(m2m_changed, sender=Product.categories.through)
+def product_categories_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action.startswith('pre_'):
+        if not reverse:
+            product_ids = [instance.pk]
+        elif pk_set is not None:
+            product_ids = list(pk_set)
+        else:
+            product_ids = list(instance.products.values_list('pk', flat=True))
+        instance._rollup_snapshot = (product_ids, rollups.coverage(product_ids))
+        return
+
+    product_ids, before = instance.__dict__.pop('_rollup_snapshot', ([], {}))
+    if not product_ids:
+        return
+    after = rollups.coverage(product_ids)
+    prices = dict(Product.objects.filter(pk__in=product_ids).values_list('pk', 'price'))
+    for pk in product_ids:
+        rollups.apply_change(prices[pk], before[pk], prices[pk], after[pk])
+
+    # Category links are part of the product payload but do not touch the product row
+    Product.objects.filter(pk__in=product_ids).update(updated_at=timezone.now())
+    caching.bump_on_commit('products', *[caching.product_namespace(pk) for pk in product_ids])
+
+
+@receiver(category_moved, sender=Category)
+def category_reparented(sender, instance, previous_path, **kwargs):
+    rollups.category_moved(instance, previous_path)
+
+
+@receiver(post_delete, sender=Category)
+def category_deleted(sender, instance, **kwargs):
+    # Cascades delete the whole subtree; only the top node refreshes its ancestors.
+    if instance.parent_id and Category.objects.filter(pk=instance.parent_id).exists():
+        rollups.refresh(instance.ancestor_ids())
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_tree_changed(sender, instance, **kwargs):
+    caching.bump_on_commit('categories')
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def product_catalog_changed(sender, instance, **kwargs):
+    caching.bump_on_commit('products', caching.product_namespace(instance.pk))
+
+
+@receiver(post_save, sender=Customer)
+@receiver(post_delete, sender=Customer)
+def customer_changed(sender, instance, **kwargs):
+    token_cache.invalidate_user(instance.user_id)
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def user_changed(sender, instance, **kwargs):
+    token_cache.invalidate_user(instance.pk)
+
+
+@receiver(pre_save, sender=Order)
+def remember_order_status(sender, instance, raw=False, **kwargs):
+    instance._previous_status = None
+    if instance.pk is not None and not raw:
+        instance._previous_status = Order.objects.filter(pk=instance.pk).values_list('status', flat=True).first()
+    if instance._previous_status == 'cancelled' and instance.status != 'cancelled':
+        # Cancelling gave the units back: take them again, or refuse the change (InsufficientStock)
+        inventory.reserve_order(instance)
+
+
+@receiver(post_save, sender=Order)
+def order_status_changed(sender, instance, created, raw=False, **kwargs):
+    previous = getattr(instance, '_previous_status', None)
+    if created or raw or previous == instance.status:
+        return
+    if instance.status == 'cancelled':
+        inventory.release_order(instance)
+    elif instance.status in inventory.COMMITTED_ORDER_STATUSES:
+        inventory.commit_order(instance)
+
+
+@receiver(pre_delete, sender=Order)
+def order_deleted(sender, instance, **kwargs):
+    inventory.release_order(instance)
@@ -0,0 +1,87 @@
+"""Batched SMS delivery through the Africa's Talking bulk send API.
+
+Messages with identical text are sent in one ``sms.send(text, recipients)``
+call (up to ``SMS_BATCH_MAX_RECIPIENTS`` numbers) and the per-recipient
+results in the gateway response are mapped back to the originating message.
+"""
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+
+from django.conf import settings
+
+from . import metrics, providers
+
+# Africa's Talking recipient status codes that mean the message was accepted.
+SUCCESS_STATUS_CODES = {100, 101, 102}
+
+
+class RecipientFailed(Exception):
+    pass
+
+
+@dataclass
+class DispatchStats:
+    batches: int = 0
+    sent: int = 0
+    failed: int = 0
+    seconds: float = 0.0
+
+    @property
+    def throughput(self):
+        """Messages accepted by the gateway per second of gateway time."""
+        return self.sent / self.seconds if self.seconds else 0.0
+
+
+class BatchSMSDispatcher:
+
+    def __init__(self, client=None, max_recipients=None):
+        self.client = client
+        self.max_recipients = max_recipients or settings.SMS_BATCH_MAX_RECIPIENTS
+        self.stats = DispatchStats()
+
+    def dispatch(self, messages):
+        """Send ``(key, payload)`` pairs; return ``{key: error or None}``."""
+        by_text = defaultdict(list)
+        for key, payload in messages:
+            for number in payload['to']:
+                by_text[payload['message']].append((key, number))
+
+        errors = {key: None for key, _ in messages}
+        for text, entries in by_text.items():
+            for start in range(0, len(entries), self.max_recipients):
+                chunk = entries[start:start + self.max_recipients]
+                for key, error in self._send_batch(text, chunk):
+                    if error is not None and errors[key] is None:
+                        errors[key] = error
+
+        for error in errors.values():
+            if error is None:
+                self.stats.sent += 1
+            else:
+                self.stats.failed += 1
+        return errors
+
+    def _send_batch(self, text, entries):
+        numbers = list(dict.fromkeys(number for _, number in entries))
+        started = time.perf_counter()
+        try:
+            with metrics.external_call('sms'):
+                response = (self.client or providers.get('sms')).send(text, numbers)
+        except Exception as exc:  # whole call failed; every message is retried
+            return [(key, exc) for key, _ in entries]
+        finally:
+            self.stats.batches += 1
+            self.stats.seconds += time.perf_counter() - started
+
+        results = {r.get('number'): r for r in response.get('SMSMessageData', {}).get('Recipients', [])}
+        outcome = []
+        for key, number in entries:
+            result = results.get(number)
+            if result is None:
+                outcome.append((key, RecipientFailed(f"{number}: no result from gateway")))
+            elif int(result.get('statusCode', 0)) not in SUCCESS_STATUS_CODES:
+                outcome.append((key, RecipientFailed(f"{number}: {result.get('status')}")))
+            else:
+                outcome.append((key, None))
+        return outcome
@@ -0,0 +1,75 @@
+"""Process startup benchmark.
+
+``measure`` boots the app in fresh interpreters the way a worker does
+(import the WSGI or ASGI application, then load the URLconf) under
+``python -X importtime``. It reports the boot time and the modules whose
+import, including everything they import in turn, took longest.
+"""
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+# Stdout of the child is the boot time in seconds; stderr is the importtime log
+BOOT_SCRIPT = """
+import time
+started = time.perf_counter()
+from {module} import application
+from django.urls import get_resolver
+get_resolver().url_patterns
+print(time.perf_counter() - started)
+"""
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def parse_importtime(log):
+    """``{module: (self_us, cumulative_us, depth)}`` from a ``-X importtime`` log."""
+    modules = {}
+    for line in log.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            own, cumulative, indent, name = match.groups()
+            modules[name] = (int(own), int(cumulative), (len(indent) - 1) // 2)
+    return modules
+
+
+def boot(module='Ecommerce.wsgi', env=None):
+    """Boot once in a subprocess; return ``(seconds, modules)``."""
+    env = {**os.environ, **(env or {})}
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'Ecommerce.settings')
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', BOOT_SCRIPT.format(module=module)],
+        capture_output=True, text=True, env=env,
+    )
+    if completed.returncode:
+        raise RuntimeError(f"Booting {module} failed:\n{completed.stderr[-2000:]}")
+    return float(completed.stdout.strip().splitlines()[-1]), parse_importtime(completed.stderr)
+
+
+def measure(runs=5, module='Ecommerce.wsgi', top=15, env=None):
+    """Median boot time over ``runs`` and the ``top`` slowest top-level-ish imports."""
+    times, cumulative = [], {}
+    for _ in range(runs):
+        seconds, modules = boot(module, env)
+        times.append(seconds)
+        for name, (_, total, depth) in modules.items():
+            cumulative.setdefault(name, []).append((total, depth))
+    slowest = sorted(
+        ((name, statistics.median(t for t, _ in samples) / 1000, samples[0][1])
+         for name, samples in cumulative.items()),
+        key=lambda item: item[1], reverse=True,
+    )
+    return {
+        'module': module,
+        'runs': runs,
+        'median_s': round(statistics.median(times), 4),
+        'min_s': round(min(times), 4),
+        'max_s': round(max(times), 4),
+        'modules': len(cumulative),
+        'slowest_imports': [
+            {'module': name, 'cumulative_ms': round(ms, 2), 'depth': depth}
+            for name, ms, depth in slowest[:top]
+        ],
+    }
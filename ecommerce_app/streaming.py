@@ -0,0 +1,61 @@
+"""Streamed JSON arrays for list endpoints (``?stream=true``).
+
+Rows are read through a server-side cursor with ``.iterator(chunk_size=...)``
+(``prefetch_related`` runs once per chunk), serialized one chunk at a time and
+written out as they are ready, so memory stays bounded by the chunk size
+rather than the result size and the first bytes leave immediately.
+"""
+from itertools import islice
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import JSONRenderer
+
+STREAM_QUERY_PARAM = 'stream'
+
+
+def wants_stream(request):
+    params = getattr(request, 'query_params', request.GET)
+    return params.get(STREAM_QUERY_PARAM, '').lower() in ('1', 'true', 'yes')
+
+
+def _render_chunk(renderer, serializer_class, chunk, first):
+    body = renderer.render(serializer_class(chunk, many=True).data)
+    # render() gives "[...]"; drop the brackets and join chunks with commas
+    return (b'' if first else b',') + body[1:-1]
+
+
+def iter_json_array(queryset, serializer_class, chunk_size):
+    renderer = JSONRenderer()
+    rows = queryset.iterator(chunk_size=chunk_size)
+    yield b'['
+    first = True
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        yield _render_chunk(renderer, serializer_class, chunk, first)
+        first = False
+    yield b']'
+
+
+async def aiter_json_array(queryset, serializer_class, chunk_size):
+    """``iter_json_array`` for ASGI: rows come from ``aiterator`` between chunks."""
+    renderer = JSONRenderer()
+    yield b'['
+    first, chunk = True, []
+    async for row in queryset.aiterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield _render_chunk(renderer, serializer_class, chunk, first)
+            first, chunk = False, []
+    if chunk:
+        yield _render_chunk(renderer, serializer_class, chunk, first)
+    yield b']'
+
+
+def stream_list(queryset, serializer_class, chunk_size=None, asynchronous=False):
+    """Stream every row of ``queryset`` as one JSON array."""
+    chunk_size = chunk_size or settings.API_STREAM_CHUNK_SIZE
+    iterate = aiter_json_array if asynchronous else iter_json_array
+    return StreamingHttpResponse(iterate(queryset, serializer_class, chunk_size), content_type='application/json')
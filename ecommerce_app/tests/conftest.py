@@ -13,6 +13,42 @@ if PROJECT_ROOT not in sys.path:
 
 # Set Django settings module
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Ecommerce.settings")
+# Tests run in one process, so the default local-memory cache is shared enough
+os.environ.setdefault("CACHE_ALLOW_PROCESS_LOCAL", "true")
 
 # Setup Django
 django.setup()
+
+import pytest
+from django.core.cache import cache
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Cached catalog data must not leak between tests (the DB is rolled back, the cache is not)."""
+    cache.clear()
+    yield
+    cache.clear()
+
+
+# Maximum queries each endpoint may issue for a page of results, independent
+# of how many rows are on the page. Raise a budget only with a reason.
+QUERY_BUDGETS = {
+    'category-list': 1,
+    'product-list': 2,
+    'product-detail': 3,  # includes the ETag lookup of updated_at
+    'customer-list': 1,
+    'order-list': 3,
+    'order-detail': 3,
+    'order-item-list': 2,
+    'order-item-detail': 2,
+    'order-create': 20,
+}
+
+
+@pytest.fixture
+def query_budget(django_assert_max_num_queries):
+    """``with query_budget('product-list'): ...`` fails if the endpoint exceeds its budget."""
+    def budget(url_name):
+        return django_assert_max_num_queries(QUERY_BUDGETS[url_name])
+    return budget
@@ -0,0 +1,178 @@
+import base64
+import http.server
+import json
+import threading
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from rest_framework.test import APIClient
+
+from ecommerce_app import response_cache
+from ecommerce_app.authentication import OIDCAuthentication
+from ecommerce_app.loadgen import run_load
+from ecommerce_app.models import Category, Customer, Product
+
+pytestmark = [pytest.mark.django_db, pytest.mark.urls('Ecommerce.urls_async')]
+
+
+@pytest.fixture
+def catalog():
+    phones = Category.objects.create(name="Phones")
+    android = Category.objects.create(name="Android", parent=phones)
+    for i in range(5):
+        product = Product.objects.create(name=f"Phone {i}", price=100 + i, stock=i)
+        product.categories.add(android)
+    return phones
+
+
+def get(client, url, **extra):
+    return async_to_sync(client.get)(url, **extra)
+
+
+@pytest.mark.parametrize("url", [
+    "/api/v1/categories/",
+    "/api/v1/categories/tree/",
+    "/api/v1/categories/{pk}/",
+    "/api/v1/categories/{pk}/average-price/",
+    "/api/v1/products/",
+    "/api/v1/products/?sort=-price&page_size=2",
+    "/api/v1/products/?category={pk}&in_stock=true",
+])
+def test_payloads_match_sync_views(catalog, url, settings):
+    url = url.format(pk=catalog.pk)
+    async_response = get(AsyncClient(), url)
+    assert async_response.status_code == 200
+
+    settings.ROOT_URLCONF = 'Ecommerce.urls'
+    sync_response = APIClient().get(url)
+    assert async_response.json() == sync_response.json()
+
+
+def test_streamed_list_matches_sync_view(catalog, settings):
+    async def read(response):
+        return b''.join([chunk async for chunk in response.streaming_content])
+
+    response = get(AsyncClient(), "/api/v1/products/?stream=true")
+    assert response.is_async
+    body = async_to_sync(read)(response)
+
+    settings.ROOT_URLCONF = 'Ecommerce.urls'
+    assert json.loads(body) == json.loads(b''.join(APIClient().get("/api/v1/products/?stream=true").streaming_content))
+
+
+def test_cursor_pages_follow_on(catalog):
+    client = AsyncClient()
+    first = get(client, "/api/v1/products/?page_size=3").json()
+    second = get(client, first["next"]).json()
+    names = [p["name"] for p in first["results"] + second["results"]]
+    assert names == [f"Phone {i}" for i in range(5)]
+
+
+def test_missing_objects_and_bad_params():
+    client = AsyncClient()
+    assert get(client, "/api/v1/products/999/").status_code == 404
+    assert get(client, "/api/v1/categories/999/").status_code == 404
+    assert get(client, "/api/v1/products/?cursor=garbage").status_code == 404
+    response = get(client, "/api/v1/products/?sort=colour")
+    assert response.status_code == 400 and "sort" in response.json()
+
+
+def test_writes_are_handed_to_the_drf_views():
+    response = async_to_sync(AsyncClient().post)(
+        "/api/v1/categories/", {"name": "Laptops"}, content_type="application/json")
+    assert response.status_code == 201
+    assert Category.objects.filter(name="Laptops").exists()
+
+
+def test_profile_with_bearer_token(django_user_model, monkeypatch):
+    user = django_user_model.objects.create_user("ada")
+    monkeypatch.setattr(OIDCAuthentication, "authenticate",
+                        lambda self, request: (user, None) if request.headers.get("Authorization") == "Bearer good" else None)
+    client = AsyncClient()
+    assert get(client, "/api/customer/profile/").status_code == 403
+    assert get(client, "/api/customer/profile/", headers={"Authorization": "Bearer bad"}).status_code == 403
+    assert get(client, "/api/customer/profile/", headers={"Authorization": "Bearer good"}).status_code == 404
+
+    Customer.objects.create(user=user, first_name="Ada", last_name="Lovelace", email="ada@example.com")
+    response = get(client, "/api/customer/profile/", headers={"Authorization": "Bearer good"})
+    assert response.status_code == 200
+    assert response.json()["email"] == "ada@example.com"
+
+
+@pytest.mark.parametrize("url", [
+    "/api/v1/categories/",
+    "/api/v1/categories/tree/",
+    "/api/v1/categories/{pk}/",
+    "/api/v1/products/",
+    "/api/v1/products/{product}/",
+])
+def test_etags_and_response_cache_match_sync_views(catalog, url, settings, django_capture_on_commit_callbacks):
+    url = url.format(pk=catalog.pk, product=Product.objects.first().pk)
+    client = AsyncClient()
+    first = get(client, url)
+    assert first.has_header("ETag")
+    assert get(client, url, headers={"If-None-Match": first["ETag"]}).status_code == 304
+    if first.has_header("X-Cache"):
+        assert first["X-Cache"] == "MISS" and get(client, url)["X-Cache"] == "HIT"
+
+    settings.ROOT_URLCONF = 'Ecommerce.urls'
+    sync = APIClient().get(url)
+    assert sync["ETag"] == first["ETag"]
+    assert sync.has_header("X-Cache") == first.has_header("X-Cache")
+
+    settings.ROOT_URLCONF = 'Ecommerce.urls_async'
+    with django_capture_on_commit_callbacks(execute=True):
+        Category.objects.filter(pk=catalog.pk).get().save()
+        Product.objects.first().save()
+    assert get(client, url, headers={"If-None-Match": first["ETag"]}).status_code == 200
+
+
+def test_category_tree_builds_once():
+    Category.objects.create(name="Phones")
+    response_cache.reset_stats()
+    client = AsyncClient()
+    get(client, "/api/v1/categories/tree/")
+    get(client, "/api/v1/categories/tree/")
+    assert response_cache.stats()["CategoryTreeView"] == {"hit": 1, "miss": 1, "wait": 0}
+
+
+def test_profile_accepts_the_same_credentials_as_the_sync_view(django_user_model, settings):
+    user = django_user_model.objects.create_user("ada", password="secret")
+    Customer.objects.create(user=user, first_name="Ada", last_name="Lovelace", email="ada@example.com")
+    basic = {"Authorization": "Basic " + base64.b64encode(b"ada:secret").decode()}
+    wrong = {"Authorization": "Basic " + base64.b64encode(b"ada:nope").decode()}
+
+    assert get(AsyncClient(), "/api/customer/profile/", headers=basic).status_code == 200
+    assert get(AsyncClient(), "/api/customer/profile/", headers=wrong).status_code == 403
+
+    settings.ROOT_URLCONF = 'Ecommerce.urls'
+    assert APIClient().get("/api/customer/profile/", headers=basic).status_code == 200
+    assert APIClient().get("/api/customer/profile/", headers=wrong).status_code == 403
+
+
+class OkHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = b'{}' if self.path != '/fail' else b'no'
+        self.send_response(200 if self.path != '/fail' else 500)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_load_generator_reports_latency_and_errors():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), OkHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        result = run_load(f"http://127.0.0.1:{server.server_port}", ["/ok", "/fail"], concurrency=2, duration=0.3)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert result["requests"] > 0
+    assert 0 < result["errors"] < result["requests"]
+    assert result["p50_ms"] <= result["p99_ms"]
@@ -0,0 +1,269 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.urls import reverse
+from rest_framework.test import APIClient, APIRequestFactory
+
+from ecommerce_app import caching
+from ecommerce_app.authentication import OIDCAuthentication
+from ecommerce_app.jwks import JWKSCache
+from ecommerce_app.models import Customer
+from ecommerce_app.token_cache import TokenCache
+
+
+def make_key(kid):
+    private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private.public_key()))
+    jwk.update(kid=kid, use="sig", alg="RS256")
+    return private, jwk
+
+
+class StubJWKSServer:
+    """Local JWKS endpoint that counts fetches and can be slowed down."""
+
+    def __init__(self, keys, max_age=300, delay=0.0):
+        self.keys, self.max_age, self.delay, self.hits = keys, max_age, delay, 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                stub.hits += 1
+                time.sleep(stub.delay)
+                body = json.dumps({"keys": stub.keys}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Cache-Control", f"public, max-age={stub.max_age}")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/certs"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def signing_key():
+    return make_key("k1")
+
+
+@pytest.fixture
+def jwks_server(signing_key):
+    server = StubJWKSServer([signing_key[1]])
+    yield server
+    server.close()
+
+
+def test_keys_fetched_once_and_cached(jwks_server):
+    cache = JWKSCache(jwks_server.url)
+    for _ in range(5):
+        assert cache.get_key("k1") is not None
+    assert jwks_server.hits == 1
+
+
+def test_unknown_kid_refreshes_once_for_rotation(jwks_server, signing_key):
+    cache = JWKSCache(jwks_server.url, min_refresh_interval=0)
+    cache.get_key("k1")
+    _, rotated = make_key("k2")
+    jwks_server.keys = [signing_key[1], rotated]
+
+    assert cache.get_key("k2") is not None
+    assert jwks_server.hits == 2
+
+
+def test_bogus_kids_are_rate_limited(jwks_server):
+    cache = JWKSCache(jwks_server.url, min_refresh_interval=60)
+    cache.get_key("k1")
+    for _ in range(10):
+        assert cache.get_key("nope") is None
+    assert jwks_server.hits == 1
+
+
+def test_concurrent_misses_single_flight(signing_key):
+    server = StubJWKSServer([signing_key[1]], delay=0.2)
+    try:
+        cache = JWKSCache(server.url)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_key("k1"))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert server.hits == 1
+        assert all(key is not None for key in results)
+    finally:
+        server.close()
+
+
+def test_expired_keys_served_while_refreshing_in_background(signing_key):
+    server = StubJWKSServer([signing_key[1]], max_age=0)
+    try:
+        cache = JWKSCache(server.url, min_refresh_interval=0)
+        assert cache.get_key("k1") is not None
+        assert cache.get_key("k1") is not None  # stale hit, refresh started
+        deadline = time.monotonic() + 2
+        while server.hits < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert server.hits == 2
+    finally:
+        server.close()
+
+
+def test_expired_keys_do_not_poll_a_down_provider(signing_key):
+    server = StubJWKSServer([signing_key[1]], max_age=0)
+    cache = JWKSCache(server.url, min_refresh_interval=60)
+    assert cache.get_key("k1") is not None
+    server.close()
+
+    cache._last_fetch -= 60  # the interval has passed: one background retry
+    for _ in range(20):
+        assert cache.get_key("k1") is not None
+    deadline = time.monotonic() + 2
+    while cache.fetch_count < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert cache.fetch_count == 2
+
+    for _ in range(20):
+        assert cache.get_key("k1") is not None
+    time.sleep(0.05)
+    assert cache.fetch_count == 2
+
+
+@pytest.mark.django_db
+def test_bearer_token_authenticates_customer(jwks_server, signing_key, settings, django_user_model, monkeypatch):
+    settings.OIDC_RP_CLIENT_ID = "client-id"
+    monkeypatch.setattr("ecommerce_app.authentication.get_jwks_cache", lambda: JWKSCache(jwks_server.url))
+    user = django_user_model.objects.create_user(username="ann")
+    Customer.objects.create(user=user, first_name="Ann", email="ann@example.com", oidc_sub="sub-1")
+    token = jwt.encode({"sub": "sub-1", "aud": "client-id", "exp": int(time.time()) + 60},
+                       signing_key[0], algorithm="RS256", headers={"kid": "k1"})
+
+    request = APIRequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {token}")
+    authenticated_user, _ = OIDCAuthentication().authenticate(request)
+    assert authenticated_user == user
+
+
+@pytest.mark.django_db
+def test_api_views_accept_bearer_tokens(jwks_server, signing_key, settings, django_user_model, monkeypatch):
+    settings.OIDC_RP_CLIENT_ID = "client-id"
+    monkeypatch.setattr("ecommerce_app.authentication.get_jwks_cache", lambda: JWKSCache(jwks_server.url))
+    monkeypatch.setattr("ecommerce_app.authentication.token_cache", TokenCache())
+    user = django_user_model.objects.create_user(username="ann")
+    Customer.objects.create(user=user, first_name="Ann", email="ann@example.com", oidc_sub="sub-1")
+    token = jwt.encode({"sub": "sub-1", "aud": "client-id", "exp": int(time.time()) + 60},
+                       signing_key[0], algorithm="RS256", headers={"kid": "k1"})
+    url = reverse("api-customer-profile")
+
+    assert APIClient().get(url).status_code == 403
+    response = APIClient().get(url, HTTP_AUTHORIZATION=f"Bearer {token}")
+    assert response.status_code == 200
+    assert response.json()["email"] == "ann@example.com"
+    assert APIClient().get(url, HTTP_AUTHORIZATION="Bearer not-a-token").status_code in (401, 403)
+
+
+@pytest.mark.django_db
+class TestVerifiedTokenCache:
+
+    @pytest.fixture
+    def bearer(self, jwks_server, signing_key, settings, django_user_model, monkeypatch):
+        settings.OIDC_RP_CLIENT_ID = "client-id"
+        jwks = JWKSCache(jwks_server.url)
+        monkeypatch.setattr("ecommerce_app.authentication.get_jwks_cache", lambda: jwks)
+        tokens = TokenCache(max_size=2)
+        monkeypatch.setattr("ecommerce_app.authentication.token_cache", tokens)
+        monkeypatch.setattr("ecommerce_app.signals.token_cache", tokens)
+        user = django_user_model.objects.create_user(username="ann")
+        customer = Customer.objects.create(user=user, first_name="Ann", email="ann@example.com", oidc_sub="sub-1")
+
+        def make(exp_in=60, **claims):
+            payload = {"sub": "sub-1", "aud": "client-id", "exp": int(time.time()) + exp_in, **claims}
+            token = jwt.encode(payload, signing_key[0], algorithm="RS256", headers={"kid": "k1"})
+            return APIRequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {token}")
+        make.user, make.customer = user, customer
+        return make
+
+    def test_repeat_token_skips_verification_and_db(self, bearer, django_assert_num_queries, monkeypatch):
+        request = bearer()
+        user, _ = OIDCAuthentication().authenticate(request)
+
+        monkeypatch.setattr(jwt, "decode", lambda *a, **kw: pytest.fail("token re-verified"))
+        with django_assert_num_queries(0):
+            cached_user, _ = OIDCAuthentication().authenticate(request)
+            assert cached_user.customer_profile == bearer.customer
+        assert cached_user == user
+
+    def test_saving_customer_invalidates(self, bearer, django_assert_num_queries):
+        request = bearer()
+        OIDCAuthentication().authenticate(request)
+        bearer.customer.phone = "0700000000"
+        bearer.customer.save()
+
+        with django_assert_num_queries(1):
+            OIDCAuthentication().authenticate(request)
+
+    def test_expired_entries_not_served(self):
+        cache = TokenCache(max_size=10)
+        user = type("U", (), {"pk": 1})()
+        cache.put("expired", time.time() - 1, user)
+        assert cache.get("expired") is None
+
+    def test_lru_eviction(self):
+        cache = TokenCache(max_size=2)
+        users = [type("U", (), {"pk": i})() for i in range(3)]
+        exp = time.time() + 60
+        cache.put("a", exp, users[0])
+        cache.put("b", exp, users[1])
+        assert cache.get("a").pk == 0  # "b" is now least recently used
+        cache.put("c", exp, users[2])
+        assert cache.get("b") is None
+        assert cache.get("a").pk == 0
+        assert cache.evictions == 1
+
+    def test_hits_are_copies(self, bearer):
+        request = bearer()
+        first, _ = OIDCAuthentication().authenticate(request)
+        first.customer_profile.first_name = "Changed by a view"
+
+        second, _ = OIDCAuthentication().authenticate(request)
+        assert second is not first
+        assert second.customer_profile.first_name == "Ann"
+
+    def test_shared_version_read_only_after_recheck_interval(self, monkeypatch):
+        cache = TokenCache(max_size=10, recheck=60)
+        user = type("U", (), {"pk": 1})()
+        cache.put("a", time.time() + 60, user)
+        caching.bump_version("principal:1")  # e.g. the user saved in another process
+
+        monkeypatch.setattr(caching, "get_version", lambda namespace: pytest.fail("shared cache read"))
+        assert cache.get("a").pk == 1
+        monkeypatch.undo()
+
+        cache.recheck = 0
+        assert cache.get("a") is None
+
+    def test_invalidate_user_drops_only_their_tokens(self):
+        cache = TokenCache(max_size=10)
+        exp = time.time() + 60
+        ann, bob = type("U", (), {"pk": 1})(), type("U", (), {"pk": 2})()
+        cache.put("ann-1", exp, ann)
+        cache.put("ann-2", exp, ann)
+        cache.put("bob", exp, bob)
+
+        cache.invalidate_user(1)
+        assert cache.get("ann-1") is None and cache.get("ann-2") is None
+        assert cache.get("bob").pk == 2
+        assert cache._by_user == {2: {cache.token_key("bob")}}
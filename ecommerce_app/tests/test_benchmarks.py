@@ -0,0 +1,74 @@
+import json
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from ecommerce_app import benchmarks
+from ecommerce_app.models import Category, CategoryPriceStats, Order, OrderItem, Product
+
+
+@pytest.fixture
+def small_catalog(db):
+    return benchmarks.generate_catalog(depth=3, fanout=2, products=30, customers=4, orders=10, batch_size=7)
+
+
+def test_generated_catalog(small_catalog):
+    assert small_catalog == {
+        'categories': 2 + 4 + 8, 'products': 30, 'customers': 4, 'orders': 10, 'order_items': 30,
+    }
+    leaf = Category.objects.filter(depth=2).first()
+    assert leaf.path.count('/') == 3
+    assert Product.objects.filter(categories__depth=2).distinct().count() == 30
+
+    order = Order.objects.first()
+    lines = OrderItem.objects.filter(order=order)
+    assert order.total_amount == sum(line.unit_price * line.quantity for line in lines)
+
+    root = Category.objects.get(depth=0, name="Category 0.0")
+    stats = CategoryPriceStats.objects.get(category=root)
+    assert stats.product_count == Product.objects.in_category(root).count()
+
+
+def test_every_url_name_is_benchmarked_or_skipped(small_catalog):
+    assert benchmarks.uncovered_url_names() == set()
+
+
+def test_run_measures_every_endpoint_and_rolls_back_writes(small_catalog):
+    report = benchmarks.run(iterations=2, warmup=0)
+
+    endpoints = report['endpoints']
+    assert report['meta']['rows']['products'] == 30
+    assert {key.split()[1] for key in endpoints} == {e.name for e in benchmarks.endpoints()}
+    for key, result in endpoints.items():
+        assert all(code < 400 for code in result['status']), key
+        assert result['p50_ms'] <= result['p99_ms']
+    assert endpoints['GET category-list']['queries'] <= 2
+    assert endpoints['POST order-list']['status'] == [201]
+    assert Order.objects.count() == 10
+    assert not Category.objects.filter(name="Benchmark category").exists()
+
+
+def test_compare_flags_regressions():
+    def report(p95, queries, status=(200,)):
+        return {'endpoints': {'GET product-list': {'p95_ms': p95, 'queries': queries, 'status': list(status)}}}
+
+    assert benchmarks.compare(report(11.0, 2), report(10.0, 2)) == []
+    assert benchmarks.compare(report(10.5, 2), report(10.0, 2), tolerance=0.01) == []  # under min_delta_ms
+    assert benchmarks.compare(report(20.0, 2), report(10.0, 2)) == ["GET product-list: p95 10.0 -> 20.0 ms"]
+    assert benchmarks.compare(report(10.0, 3), report(10.0, 2)) == ["GET product-list: queries 2 -> 3"]
+    assert len(benchmarks.compare(report(10.0, 2, [500]), report(10.0, 2))) == 1
+
+
+def test_command_writes_results_and_fails_on_regression(small_catalog, tmp_path):
+    output = tmp_path / 'run.json'
+    call_command('run_benchmarks', iterations=1, warmup=0, only=['category-list'], output=str(output))
+    results = json.loads(output.read_text())
+    assert set(results['endpoints']) == {'GET category-list', 'POST category-list'}
+
+    for result in results['endpoints'].values():
+        result['queries'] = 0
+    baseline = tmp_path / 'baseline.json'
+    baseline.write_text(json.dumps(results))
+    with pytest.raises(CommandError, match='queries 0 ->'):
+        call_command('run_benchmarks', iterations=1, warmup=0, only=['category-list'], baseline=str(baseline))
@@ -0,0 +1,96 @@
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ecommerce_app import inventory
+from ecommerce_app.models import Category, Product
+
+
+@pytest.fixture
+def product():
+    category = Category.objects.create(name="Audio")
+    product = Product.objects.create(name="Headphones", price=80, stock=5)
+    product.categories.add(category)
+    return product
+
+
+def revalidate(client, url, response):
+    return client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+
+
+@pytest.mark.django_db
+class TestProductDetail:
+
+    def test_matching_etag_is_not_modified_without_serializing(self, product, django_assert_num_queries):
+        client = APIClient()
+        url = reverse("product-detail", args=[product.pk])
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.has_header("Last-Modified")
+
+        with django_assert_num_queries(1):
+            assert revalidate(client, url, response).status_code == 304
+
+    def test_if_modified_since(self, product):
+        client = APIClient()
+        url = reverse("product-detail", args=[product.pk])
+        response = client.get(url)
+        again = client.get(url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+        assert again.status_code == 304
+
+    @pytest.mark.parametrize("change", ["save", "relink", "rename_category", "reserve", "reserve_shard"])
+    def test_changes_invalidate(self, product, change, django_capture_on_commit_callbacks):
+        if change == "reserve_shard":
+            inventory.shard_product(product, 3)
+        client = APIClient()
+        url = reverse("product-detail", args=[product.pk])
+        response = client.get(url)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            if change == "save":
+                product.price = 90
+                product.save()
+            elif change == "relink":
+                product.categories.add(Category.objects.create(name="Sale"))
+            elif change == "rename_category":
+                category = product.categories.get()
+                category.name = "Hi-Fi"
+                category.save()
+            elif change == "reserve":
+                inventory.reserve(product, 1)
+            else:
+                # shard 2 is a StockShard row; Product.updated_at does not move
+                assert inventory._decrement(product.pk, 2, 1)
+
+        assert revalidate(client, url, response).status_code == 200
+
+    def test_missing_product_is_404(self):
+        assert APIClient().get(reverse("product-detail", args=[999]),
+                               HTTP_IF_NONE_MATCH='"x"').status_code == 404
+
+
+@pytest.mark.django_db
+def test_product_list_etag_per_query_and_version(product, django_capture_on_commit_callbacks):
+    client = APIClient()
+    url = reverse("product-list")
+    response = client.get(url)
+    assert response["ETag"].startswith('W/"')
+    assert revalidate(client, url, response).status_code == 304
+    assert client.get(url, {"sort": "price"}, HTTP_IF_NONE_MATCH=response["ETag"]).status_code == 200
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Product.objects.create(name="Speaker", price=50)
+    assert revalidate(client, url, response).status_code == 200
+
+
+@pytest.mark.django_db
+def test_category_views(product, django_capture_on_commit_callbacks):
+    client = APIClient()
+    category = product.categories.get()
+    for url in (reverse("category-list"), reverse("category-detail", args=[category.pk])):
+        response = client.get(url)
+        assert revalidate(client, url, response).status_code == 304
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Category.objects.create(name="Video")
+    assert revalidate(client, url, response).status_code == 200
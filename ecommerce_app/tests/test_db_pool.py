@@ -0,0 +1,54 @@
+import runpy
+from pathlib import Path
+
+import pytest
+from django.conf import settings as django_settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.backends.postgresql.base import DatabaseWrapper
+
+from ecommerce_app import db_pool
+
+SETTINGS_FILE = Path(django_settings.BASE_DIR) / 'Ecommerce' / 'settings.py'
+
+
+def load_settings(monkeypatch, **env):
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    return runpy.run_path(str(SETTINGS_FILE))
+
+
+def test_postgres_url_is_pooled(monkeypatch):
+    monkeypatch.delenv('DB_POOL', raising=False)
+    databases = load_settings(monkeypatch, DATABASE_URL='postgres://u:p@db:5432/shop', DB_POOL_MAX_SIZE='4')['DATABASES']
+    default = databases['default']
+    assert default['CONN_MAX_AGE'] == 0
+    assert default['CONN_HEALTH_CHECKS'] is True
+    assert default['OPTIONS']['pool']['max_size'] == 4
+
+
+def test_pooling_can_be_disabled(monkeypatch):
+    default = load_settings(monkeypatch, DATABASE_URL='postgres://u:p@db:5432/shop', DB_POOL='False')['DATABASES']['default']
+    assert 'pool' not in default.get('OPTIONS', {})
+    assert default['CONN_MAX_AGE'] == 600
+
+
+def test_sqlite_is_not_pooled(db):
+    assert db_pool.pool_stats() is None
+    with pytest.raises(CommandError):
+        call_command('check_db_pool')
+
+
+def test_pool_stats(monkeypatch):
+    wrapper = DatabaseWrapper({
+        'ENGINE': 'django.db.backends.postgresql', 'NAME': 'shop', 'USER': '', 'PASSWORD': '', 'HOST': 'db',
+        'PORT': '', 'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': True, 'TIME_ZONE': None, 'AUTOCOMMIT': True,
+        'OPTIONS': {'pool': {'min_size': 1, 'max_size': 3}},
+    }, alias='pooled')
+    monkeypatch.setattr(db_pool, 'connections', {'pooled': wrapper})
+    try:
+        stats = db_pool.pool_stats('pooled')
+    finally:
+        DatabaseWrapper._connection_pools.pop('pooled', None)
+    assert stats['pool_min'] == 1 and stats['pool_max'] == 3
+    assert stats['requests_waiting'] == 0 and stats['requests_wait_ms'] == 0
@@ -0,0 +1,142 @@
+import pytest
+from django.conf import settings as django_settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory
+from rest_framework.test import APIClient
+
+from ecommerce_app import caching, db_router
+from ecommerce_app.db_router import ReplicaRouter, ReplicaRoutingMiddleware, replica_reads, use_primary
+from ecommerce_app.models import Category
+
+REPLICA = 'replica1'
+
+
+@pytest.fixture(autouse=True)
+def fresh_lag_checks():
+    db_router.reset_lag_checks()
+    yield
+    db_router.reset_lag_checks()
+
+
+@pytest.fixture
+def one_replica(settings, monkeypatch):
+    settings.DATABASE_REPLICAS = [REPLICA]
+    lag = {'seconds': 0.0}
+    monkeypatch.setattr(db_router, 'replica_lag', lambda alias: lag['seconds'])
+    return lag
+
+
+class TestRouter:
+
+    def test_reads_use_the_primary_outside_replica_reads(self, one_replica):
+        assert ReplicaRouter().db_for_read(Category) == 'default'
+
+    def test_reads_use_a_replica_until_something_is_written(self, one_replica):
+        router = ReplicaRouter()
+        with replica_reads():
+            assert router.db_for_read(Category) == REPLICA
+            assert router.db_for_write(Category) == 'default'
+            assert router.db_for_read(Category) == 'default'
+
+    def test_lagging_or_unreachable_replicas_are_skipped(self, one_replica, settings):
+        settings.REPLICA_LAG_CHECK_INTERVAL = 0
+        with replica_reads():
+            one_replica['seconds'] = settings.REPLICA_MAX_LAG + 1
+            assert ReplicaRouter().db_for_read(Category) == 'default'
+            one_replica['seconds'] = None
+            assert ReplicaRouter().db_for_read(Category) == 'default'
+            one_replica['seconds'] = 0.1
+            assert ReplicaRouter().db_for_read(Category) == REPLICA
+
+    def test_lag_is_checked_once_per_interval(self, settings, monkeypatch):
+        settings.DATABASE_REPLICAS = [REPLICA]
+        settings.REPLICA_LAG_CHECK_INTERVAL = 60
+        checks = []
+        monkeypatch.setattr(db_router, 'replica_lag', lambda alias: checks.append(alias) or 0.0)
+        with replica_reads():
+            for _ in range(5):
+                ReplicaRouter().db_for_read(Category)
+        assert checks == [REPLICA]
+
+    def test_use_primary_overrides(self, one_replica):
+        with replica_reads(), use_primary():
+            assert ReplicaRouter().db_for_read(Category) == 'default'
+
+    def test_recent_changes_are_read_from_the_primary(self, one_replica):
+        with replica_reads():
+            caching.bump_version('categories')
+            with db_router.primary_if_recently_changed('categories'):
+                assert ReplicaRouter().db_for_read(Category) == 'default'
+            with db_router.primary_if_recently_changed('products'):
+                assert ReplicaRouter().db_for_read(Category) == REPLICA
+
+
+class TestMiddleware:
+
+    def run(self, request, write=False):
+        seen = {}
+
+        def view(request):
+            if write:
+                ReplicaRouter().db_for_write(Category)
+            seen['db'] = ReplicaRouter().db_for_read(Category)
+            return HttpResponse()
+
+        response = ReplicaRoutingMiddleware(view)(request)
+        return seen['db'], response
+
+    def test_safe_requests_read_from_replicas(self, one_replica):
+        db, response = self.run(RequestFactory().get('/'))
+        assert db == REPLICA
+        assert db_router.STICKY_COOKIE not in response.cookies
+
+    def test_writes_make_the_client_sticky(self, one_replica):
+        db, response = self.run(RequestFactory().post('/'))
+        assert db == 'default'
+        until = response.cookies[db_router.STICKY_COOKIE].value
+
+        request = RequestFactory().get('/')
+        request.COOKIES[db_router.STICKY_COOKIE] = until
+        assert self.run(request)[0] == 'default'
+
+    def test_writing_get_is_sticky_too(self, one_replica):
+        db, response = self.run(RequestFactory().get('/'), write=True)
+        assert db == 'default'
+        assert db_router.STICKY_COOKIE in response.cookies
+
+    def test_no_replicas_no_cookie(self, settings):
+        settings.DATABASE_REPLICAS = []
+        db, response = self.run(RequestFactory().post('/'))
+        assert db == 'default' and not response.cookies
+
+
+# Runs only with a replica configured, e.g.
+# DATABASE_REPLICA_URLS=sqlite:////tmp/replica.db. The test databases are
+# independent (no replication), which makes it visible which one served a read.
+@pytest.mark.skipif(REPLICA not in django_settings.DATABASES, reason="no replica database configured")
+@pytest.mark.django_db(transaction=True, databases='__all__')
+class TestTwoDatabases:
+
+    def names(self, client):
+        return [c['name'] for c in client.get('/api/v1/categories/').json()['results']]
+
+    def test_reads_hit_the_replica_and_writers_read_their_writes(self):
+        Category.objects.using(REPLICA).create(name="Replica only")
+        cache.clear()  # forget when that write happened
+        client = APIClient()
+        assert self.names(client) == ["Replica only"]
+
+        assert client.post('/api/v1/categories/', {'name': "Fresh"}, format='json').status_code == 201
+        assert self.names(client) == ["Fresh"]
+        # Just after a change, cached responses are built from the primary...
+        assert self.names(APIClient()) == ["Fresh"]
+        # ...afterwards other clients read the (here never-updated) replica again
+        cache.clear()
+        assert self.names(APIClient()) == ["Replica only"]
+
+    def test_lagging_replica_falls_back_to_primary(self, settings, monkeypatch):
+        settings.REPLICA_LAG_CHECK_INTERVAL = 0
+        monkeypatch.setattr(db_router, 'replica_lag', lambda alias: settings.REPLICA_MAX_LAG + 1)
+        Category.objects.create(name="Primary")
+        assert self.names(APIClient()) == ["Primary"]
@@ -0,0 +1,85 @@
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ecommerce_app import inventory
+from ecommerce_app.models import Category, Product
+
+
+@pytest.fixture
+def catalog():
+    electronics = Category.objects.create(name="Electronics")
+    phones = Category.objects.create(name="Phones", parent=electronics)
+    android = Category.objects.create(name="Android", parent=phones)
+    laptops = Category.objects.create(name="Laptops", parent=electronics)
+    books = Category.objects.create(name="Books")
+
+    def product(name, price, stock, *categories):
+        product = Product.objects.create(name=name, price=price, stock=stock)
+        product.categories.add(*categories)
+        return product
+
+    product("Pixel", 600, 3, android, phones)
+    product("Nokia", 40, 0, phones)
+    product("ThinkPad", 1200, 1, laptops)
+    product("Novel", 8, 10, books)
+    inventory.shard_product(product("iPhone", 900, 4, phones), 4)
+    Product.objects.filter(name="iPhone").update(stock=0)  # only the shards hold stock now
+    return {"electronics": electronics, "phones": phones, "laptops": laptops, "books": books}
+
+
+def names(response):
+    assert response.status_code == 200, response.data
+    return [p["name"] for p in response.data["results"]]
+
+
+@pytest.mark.django_db
+class TestProductListFilters:
+    url = reverse("product-list")
+
+    def test_category_subtree(self, catalog):
+        response = APIClient().get(self.url, {"category": catalog["phones"].pk})
+        assert names(response) == ["Nokia", "Pixel", "iPhone"]
+
+    def test_price_range_and_stock(self, catalog):
+        response = APIClient().get(self.url, {"min_price": "10", "max_price": "1000", "in_stock": "true"})
+        assert names(response) == ["Pixel", "iPhone"]
+
+    def test_sort_by_price_pages_with_keyset(self, catalog):
+        client = APIClient()
+        response = client.get(self.url, {"sort": "-price", "page_size": 2})
+        assert names(response) == ["ThinkPad", "iPhone"]
+        assert names(client.get(response.data["next"])) == ["Pixel", "Nokia"]
+
+    def test_invalid_params(self, catalog):
+        response = APIClient().get(self.url, {"min_price": "cheap", "sort": "random", "category": "999"})
+        assert response.status_code == 400
+        assert set(response.data) == {"min_price", "sort", "category"}
+
+    @pytest.mark.parametrize("value", ["nan", "NaN", "sNaN", "Infinity", "-inf"])
+    def test_non_finite_prices_rejected(self, catalog, value):
+        for url in (self.url, reverse("product-facets")):
+            response = APIClient().get(url, {"min_price": value, "max_price": value})
+            assert response.status_code == 400
+            assert set(response.data) == {"min_price", "max_price"}
+
+
+@pytest.mark.django_db
+class TestProductFacets:
+    url = reverse("product-facets")
+
+    def test_root_facets(self, catalog):
+        data = APIClient().get(self.url).data
+        assert data["count"] == 5
+        assert data["in_stock"] == 4
+        assert [(c["name"], c["count"]) for c in data["categories"]] == [("Books", 1), ("Electronics", 4)]
+        assert [bucket["count"] for bucket in data["price_ranges"]] == [1, 1, 0, 0, 2, 1]
+
+    def test_child_facets_ignore_own_filter(self, catalog, django_assert_max_num_queries):
+        params = {"category": catalog["electronics"].pk, "max_price": "1000", "in_stock": "1"}
+        with django_assert_max_num_queries(4):
+            data = APIClient().get(self.url, params).data
+        assert data["count"] == 2
+        assert [(c["name"], c["count"]) for c in data["categories"]] == [("Laptops", 0), ("Phones", 2)]
+        # price buckets ignore the price filter, so ThinkPad still shows in 1000+
+        assert data["price_ranges"][-1]["count"] == 1
@@ -0,0 +1,90 @@
+import json
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ecommerce_app.ingestion import ProductIngestor, parse_csv, parse_ndjson
+from ecommerce_app.models import Category, CategoryPriceStats, Product
+
+
+@pytest.fixture
+def fruits():
+    produce = Category.objects.create(name="Produce")
+    return Category.objects.create(name="Fruits", parent=produce)
+
+
+def ndjson(*rows):
+    return [json.dumps(row) + "\n" for row in rows]
+
+
+@pytest.mark.django_db
+class TestProductIngestor:
+
+    def test_creates_products_with_categories_by_path_and_id(self, fruits):
+        report = ProductIngestor().ingest(parse_ndjson(ndjson(
+            {"name": "Apple", "price": "1.50", "stock": 10, "categories": ["Produce > Fruits"]},
+            {"name": "Pear", "price": "2.50", "categories": [fruits.id]},
+        )))
+        assert report == {"created": 2, "updated": 0, "error_count": 0, "errors": []}
+        assert set(fruits.products.values_list("name", flat=True)) == {"Apple", "Pear"}
+        stats = CategoryPriceStats.objects.get(category=fruits.parent)
+        assert (stats.product_count, stats.price_sum) == (2, Decimal("4.00"))
+
+    def test_upserts_on_name_and_keeps_unlisted_fields(self, fruits):
+        Product.objects.create(name="Apple", description="Crisp", price=1, stock=3)
+        report = ProductIngestor().ingest(parse_ndjson(ndjson({"name": "Apple", "price": "9.99"})))
+
+        assert (report["created"], report["updated"]) == (0, 1)
+        apple = Product.objects.get(name="Apple")
+        assert (apple.price, apple.description, apple.stock) == (Decimal("9.99"), "Crisp", 3)
+
+    def test_bad_rows_reported_without_aborting(self, fruits):
+        lines = ndjson({"name": "Apple", "price": "1"}, {"price": "2"}, {"name": "Kiwi", "price": "abc"},
+                       {"name": "Fig", "categories": ["Nope"]})
+        lines.insert(1, "{not json\n")
+        report = ProductIngestor().ingest(parse_ndjson(lines))
+
+        assert report["created"] == 1
+        assert [error["row"] for error in report["errors"]] == [2, 3, 4, 5]
+
+    def test_non_finite_and_oversized_values_fail_per_row(self, fruits):
+        lines = ndjson({"name": "Apple", "price": "NaN"}, {"name": "Pear", "price": "Infinity"},
+                       {"name": "Kiwi", "price": "1", "stock": 2 ** 31}, {"name": "Plum", "price": "1"})
+        lines.insert(2, '{"name": "Fig", "price": "1", "stock": Infinity}\n')
+        report = ProductIngestor().ingest(parse_ndjson(lines))
+
+        assert report["created"] == 1
+        assert [error["row"] for error in report["errors"]] == [1, 2, 3, 4]
+        assert list(Product.objects.values_list("name", flat=True)) == ["Plum"]
+
+    def test_query_count_independent_of_chunk_rows(self, fruits, django_assert_max_num_queries):
+        rows = [{"name": f"P{i}", "price": "1", "categories": [fruits.id]} for i in range(200)]
+        with django_assert_max_num_queries(30):
+            report = ProductIngestor(chunk_size=100).ingest(parse_ndjson(ndjson(*rows)))
+        assert report["created"] == 200
+
+    def test_csv_feed(self, fruits):
+        lines = ["name,price,stock,categories\n", "Apple,1.00,5,Produce > Fruits|Produce\n"]
+        report = ProductIngestor().ingest(parse_csv(lines))
+        assert report["created"] == 1
+        assert Product.objects.get(name="Apple").categories.count() == 2
+
+
+@pytest.mark.django_db
+def test_bulk_endpoint_streams_ndjson(fruits):
+    body = "".join(ndjson({"name": "Apple", "price": "1"}, {"name": ""}))
+    response = APIClient().post(reverse("product-bulk"), body, content_type="application/x-ndjson")
+    assert response.status_code == 200
+    assert response.data["created"] == 1
+    assert response.data["errors"] == [{"row": 2, "error": "name is required"}]
+
+
+@pytest.mark.django_db
+def test_ingest_products_command(tmp_path, fruits):
+    feed = tmp_path / "feed.csv"
+    feed.write_text("name,price,categories\nApple,1.00,Produce > Fruits\n")
+    call_command("ingest_products", str(feed))
+    assert fruits.products.get().name == "Apple"
@@ -0,0 +1,240 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ecommerce_app import inventory
+from ecommerce_app.models import Customer, Order, Product, StockReservation, StockShard
+
+
+@pytest.fixture
+def customer(django_user_model):
+    user = django_user_model.objects.create_user(username="stock")
+    return Customer.objects.create(user=user, first_name="Sam", phone="0712345678")
+
+
+def stock_of(product):
+    return inventory.available(Product.objects.get(pk=product.pk))
+
+
+@pytest.mark.django_db
+class TestReservations:
+
+    def test_reserve_decrements_and_refuses_oversell(self):
+        product = Product.objects.create(name="Mug", price=5, stock=3)
+        inventory.reserve(product, 2)
+        assert stock_of(product) == 1
+
+        with pytest.raises(inventory.InsufficientStock):
+            inventory.reserve(product, 2)
+        assert stock_of(product) == 1
+
+    def test_sharded_take_gathers_from_several_counters(self):
+        product = inventory.shard_product(Product.objects.create(name="Hot", price=5, stock=10), 4)
+        assert list(StockShard.objects.filter(product=product).values_list("quantity", flat=True)) == [3, 2, 2]
+        assert product.stock == 3
+
+        reservations = inventory.reserve(product, 9)
+        assert sum(r.quantity for r in reservations) == 9
+        assert stock_of(product) == 1
+
+        inventory.release(StockReservation.objects.filter(product=product))
+        assert stock_of(product) == 10
+
+    def test_release_is_idempotent(self):
+        product = Product.objects.create(name="Mug", price=5, stock=3)
+        inventory.reserve(product, 3)
+        assert inventory.release(StockReservation.objects.all()) == 1
+        assert inventory.release(StockReservation.objects.all()) == 0
+        assert stock_of(product) == 3
+
+    def test_release_into_merged_shard_goes_to_product(self):
+        product = inventory.shard_product(Product.objects.create(name="Hot", price=5, stock=4), 4)
+        while not StockReservation.objects.filter(shard__gt=0).exists():
+            inventory.reserve(product, 1)
+        inventory.shard_product(product, 1)
+        inventory.release(StockReservation.objects.all())
+        assert stock_of(product) == 4
+
+
+@pytest.mark.django_db
+class TestOrderStock:
+
+    def place(self, customer, product, quantity):
+        payload = {"customer": customer.pk,
+                   "items": [{"product": product.pk, "quantity": quantity, "unit_price": "5.00"}]}
+        return APIClient().post(reverse("order-list"), payload, format="json")
+
+    def test_order_reserves_stock_and_rejects_oversell(self, customer):
+        product = Product.objects.create(name="Mug", price=5, stock=5)
+        assert self.place(customer, product, 4).status_code == 201
+        assert stock_of(product) == 1
+
+        response = self.place(customer, product, 2)
+        assert response.status_code == 400
+        assert "Insufficient stock" in response.data["items"][0]
+        assert Order.objects.count() == 1
+
+    def test_cancel_releases_and_ship_commits(self, customer):
+        product = Product.objects.create(name="Mug", price=5, stock=5)
+        self.place(customer, product, 2)
+        self.place(customer, product, 3)
+        first, second = Order.objects.order_by("id")
+
+        first.status = "cancelled"
+        first.save()
+        second.status = "shipped"
+        second.save()
+
+        assert stock_of(product) == 2
+        assert second.reservations.get().status == "committed"
+
+    def test_uncancel_takes_stock_again_or_is_refused(self, customer):
+        product = Product.objects.create(name="Mug", price=5, stock=5)
+        self.place(customer, product, 3)
+        order = Order.objects.get()
+        order.status = "cancelled"
+        order.save()
+
+        order.status = "pending"
+        order.save()
+        assert stock_of(product) == 2
+        assert order.reservations.filter(status="active").count() == 1
+
+        order.status = "cancelled"
+        order.save()
+        assert self.place(customer, product, 4).status_code == 201
+        order.status = "processing"
+        with pytest.raises(inventory.InsufficientStock):
+            order.save()
+        assert Order.objects.get(pk=order.pk).status == "cancelled"
+        assert stock_of(product) == 1
+
+    def test_uncancel_to_processing_commits_new_reservations(self, customer):
+        product = Product.objects.create(name="Mug", price=5, stock=5)
+        self.place(customer, product, 3)
+        order = Order.objects.get()
+        order.status = "cancelled"
+        order.save()
+
+        order.status = "processing"
+        order.save()
+        assert stock_of(product) == 2
+        assert order.reservations.filter(status="committed").count() == 1
+
+    def test_delete_releases(self, customer):
+        product = Product.objects.create(name="Mug", price=5, stock=5)
+        self.place(customer, product, 5)
+        Order.objects.get().delete()
+        assert stock_of(product) == 5
+
+    def test_expired_reservations_release_and_cancel(self, customer, settings):
+        settings.STOCK_RESERVATION_TTL = 60
+        product = Product.objects.create(name="Mug", price=5, stock=5)
+        self.place(customer, product, 5)
+
+        assert inventory.release_expired() == 0
+        assert inventory.release_expired(now=timezone.now() + timedelta(seconds=61)) == 1
+        assert stock_of(product) == 5
+        assert Order.objects.get().status == "cancelled"
+
+    def test_line_edits_refuse_oversell(self, customer):
+        product = Product.objects.create(name="Mug", price=5, stock=3)
+        self.place(customer, product, 2)
+        item = Order.objects.get().items.get()
+        url = reverse("order-item-detail", args=[item.pk])
+
+        response = APIClient().put(url, {"product": product.pk, "quantity": 500, "unit_price": "5.00"}, format="json")
+        assert response.status_code == 400
+        assert "Insufficient stock" in response.data["quantity"][0]
+        item.refresh_from_db()
+        assert item.quantity == 2
+        assert stock_of(product) == 1
+
+        response = APIClient().put(url, {"product": product.pk, "quantity": 3, "unit_price": "5.00"}, format="json")
+        assert response.status_code == 200
+        assert stock_of(product) == 0
+        assert item.order.reservations.get(status="active").quantity == 3
+
+    def test_line_create_reserves_and_delete_releases(self, customer):
+        mug = Product.objects.create(name="Mug", price=5, stock=3)
+        cup = Product.objects.create(name="Cup", price=5, stock=1)
+        self.place(customer, mug, 1)
+        order = Order.objects.get()
+        payload = {"order": order.pk, "product": cup.pk, "quantity": 2, "unit_price": "5.00"}
+
+        response = APIClient().post(reverse("order-item-list"), payload, format="json")
+        assert response.status_code == 400
+        assert order.items.count() == 1
+
+        payload["quantity"] = 1
+        response = APIClient().post(reverse("order-item-list"), payload, format="json")
+        assert response.status_code == 201
+        assert stock_of(cup) == 0
+
+        assert APIClient().delete(reverse("order-item-detail", args=[response.data["id"]])).status_code == 204
+        assert stock_of(cup) == 1
+        assert stock_of(mug) == 2
+        assert not order.reservations.filter(product=cup, status="active").exists()
+
+    def test_lines_of_committed_order_are_locked(self, customer):
+        product = Product.objects.create(name="Mug", price=5, stock=3)
+        self.place(customer, product, 2)
+        order = Order.objects.get()
+        order.status = "processing"
+        order.save()
+
+        response = APIClient().delete(reverse("order-item-detail", args=[order.items.get().pk]))
+        assert response.status_code == 400
+        assert order.items.exists()
+        assert stock_of(product) == 1
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize("shards", [1, 4])
+def test_concurrent_reservations_never_oversell(shards, capsys):
+    call_command("stock_stress", threads=4, stock=60, shards=shards)
+    assert "No overselling." in capsys.readouterr().out
+
+
+@pytest.mark.django_db
+class TestShardedStockInAPI:
+
+    @pytest.fixture
+    def product(self):
+        product = Product.objects.create(name="Mug", price=5, stock=9)
+        return inventory.shard_product(product, 3)
+
+    def test_payloads_report_every_counter(self, product):
+        client = APIClient()
+        assert client.get(reverse("product-detail", args=[product.pk])).data["stock"] == 9
+        assert client.get(reverse("product-list")).data["results"][0]["stock"] == 9
+        assert inventory.with_available(Product.objects.all()).get().available_stock == 9
+
+    def test_put_spreads_stock_over_the_counters(self, product):
+        payload = {"name": "Mug", "price": "5.00", "stock": 12, "categories": []}
+        response = APIClient().put(reverse("product-detail", args=[product.pk]), payload, format="json")
+
+        assert response.status_code == 200
+        assert response.data["stock"] == 12
+        assert sorted(StockShard.objects.values_list("quantity", flat=True)) == [4, 4]
+        assert stock_of(product) == 12
+
+    def test_put_without_stock_keeps_concurrent_takes(self, product):
+        stale = Product.objects.get(pk=product.pk)
+        inventory.reserve(product, 2)
+        payload = {"name": "Big mug", "price": "6.00", "categories": []}
+        response = APIClient().put(reverse("product-detail", args=[stale.pk]), payload, format="json")
+
+        assert response.status_code == 200
+        assert stock_of(product) == 7
+
+    def test_ingest_sets_total_stock(self, product):
+        from ecommerce_app.ingestion import ProductIngestor, parse_ndjson
+
+        ProductIngestor().ingest(parse_ndjson(['{"name": "Mug", "stock": 30}']))
+        assert stock_of(product) == 30
+        assert Product.objects.get(pk=product.pk).stock_shards == 3
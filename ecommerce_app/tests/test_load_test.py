@@ -0,0 +1,49 @@
+import json
+
+import pytest
+from django.core.management import call_command
+
+from ecommerce_app.loadgen import run_scenario
+from ecommerce_app.models import Order, OutboxMessage
+from ecommerce_app.notifications import StubSMSClient
+from ecommerce_app.sms_dispatch import BatchSMSDispatcher
+
+
+@pytest.mark.django_db(transaction=True)
+def test_load_test_places_orders_against_a_live_server(live_server, capsys):
+    # One virtual customer: SQLite serializes writers, so more would only measure its lock errors
+    call_command('load_test_orders', url=live_server.url, users=1, duration=1.5, interval=0.5,
+                 order_ratio=0.5, products=3, json=True)
+    result = json.loads(capsys.readouterr().out)
+
+    assert result['total']['errors'] == 0
+    assert set(result['by_label']) <= {'order', 'browse', 'product'}
+    assert result['by_label']['order']['requests'] == Order.objects.count() > 0
+    assert OutboxMessage.objects.filter(kind='sms').count() == Order.objects.count()
+    assert len(result['timeline']) >= 2
+    assert all(entry['lock_waits'] is None for entry in result['timeline'])  # not PostgreSQL
+
+
+@pytest.mark.django_db(transaction=True)
+def test_scenario_timeline_and_labels(live_server):
+    def flow(index):
+        while True:
+            yield 'ok', 'GET', '/api/v1/categories/tree/', None
+            yield 'missing', 'GET', '/api/v1/categories/999999/', None
+
+    probes = []
+    result = run_scenario(live_server.url, flow, users=2, duration=0.6, interval=0.2,
+                          probes={'probe': lambda: probes.append(1) or len(probes)})
+
+    assert result['by_label']['ok']['errors'] == 0
+    assert result['by_label']['missing']['error_rate'] == 1.0
+    assert result['total']['requests'] == sum(entry['requests'] for entry in result['timeline'])
+    assert [entry['probe'] for entry in result['timeline']] == list(range(1, len(probes) + 1))
+
+
+def test_stub_sms_client_reports_every_recipient_delivered():
+    dispatcher = BatchSMSDispatcher(client=StubSMSClient())
+    errors = dispatcher.dispatch([(1, {'to': ['+254700000001'], 'message': 'Hi'}),
+                                  (2, {'to': ['+254700000002'], 'message': 'Hi'})])
+    assert errors == {1: None, 2: None}
+    assert dispatcher.stats.batches == 1
@@ -0,0 +1,86 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.urls import reverse
+from prometheus_client import REGISTRY
+from rest_framework.test import APIClient
+
+from ecommerce_app import metrics, response_cache
+from ecommerce_app.models import Category, Product
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@pytest.fixture
+def products():
+    category = Category.objects.create(name="Audio")
+    for i in range(3):
+        Product.objects.create(name=f"Speaker {i}", price=10 + i, stock=1).categories.add(category)
+
+
+@pytest.mark.django_db
+def test_request_latency_queries_and_serializer_time_per_url_name(products):
+    labels = {'view': 'product-list'}
+    before = {
+        'count': sample('http_request_duration_seconds_count', method='GET', status='200', **labels),
+        'queries': sample('http_request_db_queries_sum', **labels),
+        'db': sample('http_request_db_seconds_sum', **labels),
+        'serializer': sample('http_request_serializer_seconds_sum', **labels),
+    }
+    response_cache.reset_stats()
+
+    assert APIClient().get(reverse('product-list')).status_code == 200
+
+    assert sample('http_request_duration_seconds_count', method='GET', status='200', **labels) == before['count'] + 1
+    assert sample('http_request_db_queries_sum', **labels) - before['queries'] >= 2
+    assert sample('http_request_db_seconds_sum', **labels) > before['db']
+    assert sample('http_request_serializer_seconds_sum', **labels) > before['serializer']
+
+    body = APIClient().get('/metrics').content.decode()
+    assert 'response_cache_events_total{cache="ProductListCreateAPIView",outcome="miss"} 1.0' in body
+
+
+@pytest.mark.django_db
+@pytest.mark.urls('Ecommerce.urls_async')
+def test_async_views_are_measured_too(products):
+    before = sample('http_request_db_queries_sum', view='product-detail')
+    product = Product.objects.first()
+    response = async_to_sync(AsyncClient().get)(f'/api/v1/products/{product.pk}/')
+    assert response.status_code == 200
+    assert sample('http_request_db_queries_sum', view='product-detail') > before
+
+
+@pytest.mark.django_db
+def test_unmatched_urls_share_one_label():
+    before = sample('http_request_duration_seconds_count', view=metrics.UNMATCHED, method='GET', status='404')
+    APIClient().get('/no/such/page/')
+    APIClient().get('/nor/this/one/')
+    assert sample('http_request_duration_seconds_count', view=metrics.UNMATCHED, method='GET', status='404') == before + 2
+
+
+def test_queries_outside_requests_are_not_counted(db, django_assert_num_queries):
+    assert metrics._current.get() is None
+    with django_assert_num_queries(1):
+        Product.objects.count()
+
+
+def test_external_calls():
+    before_ok = sample('external_call_duration_seconds_count', service='jwks', outcome='ok')
+    before_errors = sample('external_call_errors_total', service='jwks')
+    with metrics.external_call('jwks'):
+        pass
+    with pytest.raises(TimeoutError), metrics.external_call('jwks'):
+        raise TimeoutError
+    assert sample('external_call_duration_seconds_count', service='jwks', outcome='ok') == before_ok + 1
+    assert sample('external_call_errors_total', service='jwks') == before_errors + 1
+
+
+@pytest.mark.django_db
+def test_metrics_token(settings):
+    settings.METRICS_TOKEN = 's3cret'
+    assert APIClient().get('/metrics').status_code == 401
+    response = APIClient().get('/metrics', HTTP_AUTHORIZATION='Bearer s3cret')
+    assert response.status_code == 200
+    assert response['Content-Type'].startswith('text/plain')
@@ -40,6 +40,60 @@ class TestCategoryModel:
         descendants = root.get_descendants()
         assert set(descendants) == {child, grandchild}
 
+    def test_path_and_depth_maintained_on_create(self):
+        root = Category.objects.create(name="Root")
+        child = Category.objects.create(name="Child", parent=root)
+        assert root.path == f"{root.pk:010d}/"
+        assert child.path == f"{root.pk:010d}/{child.pk:010d}/"
+        assert (root.depth, child.depth) == (0, 1)
+        child.refresh_from_db()
+        assert child.path.startswith(root.path)
+
+    def test_reparent_moves_whole_subtree(self):
+        a = Category.objects.create(name="A")
+        b = Category.objects.create(name="B")
+        child = Category.objects.create(name="Child", parent=a)
+        grandchild = Category.objects.create(name="Grandchild", parent=child)
+
+        child.parent = b
+        child.save()
+
+        grandchild.refresh_from_db()
+        assert grandchild.path == b.path + f"{child.pk:010d}/{grandchild.pk:010d}/"
+        assert grandchild.depth == 2
+        assert set(b.get_descendants()) == {child, grandchild}
+        assert list(a.get_descendants()) == []
+
+    def test_cannot_move_under_own_descendant(self):
+        root = Category.objects.create(name="Root")
+        child = Category.objects.create(name="Child", parent=root)
+        root.parent = child
+        with pytest.raises(ValueError):
+            root.save()
+
+    def test_subtree_lookups_are_single_queries(self, django_assert_num_queries):
+        node = Category.objects.create(name="L0")
+        for level in range(1, 8):
+            node = Category.objects.create(name=f"L{level}", parent=node)
+        root = Category.objects.get(name="L0")
+
+        with django_assert_num_queries(1):
+            assert len(node.get_ancestors()) == 7
+        with django_assert_num_queries(1):
+            assert len(root.get_descendants()) == 7
+        with django_assert_num_queries(1):
+            assert root.get_tree()["children"][0]["children"][0]["name"] == "L2"
+
+    def test_rebuild_paths_backfills_index(self):
+        root = Category.objects.create(name="Root")
+        child = Category.objects.create(name="Child", parent=root)
+        Category.objects.update(path='', depth=0)
+
+        assert Category.objects.rebuild_paths() == 2
+        child.refresh_from_db()
+        assert child.path == f"{root.pk:010d}/{child.pk:010d}/"
+        assert child.depth == 1
+
     def test_get_tree_structure(self):
         root = Category.objects.create(name="Root")
         child = Category.objects.create(name="Child", parent=root)
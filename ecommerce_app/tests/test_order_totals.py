@@ -0,0 +1,82 @@
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ecommerce_app.models import Customer, Order, OrderItem, Product
+
+
+@pytest.fixture
+def customer(django_user_model):
+    user = django_user_model.objects.create_user(username="totals")
+    return Customer.objects.create(user=user, first_name="Tia", phone="0712345678")
+
+
+@pytest.fixture
+def products():
+    return [Product.objects.create(name=f"P{i}", price=10, stock=100) for i in range(3)]
+
+
+def lines(products, *quantities):
+    return [{"product": p.pk, "quantity": q, "unit_price": "2.50"} for p, q in zip(products, quantities)]
+
+
+@pytest.mark.django_db
+def test_totals_stored_on_create_and_update(customer, products):
+    client = APIClient()
+    response = client.post(reverse("order-list"), {"customer": customer.pk, "items": lines(products, 1, 3)},
+                           format="json")
+    assert response.status_code == 201
+    assert (response.data["total_amount"], response.data["item_count"]) == ("10.00", 4)
+
+    order_id = response.data["id"]
+    response = client.put(reverse("order-detail", args=[order_id]),
+                          {"customer": customer.pk, "items": lines(products, 2)}, format="json")
+    assert response.status_code == 200
+    order = Order.objects.get(pk=order_id)
+    assert (order.total_amount, order.item_count) == (Decimal("5.00"), 2)
+
+
+@pytest.mark.django_db
+def test_single_line_edits_recalculate(customer, products):
+    order = Order.objects.create(customer=customer)
+    first = OrderItem.objects.create(order=order, product=products[0], quantity=1, unit_price=4)
+    OrderItem.objects.create(order=order, product=products[1], quantity=2, unit_price=1)
+    Order.objects.filter(pk=order.pk).recalculate_totals()
+
+    client = APIClient()
+    client.put(reverse("order-item-detail", args=[first.pk]),
+               {"product": products[0].pk, "quantity": 5, "unit_price": "4.00"}, format="json")
+    order.refresh_from_db()
+    assert (order.total_amount, order.item_count) == (Decimal("22.00"), 7)
+
+    client.delete(reverse("order-item-detail", args=[first.pk]))
+    order.refresh_from_db()
+    assert (order.total_amount, order.item_count) == (Decimal("2.00"), 2)
+
+
+@pytest.mark.django_db
+def test_computed_totals_match_stored(customer, products):
+    order = Order.objects.create(customer=customer)
+    for product in products:
+        OrderItem.objects.create(order=order, product=product, quantity=2, unit_price="1.25")
+    Order.objects.create(customer=customer)
+    Order.objects.recalculate_totals()
+
+    for row in Order.objects.with_computed_totals():
+        assert (row.computed_total, row.computed_item_count) == (row.total_amount, row.item_count)
+
+
+@pytest.mark.django_db
+def test_revenue_report(customer, products, django_assert_num_queries):
+    client = APIClient()
+    client.post(reverse("order-list"), {"customer": customer.pk, "items": lines(products, 1, 1)}, format="json")
+    client.post(reverse("order-list"), {"customer": customer.pk, "items": lines(products, 4)}, format="json")
+    Order.objects.filter(item_count=4).update(status="cancelled")
+
+    with django_assert_num_queries(1):
+        response = client.get(reverse("order-revenue"), {"status": "pending"})
+    assert response.data == {"orders": 1, "revenue": Decimal("5.00"), "items": 2}
+
+    assert client.get(reverse("order-revenue"), {"since": "yesterday"}).status_code == 400
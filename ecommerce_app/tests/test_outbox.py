@@ -0,0 +1,75 @@
+import pytest
+from datetime import timedelta
+
+from django.core import mail
+from django.utils import timezone
+
+from ecommerce_app import outbox
+from ecommerce_app.models import OutboxMessage
+
+
+class StubSMS:
+    """In-process stand-in for the Africa's Talking SMS client."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.sent = []
+
+    def send(self, message, recipients):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("gateway timeout")
+        self.sent.append((message, recipients))
+        return {"SMSMessageData": {"Recipients": [{"number": n, "status": "Success", "statusCode": 101} for n in recipients]}}
+
+
+def sms_message(**overrides):
+    payload = {"to": ["+254712345678"], "message": "Hello"}
+    return OutboxMessage.objects.create(kind="sms", payload=payload, **overrides)
+
+
+@pytest.mark.django_db
+class TestOutboxWorker:
+
+    def test_delivers_sms_and_email(self):
+        outbox.enqueue([
+            ("sms", {"to": ["+254712345678"], "message": "Hello"}),
+            ("email", {"subject": "New Order #1", "body": "body", "from_email": "shop@example.com",
+                       "recipient_list": ["admin@example.com"]}),
+        ])
+        stub = StubSMS()
+
+        assert outbox.OutboxWorker(sms_client=stub, pool_size=2).run_once() == 2
+        assert stub.sent == [("Hello", ["+254712345678"])]
+        assert [m.subject for m in mail.outbox] == ["New Order #1"]
+        assert set(OutboxMessage.objects.values_list("status", flat=True)) == {"sent"}
+
+    def test_failure_is_retried_with_backoff(self):
+        message = sms_message()
+        worker = outbox.OutboxWorker(sms_client=StubSMS(failures=1), backoff_seconds=10)
+
+        before = timezone.now()
+        worker.run_once()
+        message.refresh_from_db()
+        assert message.status == "pending"
+        assert message.attempts == 1
+        assert "gateway timeout" in message.last_error
+        assert message.next_attempt_at >= before + timedelta(seconds=10)
+
+        assert worker.run_once() == 0  # not due yet
+        OutboxMessage.objects.update(next_attempt_at=timezone.now())
+        worker.run_once()
+        message.refresh_from_db()
+        assert message.status == "sent"
+
+    def test_dead_lettered_after_max_attempts(self):
+        message = sms_message(attempts=2)
+        outbox.OutboxWorker(sms_client=StubSMS(failures=1), max_attempts=3).run_once()
+        message.refresh_from_db()
+        assert message.status == "dead"
+
+    def test_claim_leases_messages(self):
+        sms_message()
+        worker = outbox.OutboxWorker(sms_client=StubSMS())
+        assert len(worker.claim()) == 1
+        assert worker.claim() == []
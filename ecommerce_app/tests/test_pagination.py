@@ -0,0 +1,81 @@
+import pytest
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from ecommerce_app.models import Customer, Order, Product
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+def walk(client, url, **params):
+    """Follow ``next`` links and return every page's names."""
+    pages = []
+    response = client.get(url, params)
+    while True:
+        assert response.status_code == status.HTTP_200_OK
+        pages.append([row["name"] for row in response.data["results"]])
+        if not response.data["next"]:
+            return pages
+        response = client.get(response.data["next"])
+
+
+@pytest.mark.django_db
+def test_products_paged_by_name_with_id_tie_breaker(api_client):
+    for name in ["b", "a", "c", "a", "b"]:
+        Product.objects.create(name=name, price=1)
+
+    pages = walk(api_client, reverse("product-list"), page_size=2)
+    assert pages == [["a", "a"], ["b", "b"], ["c"]]
+
+
+@pytest.mark.django_db
+def test_previous_link_returns_to_prior_page(api_client):
+    for name in "abcde":
+        Product.objects.create(name=name, price=1)
+    url = reverse("product-list")
+
+    first = api_client.get(url, {"page_size": 2})
+    assert first.data["previous"] is None
+    second = api_client.get(first.data["next"])
+    back = api_client.get(second.data["previous"])
+    assert [row["name"] for row in back.data["results"]] == ["a", "b"]
+    assert back.data["previous"] is None
+
+
+@pytest.mark.django_db
+def test_pages_stable_while_rows_inserted(api_client):
+    for name in "bdf":
+        Product.objects.create(name=name, price=1)
+    url = reverse("product-list")
+
+    first = api_client.get(url, {"page_size": 2})
+    Product.objects.create(name="a", price=1)  # sorts before the cursor
+    second = api_client.get(first.data["next"])
+    assert [row["name"] for row in second.data["results"]] == ["f"]
+
+
+@pytest.mark.django_db
+def test_orders_newest_first(api_client, django_user_model):
+    user = django_user_model.objects.create_user(username="jane")
+    customer = Customer.objects.create(user=user, first_name="Jane", email="jane@example.com")
+    orders = [Order.objects.create(customer=customer) for _ in range(3)]
+
+    response = api_client.get(reverse("order-list"), {"page_size": 2})
+    second = api_client.get(response.data["next"])
+    ids = [row["id"] for row in response.data["results"] + second.data["results"]]
+    assert ids == [order.id for order in reversed(orders)]
+
+
+@pytest.mark.django_db
+def test_page_size_is_capped_and_bad_cursor_rejected(api_client, settings):
+    settings.API_MAX_PAGE_SIZE = 2
+    for name in "abc":
+        Product.objects.create(name=name, price=1)
+    url = reverse("product-list")
+
+    assert len(api_client.get(url, {"page_size": 100}).data["results"]) == 2
+    assert api_client.get(url, {"cursor": "not-a-cursor"}).status_code == status.HTTP_404_NOT_FOUND
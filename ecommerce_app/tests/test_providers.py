@@ -0,0 +1,69 @@
+import json
+import subprocess
+import sys
+
+import pytest
+from django.core.management import call_command
+
+from ecommerce_app import notifications, providers, startup
+from ecommerce_app.notifications import StubSMSClient
+from ecommerce_app.sms_dispatch import BatchSMSDispatcher
+
+
+@pytest.fixture
+def stub_sms(settings):
+    settings.SMS_CLIENT = 'ecommerce_app.notifications.StubSMSClient'
+    providers.reset('sms')
+    yield
+    providers.reset('sms')
+
+
+def test_provider_is_built_once_on_first_use():
+    built = []
+    providers.register('test-client', lambda: built.append(1) or object())
+    try:
+        assert not providers.is_built('test-client')
+        client = providers.get('test-client')
+        assert providers.get('test-client') is client
+        assert built == [1]
+
+        providers.reset('test-client')
+        assert providers.get('test-client') is not client
+        assert built == [1, 1]
+    finally:
+        providers.reset('test-client')
+
+    with pytest.raises(LookupError):
+        providers.get('no-such-client')
+
+
+def test_sms_client_comes_from_settings(stub_sms):
+    assert isinstance(notifications.sms, StubSMSClient)
+    assert notifications.sms is providers.get('sms')
+
+    dispatcher = BatchSMSDispatcher()
+    assert dispatcher.dispatch([(1, {'to': ['+254700000001'], 'message': 'Hi'})]) == {1: None}
+
+
+def test_importing_the_app_does_not_load_external_clients():
+    code = ("import django; django.setup(); import ecommerce_app.views, ecommerce_app.notifications, sys; "
+            "print('africastalking' in sys.modules)")
+    completed = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    assert completed.stdout.strip() == 'False'
+    assert 'AFRICASTALKING' not in completed.stdout and 'SECRET' not in completed.stdout
+
+
+def test_parse_importtime():
+    log = ("import time: self [us] | cumulative | imported package\n"
+           "import time:       120 |        120 |   _io\n"
+           "import time:       300 |       1500 | Ecommerce.settings\n")
+    assert startup.parse_importtime(log) == {'_io': (120, 120, 1), 'Ecommerce.settings': (300, 1500, 0)}
+
+
+def test_benchmark_startup_command(capsys):
+    call_command('benchmark_startup', runs=1, top=5, json=True)
+    result = json.loads(capsys.readouterr().out)
+    assert result['module'] == 'Ecommerce.wsgi'
+    assert result['median_s'] > 0
+    assert len(result['slowest_imports']) == 5
+    assert result['slowest_imports'][0]['module'] == 'Ecommerce.wsgi'
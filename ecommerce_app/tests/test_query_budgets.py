@@ -0,0 +1,65 @@
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ecommerce_app.models import Category, Customer, Order, OrderItem, Product
+
+
+@pytest.fixture
+def catalog(django_user_model):
+    """Ten products in two categories each, and ten orders of three lines."""
+    categories = [Category.objects.create(name=f"Category {i}") for i in range(4)]
+    products = []
+    for i in range(10):
+        product = Product.objects.create(name=f"Product {i}", price=10 + i)
+        product.categories.add(categories[i % 4], categories[(i + 1) % 4])
+        products.append(product)
+
+    user = django_user_model.objects.create_user(username="budget")
+    customer = Customer.objects.create(user=user, first_name="Ann", email="ann@example.com")
+    orders = []
+    for i in range(10):
+        order = Order.objects.create(customer=customer)
+        for product in products[i:i + 3]:
+            OrderItem.objects.create(order=order, product=product, quantity=1, unit_price=product.price)
+        orders.append(order)
+    return products, orders
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("url_name", [
+    "category-list", "product-list", "customer-list", "order-list", "order-item-list",
+])
+def test_list_endpoints_within_query_budget(url_name, catalog, query_budget):
+    client = APIClient()
+    with query_budget(url_name):
+        response = client.get(reverse(url_name))
+    assert response.status_code == 200
+    assert response.data["results"]
+
+
+@pytest.mark.django_db
+def test_detail_endpoints_within_query_budget(catalog, query_budget):
+    products, orders = catalog
+    client = APIClient()
+    item = orders[0].items.first()
+    for url_name, pk in [("product-detail", products[0].pk), ("order-detail", orders[0].pk),
+                         ("order-item-detail", item.pk)]:
+        with query_budget(url_name):
+            response = client.get(reverse(url_name, args=[pk]))
+        assert response.status_code == 200
+
+
+@pytest.mark.django_db
+def test_order_create_query_count_independent_of_lines(django_user_model, query_budget):
+    user = django_user_model.objects.create_user(username="bulk")
+    customer = Customer.objects.create(user=user, first_name="Bo", email="bo@example.com", phone="0712345678")
+    products = Product.objects.bulk_create(Product(name=f"Line {i}", price=5, stock=1) for i in range(50))
+    payload = {
+        "customer": customer.pk,
+        "items": [{"product": p.pk, "quantity": 1, "unit_price": "5.00"} for p in products],
+    }
+    with query_budget("order-create"):
+        response = APIClient().post(reverse("order-list"), payload, format="json")
+    assert response.status_code == 201
+    assert len(response.data["items"]) == 50
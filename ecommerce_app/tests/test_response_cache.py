@@ -0,0 +1,156 @@
+import threading
+import time
+
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ecommerce_app import caching, response_cache
+from ecommerce_app.models import Category, Product
+
+
+@pytest.fixture
+def products():
+    category = Category.objects.create(name="Garden")
+    first = Product.objects.create(name="Rake", price=12, stock=3)
+    second = Product.objects.create(name="Hose", price=30, stock=3)
+    first.categories.add(category)
+    return first, second
+
+
+@pytest.fixture(autouse=True)
+def fresh_stats():
+    response_cache.reset_stats()
+
+
+@pytest.mark.django_db
+def test_second_read_served_from_cache(products, django_assert_num_queries):
+    client = APIClient()
+    url = reverse("product-list")
+    first = client.get(url)
+    assert first["X-Cache"] == "MISS"
+
+    with django_assert_num_queries(0):
+        second = client.get(url)
+    assert second["X-Cache"] == "HIT"
+    assert second.json() == first.json()
+    assert response_cache.stats()["ProductListCreateAPIView"] == {"hit": 1, "miss": 1, "wait": 0}
+
+
+@pytest.mark.django_db
+def test_writes_invalidate_dependent_entries_only(products, django_capture_on_commit_callbacks):
+    rake, hose = products
+    client = APIClient()
+    rake_url = reverse("product-detail", args=[rake.pk])
+    client.get(rake_url)
+    client.get(reverse("product-list"))
+
+    with django_capture_on_commit_callbacks(execute=True):
+        hose.price = 35
+        hose.save()
+    assert client.get(rake_url)["X-Cache"] == "HIT"
+    assert client.get(reverse("product-list"))["X-Cache"] == "MISS"
+
+    with django_capture_on_commit_callbacks(execute=True):
+        rake.categories.add(Category.objects.create(name="Tools"))
+    response = client.get(rake_url)
+    assert response["X-Cache"] == "MISS"
+    assert sorted(response.json()["categories_name"]) == ["Garden", "Tools"]
+
+
+@pytest.mark.django_db
+def test_versions_move_only_when_the_write_commits(products, django_capture_on_commit_callbacks):
+    rake, _ = products
+    category = rake.categories.get()
+    namespaces = ("products", caching.product_namespace(rake.pk), "categories")
+    before = [caching.get_version(namespace) for namespace in namespaces]
+
+    with django_capture_on_commit_callbacks() as callbacks:
+        rake.price = 15
+        rake.save()
+        rake.categories.remove(category)
+        category.delete()
+        assert [caching.get_version(namespace) for namespace in namespaces] == before
+
+    for callback in callbacks:
+        callback()
+    after = [caching.get_version(namespace) for namespace in namespaces]
+    assert all(new > old for new, old in zip(after, before))
+
+
+@pytest.mark.django_db
+def test_category_and_price_endpoints(products, django_capture_on_commit_callbacks):
+    rake, _ = products
+    client = APIClient()
+    category = rake.categories.get()
+    url = reverse("average-price", args=[category.pk])
+    assert client.get(url).json()["average_price"] == 12.0
+    assert client.get(url)["X-Cache"] == "HIT"
+
+    with django_capture_on_commit_callbacks(execute=True):
+        rake.price = 20
+        rake.save()
+    assert client.get(url).json()["average_price"] == 20.0
+
+    assert client.get(reverse("category-list"))["X-Cache"] == "MISS"
+    with django_capture_on_commit_callbacks(execute=True):
+        category.name = "Yard"
+        category.save()
+    assert client.get(reverse("category-list")).json()["results"][0]["name"] == "Yard"
+
+
+@pytest.mark.django_db
+def test_errors_are_not_cached():
+    client = APIClient()
+    url = reverse("product-detail", args=[999])
+    assert client.get(url).status_code == 404
+    assert client.get(url).status_code == 404
+    assert response_cache.stats()["ProductDetailAPIView"]["hit"] == 0
+
+
+def test_concurrent_misses_build_once(settings):
+    settings.RESPONSE_CACHE_WAIT = 5
+    builds = []
+
+    def build():
+        builds.append(1)
+        time.sleep(0.2)
+        return b"payload"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(response_cache.get_or_build("k", build)))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(builds) == 1
+    assert [value for value, _ in results] == [b"payload"] * 5
+    assert response_cache.stats()["fragment"] == {"hit": 4, "miss": 1, "wait": 4}
+
+
+@pytest.mark.django_db
+def test_process_local_cache_disables_version_keyed_caching(products, settings):
+    from ecommerce_app.checks import shared_cache_check
+    from ecommerce_app.token_cache import TokenCache
+
+    settings.CACHE_ALLOW_PROCESS_LOCAL = False
+    assert [warning.id for warning in shared_cache_check(None)] == ["ecommerce_app.W001"]
+
+    client = APIClient()
+    url = reverse("product-detail", args=[products[0].pk])
+    for _ in range(2):
+        response = client.get(url)
+        assert response.status_code == 200
+        assert not response.has_header("X-Cache") and not response.has_header("ETag")
+    assert response_cache.stats() == {}
+
+    tokens = TokenCache(max_size=10)
+    tokens.put("token", time.time() + 60, products[0])
+    assert tokens.get("token") is None
+
+    settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache"}}
+    assert caching.is_shared() and shared_cache_check(None) == []
@@ -0,0 +1,85 @@
+import pytest
+from decimal import Decimal
+
+from ecommerce_app import rollups
+from ecommerce_app.models import Category, CategoryPriceStats, Product
+
+
+def stats_for(category):
+    row = CategoryPriceStats.objects.filter(category=category).first()
+    if row is None:
+        return (0, Decimal("0"), None, None)
+    return (row.product_count, row.price_sum, row.price_min, row.price_max)
+
+
+def recomputed(category):
+    rollups.refresh([category.pk])
+    return stats_for(category)
+
+
+@pytest.fixture
+def tree():
+    root = Category.objects.create(name="Produce")
+    fruits = Category.objects.create(name="Fruits", parent=root)
+    citrus = Category.objects.create(name="Citrus", parent=fruits)
+    veg = Category.objects.create(name="Vegetables", parent=root)
+    return root, fruits, citrus, veg
+
+
+@pytest.mark.django_db
+class TestCategoryPriceRollups:
+
+    def test_adding_product_updates_whole_ancestor_chain(self, tree):
+        root, fruits, citrus, veg = tree
+        orange = Product.objects.create(name="Orange", price=Decimal("3.00"))
+        orange.categories.add(citrus)
+
+        for category in (root, fruits, citrus):
+            assert stats_for(category) == (1, Decimal("3.00"), Decimal("3.00"), Decimal("3.00"))
+        assert stats_for(veg)[0] == 0
+
+    def test_product_in_two_subtree_categories_counted_once(self, tree):
+        root, fruits, citrus, veg = tree
+        lemon = Product.objects.create(name="Lemon", price=Decimal("2.00"))
+        lemon.categories.add(citrus, fruits)
+        assert stats_for(root)[0] == 1
+        assert stats_for(root) == recomputed(root)
+
+    def test_reprice_recategorise_and_delete(self, tree):
+        root, fruits, citrus, veg = tree
+        cheap = Product.objects.create(name="Carrot", price=Decimal("1.00"))
+        cheap.categories.add(veg)
+        dear = Product.objects.create(name="Orange", price=Decimal("5.00"))
+        dear.categories.add(citrus)
+
+        cheap.price = Decimal("7.00")
+        cheap.save()
+        assert stats_for(root) == (2, Decimal("12.00"), Decimal("5.00"), Decimal("7.00"))
+
+        dear.categories.set([veg])
+        assert stats_for(fruits)[0] == 0
+        assert stats_for(veg) == (2, Decimal("12.00"), Decimal("5.00"), Decimal("7.00"))
+
+        cheap.delete()
+        assert stats_for(veg) == (1, Decimal("5.00"), Decimal("5.00"), Decimal("5.00"))
+        assert stats_for(root) == recomputed(root)
+
+    def test_moving_category_moves_its_products(self, tree):
+        root, fruits, citrus, veg = tree
+        orange = Product.objects.create(name="Orange", price=Decimal("3.00"))
+        orange.categories.add(citrus)
+
+        citrus.parent = veg
+        citrus.save()
+
+        assert stats_for(fruits)[0] == 0
+        assert stats_for(veg) == (1, Decimal("3.00"), Decimal("3.00"), Decimal("3.00"))
+        assert stats_for(root)[0] == 1
+
+    def test_deleting_category_refreshes_ancestors(self, tree):
+        root, fruits, citrus, veg = tree
+        orange = Product.objects.create(name="Orange", price=Decimal("3.00"))
+        orange.categories.add(citrus)
+
+        fruits.delete()
+        assert stats_for(root)[0] == 0
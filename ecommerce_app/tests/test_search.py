@@ -0,0 +1,84 @@
+import pytest
+from django.db import connection
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ecommerce_app.models import Category, Product
+from ecommerce_app.search import InvertedIndex, search_products
+
+
+@pytest.fixture
+def catalog():
+    electronics = Category.objects.create(name="Electronics")
+    phones = Category.objects.create(name="Phones", parent=electronics)
+    kitchen = Category.objects.create(name="Kitchen")
+
+    phone = Product.objects.create(name="Android Phone", description="Dual SIM smartphone", price=300)
+    phone.categories.add(phones)
+    case = Product.objects.create(name="Phone Case", description="Silicone case", price=10)
+    case.categories.add(electronics)
+    kettle = Product.objects.create(name="Electric Kettle", description="Boils water; not a phone", price=40)
+    kettle.categories.add(kitchen)
+    return {"electronics": electronics, "phone": phone, "case": case, "kettle": kettle}
+
+
+def names(queryset):
+    return [product.name for product in queryset]
+
+
+class TestInvertedIndex:
+    index = InvertedIndex([
+        (1, "Android Phone", "Dual SIM smartphone"),
+        (2, "Phone Case", "Silicone case"),
+        (3, "Electric Kettle", "Boils water; not a phone"),
+    ])
+
+    def test_name_matches_rank_above_description_matches(self):
+        assert self.index.search("phone") == [1, 2, 3]
+
+    def test_all_terms_must_match(self):
+        assert self.index.search("phone case") == [2]
+
+    def test_prefix_and_typo(self):
+        assert self.index.search("andr") == [1]
+        assert self.index.search("kettel") == [3]
+
+    def test_no_match(self):
+        assert self.index.search("laptop") == []
+
+
+@pytest.mark.django_db
+class TestSearchEndpoint:
+
+    def test_ranked_results_paginated(self, catalog):
+        response = APIClient().get(reverse("product-search"), {"q": "phone", "page_size": 2})
+        assert response.status_code == 200
+        assert response.data["count"] == 3
+        assert [p["name"] for p in response.data["results"]] == ["Android Phone", "Phone Case"]
+        assert response.data["next"]
+
+    def test_category_filter_includes_subtree(self, catalog):
+        response = APIClient().get(reverse("product-search"),
+                                   {"q": "phone", "category": catalog["electronics"].pk})
+        assert [p["name"] for p in response.data["results"]] == ["Android Phone", "Phone Case"]
+
+    def test_query_required(self):
+        assert APIClient().get(reverse("product-search")).status_code == 400
+
+    def test_index_follows_product_writes(self, catalog, django_capture_on_commit_callbacks):
+        assert names(search_products("toaster")) == []
+        with django_capture_on_commit_callbacks(execute=True):
+            Product.objects.create(name="Toaster", price=25)
+        assert names(search_products("toaster")) == ["Toaster"]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            catalog["kettle"].name = "Tea Kettle"
+            catalog["kettle"].save()
+        assert names(search_products("tea")) == ["Tea Kettle"]
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(connection.vendor != "postgresql", reason="needs the PostgreSQL search trigger")
+def test_postgres_fulltext_and_trigram(catalog):
+    assert names(search_products("smartphones"))[0] == "Android Phone"
+    assert "Electric Kettle" in names(search_products("Electrik Kettle"))
@@ -0,0 +1,69 @@
+import pytest
+
+from ecommerce_app import outbox
+from ecommerce_app.models import OutboxMessage
+from ecommerce_app.sms_dispatch import BatchSMSDispatcher
+
+
+class FakeGateway:
+    """In-process Africa's Talking stand-in returning per-recipient statuses."""
+
+    def __init__(self, rejected=()):
+        self.rejected = set(rejected)
+        self.calls = []
+
+    def send(self, message, recipients):
+        self.calls.append((message, list(recipients)))
+        return {"SMSMessageData": {"Message": "Sent", "Recipients": [
+            {"number": n, "status": "InvalidPhoneNumber", "statusCode": 403} if n in self.rejected else
+            {"number": n, "status": "Success", "statusCode": 101}
+            for n in recipients
+        ]}}
+
+
+def test_identical_texts_share_gateway_calls():
+    gateway = FakeGateway()
+    dispatcher = BatchSMSDispatcher(client=gateway, max_recipients=2)
+    messages = [(i, {"to": [f"+2547000000{i}"], "message": "Order placed"}) for i in range(5)]
+    messages.append((9, {"to": ["+254711111111"], "message": "Something else"}))
+
+    errors = dispatcher.dispatch(messages)
+
+    assert all(error is None for error in errors.values())
+    assert [len(recipients) for _, recipients in gateway.calls] == [2, 2, 1, 1]
+    assert dispatcher.stats.batches == 4
+    assert dispatcher.stats.sent == 6
+
+
+def test_per_recipient_failures_mapped_to_messages():
+    gateway = FakeGateway(rejected={"+254700000001"})
+    dispatcher = BatchSMSDispatcher(client=gateway)
+    errors = dispatcher.dispatch([
+        ("a", {"to": ["+254700000000"], "message": "hi"}),
+        ("b", {"to": ["+254700000001"], "message": "hi"}),
+    ])
+    assert errors["a"] is None
+    assert "InvalidPhoneNumber" in str(errors["b"])
+    assert (dispatcher.stats.sent, dispatcher.stats.failed) == (1, 1)
+
+
+def test_gateway_error_fails_whole_batch():
+    class Down:
+        def send(self, message, recipients):
+            raise ConnectionError("down")
+
+    errors = BatchSMSDispatcher(client=Down()).dispatch([(1, {"to": ["+1"], "message": "x"})])
+    assert isinstance(errors[1], ConnectionError)
+
+
+@pytest.mark.django_db
+def test_worker_batches_queued_confirmations():
+    gateway = FakeGateway(rejected={"+254700000003"})
+    outbox.enqueue([("sms", {"to": [f"+25470000000{i}"], "message": "Order placed"}) for i in range(4)])
+
+    outbox.OutboxWorker(sms_client=gateway, linger_seconds=0).run_once()
+
+    assert len(gateway.calls) == 1
+    statuses = dict(OutboxMessage.objects.values_list("payload__to__0", "status"))
+    assert statuses.pop("+254700000003") == "pending"
+    assert set(statuses.values()) == {"sent"}
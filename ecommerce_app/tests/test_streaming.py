@@ -0,0 +1,44 @@
+import json
+
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ecommerce_app.models import Category, Product
+
+
+def read(response):
+    assert response.streaming
+    return json.loads(b"".join(response.streaming_content))
+
+
+@pytest.fixture
+def products():
+    category = Category.objects.create(name="Bulk")
+    products = Product.objects.bulk_create(Product(name=f"Item {i:03}", price=i) for i in range(25))
+    category.products.add(*products)
+    return products
+
+
+@pytest.mark.django_db
+def test_stream_matches_paginated_rows(products, settings):
+    settings.API_STREAM_CHUNK_SIZE = 10
+    client = APIClient()
+    streamed = read(client.get(reverse("product-list"), {"stream": "true"}))
+    paged = client.get(reverse("product-list"), {"page_size": 100}).json()["results"]
+    assert streamed == paged
+    assert len(streamed) == 25
+
+
+@pytest.mark.django_db
+def test_stream_queries_per_chunk(products, settings, django_assert_max_num_queries):
+    settings.API_STREAM_CHUNK_SIZE = 10
+    response = APIClient().get(reverse("product-list"), {"stream": "1"})
+    # at most one cursor fetch and one categories prefetch per chunk of 10
+    with django_assert_max_num_queries(6):
+        read(response)
+
+
+@pytest.mark.django_db
+def test_stream_empty_list():
+    assert read(APIClient().get(reverse("category-list"), {"stream": "true"})) == []
@@ -5,7 +5,8 @@ from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from ecommerce_app.models import Category, Product, Customer, Order, OrderItem
+from ecommerce_app.models import Category, Product, Customer, Order, OrderItem, OutboxMessage
+from ecommerce_app.outbox import OutboxWorker
 
 
 @pytest.fixture
@@ -20,7 +21,7 @@ def category():
 
 @pytest.fixture
 def product(category):
-    product = Product.objects.create(name="Laptop (Test)", price=1000)
+    product = Product.objects.create(name="Laptop (Test)", price=1000, stock=100)
     product.categories.add(category)  # ✅ Link category to product
     return product
 
@@ -43,7 +44,7 @@ def test_list_categories(api_client, category):
     url = reverse("category-list")  # Adjust name to your urls.py
     response = api_client.get(url)
     assert response.status_code == status.HTTP_200_OK
-    assert response.data[0]["name"] == "Electronics"
+    assert response.data["results"][0]["name"] == "Electronics"
 
 
 @pytest.mark.django_db
@@ -55,6 +56,36 @@ def test_create_category(api_client):
     assert response.status_code == status.HTTP_201_CREATED
     assert Category.objects.filter(name="Books").exists()
 
+@pytest.mark.django_db
+def test_list_categories_is_flat(api_client, category):
+    Category.objects.create(name="Phones", parent=category)
+    response = api_client.get(reverse("category-list"))
+    assert response.status_code == status.HTTP_200_OK
+    assert all("children" not in row for row in response.data["results"])
+
+
+@pytest.mark.django_db
+def test_category_tree_single_query_and_cached(api_client, category, django_assert_num_queries,
+                                               django_capture_on_commit_callbacks):
+    phones = Category.objects.create(name="Phones", parent=category)
+    Category.objects.create(name="Android", parent=phones)
+    url = reverse("category-tree")
+
+    with django_assert_num_queries(1):
+        response = api_client.get(url)
+    tree = response.json()
+    assert tree[0]["name"] == "Electronics"
+    assert tree[0]["children"][0]["children"][0]["name"] == "Android"
+
+    with django_assert_num_queries(0):
+        assert api_client.get(url).content == response.content
+
+    with django_capture_on_commit_callbacks(execute=True):
+        phones.name = "Mobiles"
+        phones.save()
+    assert api_client.get(url).json()[0]["children"][0]["name"] == "Mobiles"
+
+
 @pytest.mark.django_db
 def test_create_product(api_client, category):
     url = reverse("product-list")
@@ -68,12 +99,12 @@ def test_list_products(api_client, product):
     url = reverse("product-list")
     response = api_client.get(url)
     assert response.status_code == status.HTTP_200_OK
-    assert response.data[0]["name"] == "Laptop (Test)"
+    assert response.data["results"][0]["name"] == "Laptop (Test)"
 
 
 @pytest.mark.django_db
-@patch("ecommerce_app.views.sms.send")
-@patch("ecommerce_app.views.send_mail")
+@patch("ecommerce_app.notifications.sms.send")
+@patch("ecommerce_app.notifications.send_mail")
 def test_create_order(mock_send_mail, mock_sms_send, api_client, customer, product):
     url = reverse("order-list")
     payload = {
@@ -90,8 +121,24 @@ def test_create_order(mock_send_mail, mock_sms_send, api_client, customer, produ
     response = api_client.post(url, payload, format="json")
     print(response.json())  # helpful for debugging if still failing
     assert response.status_code == status.HTTP_201_CREATED
-    mock_sms_send.assert_called()
-    mock_send_mail.assert_called()
+    # Notifications are queued with the order and sent by the outbox worker.
+    mock_sms_send.assert_not_called()
+    assert set(OutboxMessage.objects.values_list("kind", flat=True)) == {"sms", "email"}
+
+    OutboxWorker().run_once()
+    mock_sms_send.assert_called_once()
+    mock_send_mail.assert_called_once()
+
+
+@pytest.mark.django_db
+def test_create_order_rejects_duplicate_products(api_client, customer, product):
+    line = {"product": product.id, "quantity": 1, "unit_price": 100}
+    payload = {"customer": customer.id, "items": [line, line]}
+    response = api_client.post(reverse("order-list"), payload, format="json")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert not Order.objects.exists()
+
+
 @pytest.mark.django_db
 def test_get_order_detail(api_client, order):
     url = reverse("order-detail", args=[order.id])
@@ -107,3 +154,15 @@ def test_average_price(api_client, category, product):
     response = api_client.get(url)
     assert response.status_code == status.HTTP_200_OK
     assert response.data["average_price"] == product.price
+
+
+@pytest.mark.django_db
+def test_average_price_includes_descendants(api_client, category):
+    phones = Category.objects.create(name="Phones", parent=category)
+    Product.objects.create(name="Phone", price=300).categories.add(phones)
+    Product.objects.create(name="Tablet", price=500).categories.add(category)
+
+    response = api_client.get(reverse("average-price", args=[category.id]))
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["average_price"] == 400
+    assert response.data["product_count"] == 2
@@ -0,0 +1,102 @@
+"""Per-process LRU cache of verified bearer tokens.
+
+Maps a SHA-256 of the raw token to the resolved user (with its customer
+profile attached) until the token's ``exp``. Each hit returns a copy, so a
+view that changes the user or profile never touches the cached one.
+Entries are dropped when the user or customer is saved or deleted:
+locally via signals, and across processes through a per-user version
+counter in the shared Django cache. That counter is read again at most
+every ``OIDC_TOKEN_CACHE_RECHECK`` seconds per entry, so hits stay in
+process. Nothing is cached when that cache is not shared (``caching.enabled()``).
+"""
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from . import caching
+
+
+def _user_namespace(user_id):
+    return f'principal:{user_id}'
+
+
+class TokenCache:
+
+    def __init__(self, max_size=None, recheck=None):
+        self.max_size = max_size or settings.OIDC_TOKEN_CACHE_SIZE
+        self.recheck = settings.OIDC_TOKEN_CACHE_RECHECK if recheck is None else recheck
+        self.hits = self.misses = self.evictions = 0
+        self._entries = OrderedDict()  # key -> (expires_at, user, version, checked_at)
+        self._by_user = {}  # user pk -> keys of its entries
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def token_key(token):
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+    def get(self, token):
+        """Return a copy of the cached user for ``token`` or None."""
+        key = self.token_key(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is not None:
+            expires_at, user, version, checked_at = entry
+            fresh = expires_at > now
+            if fresh and now - checked_at >= self.recheck:
+                fresh = version == caching.get_version(_user_namespace(user.pk))
+                if fresh:
+                    with self._lock:
+                        if key in self._entries:
+                            self._entries[key] = (expires_at, user, version, now)
+            if fresh:
+                self.hits += 1
+                return copy.deepcopy(user)
+            with self._lock:
+                self._remove(key)
+        self.misses += 1
+        return None
+
+    def put(self, token, expires_at, user):
+        if not expires_at or expires_at <= time.time() or not caching.enabled():
+            return
+        version = caching.get_version(_user_namespace(user.pk))
+        key = self.token_key(token)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (expires_at, copy.deepcopy(user), version, time.time())
+            self._by_user.setdefault(user.pk, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_user(self, user_id):
+        caching.bump_on_commit(_user_namespace(user_id))
+        with self._lock:
+            for key in list(self._by_user.get(user_id, ())):
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def _remove(self, key):
+        """Drop ``key`` and its index entry; the caller holds the lock."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._by_user.get(entry[1].pk)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[entry[1].pk]
+
+
+token_cache = TokenCache()
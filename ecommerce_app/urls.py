@@ -2,13 +2,14 @@ from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.urls import path
 
-from . import views
+from . import metrics, views
 from mozilla_django_oidc import views as oidc_views
 from .views import (
-    CategoryListCreateAPIView, CategoryDetailAPIView,
-    ProductListCreateAPIView, ProductDetailAPIView,
+    CategoryListCreateAPIView, CategoryDetailAPIView, CategoryTreeAPIView,
+    ProductListCreateAPIView, ProductDetailAPIView, ProductBulkIngestAPIView, ProductSearchAPIView,
+    ProductFacetsAPIView,
     CustomerListCreateAPIView, CustomerDetailAPIView,
-    OrderListCreateAPIView, OrderDetailAPIView, OrderItemListCreateAPIView, OrderItemDetailAPIView, AveragePriceView
+    OrderListCreateAPIView, OrderDetailAPIView, OrderRevenueAPIView, OrderItemListCreateAPIView, OrderItemDetailAPIView, AveragePriceView
 )
 @login_required
 def home(request):
@@ -18,15 +19,20 @@ def home(request):
     })
 urlpatterns = [
     path('api/v1/categories/', CategoryListCreateAPIView.as_view(), name='category-list'),
+    path('api/v1/categories/tree/', CategoryTreeAPIView.as_view(), name='category-tree'),
     path('api/v1/categories/<int:pk>/', CategoryDetailAPIView.as_view(), name='category-detail'),
 
     path('api/v1/products/', ProductListCreateAPIView.as_view(), name='product-list'),
+    path('api/v1/products/search/', ProductSearchAPIView.as_view(), name='product-search'),
+    path('api/v1/products/facets/', ProductFacetsAPIView.as_view(), name='product-facets'),
+    path('api/v1/products/bulk/', ProductBulkIngestAPIView.as_view(), name='product-bulk'),
     path('api/v1/products/<int:pk>/', ProductDetailAPIView.as_view(), name='product-detail'),
 
     path('api/v1/customers/', CustomerListCreateAPIView.as_view(), name='customer-list'),
     path('api/v1/customers/<int:pk>/', CustomerDetailAPIView.as_view(), name='customer-detail'),
 
     path('api/v1/orders/', OrderListCreateAPIView.as_view(), name='order-list'),
+    path('api/v1/orders/revenue/', OrderRevenueAPIView.as_view(), name='order-revenue'),
     path('api/v1/orders/<int:pk>/', OrderDetailAPIView.as_view(), name='order-detail'),
 
     path('api/v1/order-item/', OrderItemListCreateAPIView.as_view(), name='order-item-list'),
@@ -42,5 +48,6 @@ urlpatterns = [
     path('api/customer/update/', views.CustomerUpdateAPIView.as_view(), name='api-customer-update'),
     path("", home),
     path('api/v1/categories/<int:category_id>/average-price/', AveragePriceView.as_view(), name='average-price'),
+    path('metrics', metrics.metrics_view, name='metrics'),
 
 ]
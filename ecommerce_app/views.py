@@ -1,25 +1,43 @@
-import africastalking
 from django.conf import settings
 from django.contrib.auth import logout
 from django.contrib.auth.decorators import login_required
-from django.core.mail import send_mail
-from django.db.models import Avg
+from django.db import transaction
+from django.http import HttpResponse
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404, redirect, render
-from .models import Category, Product, Customer, Order, OrderItem
+from django.utils.dateparse import parse_date
+from . import caching, outbox
+from .conditional import (
+    category_etag, category_last_modified, category_list_etag, conditional,
+    product_etag, product_last_modified, product_list_etag, product_list_last_modified,
+)
+from .filters import ProductFilter
+from .ingestion import PARSERS, UPSERT_KEYS, ProductIngestor
+from .notifications import order_notifications
+from .pagination import KeysetPagination, SearchPagination
+from .response_cache import cache_response, get_or_build
+from .search import search_products
+from .streaming import stream_list, wants_stream
+from .models import Category, CategoryPriceStats, Product, Customer, Order, OrderItem, build_category_tree
 from .serializer import (
-    CategorySerializer, ProductSerializer,
-    CustomerSerializer, OrderSerializer, OrderItemSerializer
+    CategorySerializer, CategoryDetailSerializer, ProductSerializer,
+    CustomerSerializer, OrderSerializer, OrderItemSerializer, OrderLineSerializer
 )
 
 class CategoryListCreateAPIView(APIView):
+    @conditional(category_list_etag, category_last_modified)
+    @cache_response('categories')
     def get(self, request):
-        categories = Category.objects.all()
+        if wants_stream(request):
+            return stream_list(Category.objects.order_by('name', 'id'), CategorySerializer)
+        paginator = KeysetPagination(ordering=('name', 'id'))
+        categories = paginator.paginate_queryset(Category.objects.all(), request, view=self)
         serializer = CategorySerializer(categories, many=True)
-        return Response(serializer.data)
+        return paginator.get_paginated_response(serializer.data)
 
     def post(self, request):
         serializer = CategorySerializer(data=request.data)
@@ -29,15 +47,31 @@ class CategoryListCreateAPIView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class CategoryTreeAPIView(APIView):
+    """Full category tree, loaded in one query and cached as rendered JSON per tree version"""
+
+    @conditional(category_list_etag, category_last_modified)
+    def get(self, request):
+        def build():
+            rows = Category.objects.order_by('name').values('id', 'name', 'slug', 'parent_id')
+            return JSONRenderer().render(build_category_tree(rows))
+
+        key = f"category-tree:{caching.get_version('categories')}"
+        body, _ = get_or_build(key, build, settings.CATEGORY_TREE_CACHE_TIMEOUT, 'CategoryTreeAPIView', ['categories'])
+        return HttpResponse(body, content_type='application/json')
+
+
 class CategoryDetailAPIView(APIView):
+    @conditional(category_etag, category_last_modified)
+    @cache_response('categories')
     def get(self, request, pk):
         category = get_object_or_404(Category, pk=pk)
-        serializer = CategorySerializer(category)
+        serializer = CategoryDetailSerializer(category)
         return Response(serializer.data)
 
     def put(self, request, pk):
         category = get_object_or_404(Category, pk=pk)
-        serializer = CategorySerializer(category, data=request.data)
+        serializer = CategoryDetailSerializer(category, data=request.data)
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data)
@@ -49,10 +83,19 @@ class CategoryDetailAPIView(APIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 class ProductListCreateAPIView(APIView):
+    @conditional(product_list_etag, product_list_last_modified)
+    @cache_response('products', 'stock', 'categories')
     def get(self, request):
-        products = Product.objects.all()
+        filters = ProductFilter(request.query_params)
+        if not filters.is_valid():
+            return Response(filters.errors, status=status.HTTP_400_BAD_REQUEST)
+        queryset = filters.apply(ProductSerializer.setup_eager_loading(Product.objects.all()))
+        if wants_stream(request):
+            return stream_list(queryset.order_by(*filters.ordering), ProductSerializer)
+        paginator = KeysetPagination(ordering=filters.ordering)
+        products = paginator.paginate_queryset(queryset, request, view=self)
         serializer = ProductSerializer(products, many=True)
-        return Response(serializer.data)
+        return paginator.get_paginated_response(serializer.data)
 
     def post(self, request):
         serializer = ProductSerializer(data=request.data)
@@ -62,9 +105,61 @@ class ProductListCreateAPIView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class ProductFacetsAPIView(APIView):
+    """Counts per child category and price bucket for the same filters the product list accepts"""
+
+    @cache_response('products', 'stock', 'categories')
+    def get(self, request):
+        filters = ProductFilter(request.query_params)
+        if not filters.is_valid():
+            return Response(filters.errors, status=status.HTTP_400_BAD_REQUEST)
+        return Response(filters.facets())
+
+
+class ProductBulkIngestAPIView(APIView):
+    """Stream an NDJSON (default) or CSV product feed; ?key=name|id selects the upsert key"""
+
+    def post(self, request):
+        fmt = 'csv' if request.content_type.startswith('text/csv') else 'ndjson'
+        key = request.query_params.get('key', 'name')
+        if key not in UPSERT_KEYS:
+            return Response({'error': f"key must be one of {', '.join(UPSERT_KEYS)}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if request.stream is None:
+            return Response({'error': 'Request body is empty'}, status=status.HTTP_400_BAD_REQUEST)
+
+        lines = (line.decode('utf-8-sig') for line in request.stream)
+        report = ProductIngestor(key=key).ingest(PARSERS[fmt](lines))
+        return Response(report, status=status.HTTP_200_OK)
+
+
+class ProductSearchAPIView(APIView):
+    """Ranked search over product name and description; ?q= is required, ?category= limits to a subtree"""
+
+    @cache_response('products', 'stock', 'categories')
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'error': 'q is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        products = ProductSerializer.setup_eager_loading(Product.objects.all())
+        category_id = request.query_params.get('category')
+        if category_id:
+            if not category_id.isdigit():
+                return Response({'error': 'category must be an id'}, status=status.HTTP_400_BAD_REQUEST)
+            products = products.in_category(get_object_or_404(Category, pk=category_id))
+
+        paginator = SearchPagination()
+        page = paginator.paginate_queryset(search_products(query, products), request, view=self)
+        serializer = ProductSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+
 class ProductDetailAPIView(APIView):
+    @conditional(product_etag, product_last_modified)
+    @cache_response(caching.product_namespace('{pk}'), 'categories')
     def get(self, request, pk):
-        product = get_object_or_404(Product, pk=pk)
+        product = get_object_or_404(ProductSerializer.setup_eager_loading(Product.objects.all()), pk=pk)
         serializer = ProductSerializer(product)
         return Response(serializer.data)
 
@@ -84,9 +179,12 @@ class ProductDetailAPIView(APIView):
 
 class CustomerListCreateAPIView(APIView):
     def get(self, request):
-        customers = Customer.objects.all()
+        if wants_stream(request):
+            return stream_list(Customer.objects.order_by('last_name', 'first_name', 'id'), CustomerSerializer)
+        paginator = KeysetPagination(ordering=('last_name', 'first_name', 'id'))
+        customers = paginator.paginate_queryset(Customer.objects.all(), request, view=self)
         serializer = CustomerSerializer(customers, many=True)
-        return Response(serializer.data)
+        return paginator.get_paginated_response(serializer.data)
 
     def post(self, request):
         serializer = CustomerSerializer(data=request.data)
@@ -118,12 +216,16 @@ class CustomerDetailAPIView(APIView):
 
 class OrderItemListCreateAPIView(APIView):
     def get(self, request):
-        items = OrderItem.objects.all()
+        queryset = OrderItemSerializer.setup_eager_loading(OrderItem.objects.all())
+        if wants_stream(request):
+            return stream_list(queryset.order_by('id'), OrderItemSerializer)
+        paginator = KeysetPagination(ordering=('id',))
+        items = paginator.paginate_queryset(queryset, request, view=self)
         serializer = OrderItemSerializer(items, many=True)
-        return Response(serializer.data)
+        return paginator.get_paginated_response(serializer.data)
 
     def post(self, request):
-        serializer = OrderItemSerializer(data=request.data)
+        serializer = OrderLineSerializer(data=request.data)
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -132,21 +234,23 @@ class OrderItemListCreateAPIView(APIView):
 
 class OrderItemDetailAPIView(APIView):
     def get(self, request, pk):
-        item = get_object_or_404(Order, pk=pk)
+        item = get_object_or_404(OrderItemSerializer.setup_eager_loading(OrderItem.objects.all()), pk=pk)
         serializer = OrderItemSerializer(item)
         return Response(serializer.data)
 
     def put(self, request, pk):
-        item = get_object_or_404(Order, pk=pk)
-        serializer = OrderItemSerializer(item, data=request.data)
+        item = get_object_or_404(OrderItem.objects.select_related('order'), pk=pk)
+        serializer = OrderLineSerializer(item, data=request.data)
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def delete(self, request, pk):
-        item = get_object_or_404(Order, pk=pk)
-        item.delete()
+        item = get_object_or_404(OrderItem.objects.select_related('order'), pk=pk)
+        with transaction.atomic():
+            item.delete()
+            OrderLineSerializer.reserve_order_stock(item.order)
         return Response(status=status.HTTP_204_NO_CONTENT)
 # class OrderListCreateAPIView(APIView):
 #     def get(self, request):
@@ -161,62 +265,47 @@ class OrderItemDetailAPIView(APIView):
 #             return Response(serializer.data, status=status.HTTP_201_CREATED)
 #         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-africastalking.initialize(
-    settings.AFRICASTALKING_USERNAME,
-    settings.AFRICASTALKING_API_KEY
-)
-sms = africastalking.SMS
-
-def format_phone_number(phone):
-    phone = str(phone).strip()
-    if phone.startswith("0"):
-        return "+254" + phone[1:]  # Replace leading 0 with +254
-    elif not phone.startswith("+"):
-        return "+254" + phone  # Just in case it has no country code
-    return phone
 class OrderListCreateAPIView(APIView):
     def get(self, request):
-        orders = Order.objects.all()
+        queryset = OrderSerializer.setup_eager_loading(Order.objects.all())
+        if wants_stream(request):
+            return stream_list(queryset.order_by('-placed_at', '-id'), OrderSerializer)
+        paginator = KeysetPagination(ordering=('-placed_at', '-id'))
+        orders = paginator.paginate_queryset(queryset, request, view=self)
         serializer = OrderSerializer(orders, many=True)
-        return Response(serializer.data)
+        return paginator.get_paginated_response(serializer.data)
 
     def post(self, request):
         serializer = OrderSerializer(data=request.data)
         if serializer.is_valid():
-            order = serializer.save()
-            order_items = OrderItem.objects.filter(order=order)
-            items_str = "\n".join([f"{item.product.name} (x{item.quantity})" for item in order_items])
-
-            # --- 1. Send SMS to customer ---
-            try:
-                phone_number = format_phone_number(order.customer.phone)
-                message = f"Hello {order.customer.first_name}, your order #{order.id} has been placed successfully."
-                sms.send(message, [phone_number])
-
-            except Exception as e:
-                print(f"Error sending SMS: {e}")
-
-            # --- 2. Send Email to Admin ---
-            try:
-                subject = f"New Order #{order.id}"
-                body = (
-                    f"A new order has been placed:\n\n"
-                    f"Order ID: {order.id}\n"
-                    f"Customer: {order.customer.first_name}\n"
-                    f"Phone: {order.customer.phone}\n"
-                     f"Items:\n{items_str}\n"
-                    f"Total_Price: {order.total}\n"
-                )
-                send_mail(subject, body, settings.DEFAULT_FROM_EMAIL, [settings.ADMIN_EMAIL])
-            except Exception as e:
-                print(f"Error sending email: {e}")
-
+            # SMS and admin email are delivered by the outbox worker, not in the request.
+            with transaction.atomic():
+                order = serializer.save()
+                outbox.enqueue(order_notifications(order))
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class OrderRevenueAPIView(APIView):
+    """Order count, revenue and units from stored order totals; ?status=, ?since=, ?until= (ISO dates)"""
+
+    def get(self, request):
+        orders = Order.objects.all()
+        if request.query_params.get('status'):
+            orders = orders.filter(status=request.query_params['status'])
+        for param, lookup in (('since', 'placed_at__date__gte'), ('until', 'placed_at__date__lte')):
+            value = request.query_params.get(param)
+            if value:
+                day = parse_date(value)
+                if day is None:
+                    return Response({'error': f"{param} must be a YYYY-MM-DD date"},
+                                    status=status.HTTP_400_BAD_REQUEST)
+                orders = orders.filter(**{lookup: day})
+        return Response(orders.order_by().revenue())
+
+
 class OrderDetailAPIView(APIView):
     def get(self, request, pk):
-        order = get_object_or_404(Order, pk=pk)
+        order = get_object_or_404(OrderSerializer.setup_eager_loading(Order.objects.all()), pk=pk)
         serializer = OrderSerializer(order)
         return Response(serializer.data)
 
@@ -289,9 +378,16 @@ class CustomerUpdateAPIView(APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
 class AveragePriceView(APIView):
+    """Average price over a category and all of its descendants, read from the rollup row"""
+
+    @cache_response('products', 'categories')
     def get(self, request, category_id):
-        avg_price = Product.objects.filter(categories__id=category_id).aggregate(avg=Avg('price'))['avg']
+        stats = CategoryPriceStats.objects.filter(category_id=category_id).first()
         return Response({
             "category_id": category_id,
-            "average_price": avg_price or 0
+            "average_price": stats.average_price if stats and stats.product_count else 0,
+            "product_count": stats.product_count if stats else 0,
+            "min_price": stats.price_min if stats else None,
+            "max_price": stats.price_max if stats else None,
+            "include_descendants": True,
         })
\ No newline at end of file